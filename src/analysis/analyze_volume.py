@@ -1,7 +1,13 @@
-import pandas as pd
+import sys
 from pathlib import Path
 
-data_dir = Path(__file__).parent.parent.parent / 'data'
+# プロジェクトのルートディレクトリを取得
+project_root = Path(__file__).parent.parent.parent
+sys.path.append(str(project_root))
+
+from src.storage import CompanyStore, compact_frame, load_prices, open_analytics_db
+
+data_dir = project_root / 'data'
 
 
 def load_stock_prices_analyzed():
@@ -11,31 +17,35 @@ def load_stock_prices_analyzed():
     Returns:
         pd.DataFrame: 株価データ
     """
-    file_name = 'stock_prices_2025q1.csv'
-    file_path = data_dir / 'raw' / file_name
-    df = pd.read_csv(
+    file_path = data_dir / 'raw' / 'stock_prices_2025q1'
+    df = load_prices(
         file_path,
-        dtype={'Code': str,},
-        parse_dates=['Date'],
+        columns=['Code', 'Volume', 'TurnoverValue'],
     )
-    return df
+    return compact_frame(df)
 
 
 def analyze_volume():
-    df = load_stock_prices_analyzed()
-
-    # 企業ごとの出来高を計算
-    turnover_by_company = df.groupby([
-        'Code',
-        'CompanyName',
-    ])[['Volume', 'TurnoverValue']].sum()
-
-    # 取引金額でソート（降順）
-    turnover_by_company_sorted = turnover_by_company.sort_values(
-        by='TurnoverValue',
-        ascending=False,
-    )
-    turnover_by_company_sorted
+    db = open_analytics_db(tables=['prices_2025q1', 'companies'])
+    if db is not None:
+        # 分析用データベースがあれば集計・並べ替えを SQL で行う
+        turnover_by_company_sorted = db.top_turnover(n=500, table='prices_2025q1') \
+            .set_index(['Code', 'CompanyName'])
+    else:
+        df = load_stock_prices_analyzed()
+
+        # 企業ごとの出来高を計算
+        turnover_by_code = df.groupby('Code')[['Volume', 'TurnoverValue']].sum().reset_index()
+
+        # 銘柄名は集計後に企業情報のストアから結合する
+        turnover_by_company = CompanyStore().join(turnover_by_code, ['CompanyName']) \
+            .set_index(['Code', 'CompanyName'])[['Volume', 'TurnoverValue']]
+
+        # 取引金額でソート（降順）
+        turnover_by_company_sorted = turnover_by_company.sort_values(
+            by='TurnoverValue',
+            ascending=False,
+        )
 
     # 結果を表示
     print("\n企業ごとの取引金額（上位20社）:")
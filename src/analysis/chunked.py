@@ -0,0 +1,182 @@
+"""
+メモリに載りきらない株価データを銘柄のバッチごとに読み込んで技術指標を計算するモジュール
+
+分割保存したデータセットから銘柄ごとの行数を求め、1バッチの使用メモリが max_memory_mb に
+収まるように銘柄を昇順にまとめる。各バッチは銘柄の全期間を読み込むため、SMA200 の窓や
+EMA の計算に必要な過去のデータはバッチの中にそろっており、結果は全体を一度に計算した場合と同じ。
+結果はバッチごとに出力先のデータセットへ書き出し（DatasetWriter）、メモリには1バッチ分しか持たない。
+
+    python -m src.analysis.chunked data/raw/stock_prices data/processed/stock_prices_analyzed --max-memory-mb 2000
+"""
+import sys
+import time
+
+from ..storage.partitioned import PartitionedDataset, is_partitioned_dataset
+from ..storage.price_store import load_prices, normalize_dtypes, resolve_path
+from .processer import INDICATOR_COLUMNS, process_stock_data
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# 入力1行あたりのメモリに対する処理中のメモリの倍率
+# （読み込んだ入力・銘柄ごとに並べたコピー・指標の列・計算途中の中間結果）
+MEMORY_FACTOR = 4
+
+# 指標の列が1行あたりに使うバイト数（float64 と真偽値）
+INDICATOR_ROW_BYTES = 8 * len(INDICATOR_COLUMNS)
+
+
+def peak_memory_mb():
+    """
+    このプロセスのこれまでの最大使用メモリ（MB）を返す
+
+    Returns:
+        float: 最大常駐メモリ（取得できない環境では None）
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux は KB、macOS はバイト単位
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def _open_dataset(path):
+    """分割保存したデータセットを返す（CSV など銘柄で絞り込めない形式の場合は ValueError）"""
+    path = resolve_path(path)
+    if not is_partitioned_dataset(path):
+        raise ValueError(f"バッチ処理には分割保存したデータセットが必要です: {path}")
+    return PartitionedDataset(path)
+
+
+def estimate_row_bytes(dataset, code, columns=None):
+    """
+    1銘柄を読み込んで、処理中に1行あたりに使うメモリを見積もる
+
+    Args:
+        dataset (PartitionedDataset): データセット
+        code (str): 見積もりに使う証券コード
+        columns (list): 読み込む列名（None の場合はすべて）
+
+    Returns:
+        int: 1行あたりのバイト数
+    """
+    sample = dataset.load(codes=[code], columns=columns)
+    if sample.empty:
+        return MEMORY_FACTOR * INDICATOR_ROW_BYTES
+    input_bytes = sample.memory_usage(index=True, deep=True).sum() / len(sample)
+    return int(MEMORY_FACTOR * (input_bytes + INDICATOR_ROW_BYTES))
+
+
+def plan_code_batches(counts, max_rows):
+    """
+    銘柄を昇順に、1バッチの行数が max_rows 以下になるようにまとめる
+
+    1銘柄で max_rows を超える場合はその銘柄だけのバッチにする。
+
+    Args:
+        counts (pd.Series): 証券コードをインデックスとする行数（昇順）
+        max_rows (int): 1バッチの行数の上限
+
+    Returns:
+        list: 証券コードのリストのリスト
+    """
+    batches, batch, rows = [], [], 0
+    for code, n_rows in counts.items():
+        if batch and rows + n_rows > max_rows:
+            batches.append(batch)
+            batch, rows = [], 0
+        batch.append(code)
+        rows += n_rows
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def iter_code_batches(path, max_memory_mb, columns=None):
+    """
+    データセットを銘柄のバッチごとに読み込む
+
+    Args:
+        path (str | Path): データセットのパス
+        max_memory_mb (float): 1バッチの処理に使うメモリの上限（MB）
+        columns (list): 読み込む列名（None の場合はすべて）
+
+    Yields:
+        tuple: (バッチの番号, バッチ数, 株価データ)
+    """
+    dataset = _open_dataset(path)
+    counts, _ = dataset.scan_keys()
+    if counts.empty:
+        return
+    row_bytes = estimate_row_bytes(dataset, counts.index[0], columns)
+    max_rows = max(int(max_memory_mb * 1024 * 1024 / row_bytes), 1)
+    batches = plan_code_batches(counts, max_rows)
+    for i, codes in enumerate(batches):
+        yield i, len(batches), load_prices(path, columns=columns, codes=codes)
+
+
+def process_dataset_chunked(source_path, output_path, max_memory_mb, max_workers=1, state=None):
+    """
+    株価データを銘柄のバッチごとに読み込んで技術指標を計算し、出力先のデータセットに書き出す
+
+    Args:
+        source_path (str | Path): 株価データのデータセット
+        output_path (str | Path): 出力先のデータセット（全体を置き換える）
+        max_memory_mb (float): 1バッチの処理に使うメモリの上限（MB）
+        max_workers (int): 技術指標を計算するプロセス数
+        state (IndicatorState): 指定した場合は各バッチを反映する（日々の更新用の状態）
+
+    Returns:
+        dict: 行数・バッチ数・処理時間・最大使用メモリ（MB）
+    """
+    start_time = time.perf_counter()
+    n_batches = 0
+    with PartitionedDataset(output_path).writer() as writer:
+        for i, n_batches, df in iter_code_batches(source_path, max_memory_mb):
+            processed_df = process_stock_data(df, max_workers=max_workers)
+            writer.write(normalize_dtypes(processed_df))
+            if state is not None:
+                state.update(df, collect=False)
+            print(f"  バッチ {i + 1}/{n_batches}: {df['Code'].nunique()}銘柄・{len(df):,}行"
+                  f"（最大使用メモリ {peak_memory_mb() or 0:,.0f}MB）")
+            del df, processed_df
+
+    return {
+        "rows": writer.rows,
+        "batches": n_batches,
+        "seconds": time.perf_counter() - start_time,
+        "peak_memory_mb": peak_memory_mb(),
+    }
+
+
+def write_panel_chunked(dataset_path, panel, max_memory_mb):
+    """
+    データセットを銘柄のバッチごとに読み込んでパネルを作成する
+
+    Args:
+        dataset_path (str | Path): 株価・指標のデータセット
+        panel (PanelStore): 保存先のパネル
+        max_memory_mb (float): 1バッチの読み込みに使うメモリの上限（MB）
+    """
+    counts, dates = _open_dataset(dataset_path).scan_keys()
+    with panel.writer(counts.index.to_numpy(dtype=str), dates) as writer:
+        for _, _, df in iter_code_batches(dataset_path, max_memory_mb):
+            writer.write(df)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="株価データを銘柄のバッチごとに処理して技術指標を計算する")
+    parser.add_argument("source", help="株価データのデータセット（例: data/raw/stock_prices）")
+    parser.add_argument("output", help="出力先のデータセット（例: data/processed/stock_prices_analyzed）")
+    parser.add_argument("--max-memory-mb", type=float, default=2000, help="1バッチの処理に使うメモリの上限（MB）")
+    parser.add_argument("--workers", type=int, default=1, help="技術指標を計算するプロセス数")
+    args = parser.parse_args()
+
+    report = process_dataset_chunked(args.source, args.output, args.max_memory_mb, args.workers)
+    print(f"{report['rows']:,}行を{report['batches']}バッチで処理しました"
+          f"（{report['seconds']:.1f}秒、最大使用メモリ {report['peak_memory_mb'] or 0:,.0f}MB）")
@@ -0,0 +1,304 @@
+"""
+技術指標を新しい営業日の分だけ計算するための銘柄ごとの状態を管理するモジュール
+
+process_stock_data は全期間を計算し直すが、日々の更新では銘柄ごとに次の状態だけを
+持っておけば、新しい1本の足の指標を履歴の長さに関係なく計算できる。
+
+- 直近 WINDOW_SIZE 本の終値（SMA5/25/75/200・ボリンジャーバンド・25日の変動率の窓）
+- EMA12・EMA26・MACD シグナルの値と重み（pandas の ewm(adjust=False) と同じ漸化式）
+- 前日の MACD とシグナルの差（クロスオーバーの判定）
+
+EMA は pandas と同じ順で計算するため全期間の計算と一致し、移動平均・標準偏差は窓の
+終値から直接計算するため、全期間の計算とは浮動小数点の丸め誤差の範囲で一致する。
+
+    state = IndicatorState.load(state_file)
+    df_new = state.update(df_prices_new)     # 新しい足の指標
+    state.save(state_file)
+"""
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .processer import BOOL_INDICATOR_COLUMNS, INDICATOR_COLUMNS
+
+
+# 終値を保持する本数（最も長い窓の SMA200）
+WINDOW_SIZE = 200
+
+SMA_WINDOWS = [5, 25, 75, 200]
+
+# ボリンジャーバンド・バンドウォーク（calculate_bollinger_bands・detect_band_walk と同じ設定）
+BB_WINDOW = 25
+BB_NUM_STD = 2.0
+BAND_WALK_WINDOW = 25
+BAND_WALK_THRESHOLD = 0.05
+
+# MACD（calculate_macd と同じ設定）
+EMA_SPANS = {"ema12": 12, "ema26": 26, "signal": 9}
+
+# pandas 3 より前の pct_change は欠損を直前の値で埋めてから変動率を計算する
+PCT_CHANGE_FILLS_NA = int(pd.__version__.split(".")[0]) < 3
+
+
+def _alpha(span):
+    """pandas の ewm(span=...) と同じ平滑化係数"""
+    com = (span - 1) / 2.0
+    return 1. / (1. + com)
+
+
+def _ewm_step(weighted, old_wt, values, alpha):
+    """
+    ewm(adjust=False).mean() を1本進める（pandas の実装と同じ計算順）
+
+    Args:
+        weighted (np.ndarray): 前の足までの EMA（観測がまだない銘柄は NaN）
+        old_wt (np.ndarray): 前の足までの重み
+        values (np.ndarray): 新しい足の値
+        alpha (float): 平滑化係数
+
+    Returns:
+        tuple: (新しい EMA, 新しい重み)
+    """
+    is_observation = ~np.isnan(values)
+    has_value = ~np.isnan(weighted)
+
+    # 欠損の足でも重みは減衰させる（ignore_na=False）
+    old_wt = np.where(has_value, old_wt * (1. - alpha), old_wt)
+    with np.errstate(invalid="ignore"):
+        blended = (old_wt * weighted + alpha * values) / (old_wt + alpha)
+    weighted = np.where(has_value & is_observation & (weighted != values), blended, weighted)
+    old_wt = np.where(has_value & is_observation, 1., old_wt)
+    weighted = np.where(~has_value & is_observation, values, weighted)
+    return weighted, old_wt
+
+
+def _window_stats(window, ddof=None):
+    """窓の平均（ddof を指定した場合は標準偏差）。欠損を含む窓は NaN"""
+    if ddof is None:
+        return window.mean(axis=1)
+    return window.std(axis=1, ddof=ddof)
+
+
+def _last_valid(values):
+    """各行で最後の欠損でない値を返す（すべて欠損の行は NaN）"""
+    valid = ~np.isnan(values)
+    positions = np.where(valid, np.arange(values.shape[1]), -1).max(axis=1)
+    return np.where(positions >= 0, values[np.arange(len(values)), np.maximum(positions, 0)], np.nan)
+
+
+class IndicatorState:
+    """
+    銘柄ごとの指標の計算状態
+
+    Attributes:
+        codes: 証券コードの配列
+        last_dates: 銘柄ごとに最後に反映した日付（datetime64[ns]）
+        closes: 直近 WINDOW_SIZE 本の終値（[銘柄 × 本数]、古い順、足りない分は NaN）
+        ema: EMA12・EMA26・シグナルの値（名前をキーとする辞書）
+        ema_weights: EMA の重み（名前をキーとする辞書）
+        prev_macd_diff: 前日の MACD とシグナルの差
+    """
+
+    def __init__(self):
+        self.codes = np.array([], dtype=str)
+        self.last_dates = np.array([], dtype="datetime64[ns]")
+        self.closes = np.empty((0, WINDOW_SIZE))
+        self.ema = {name: np.empty(0) for name in EMA_SPANS}
+        self.ema_weights = {name: np.empty(0) for name in EMA_SPANS}
+        self.prev_macd_diff = np.empty(0)
+        self._positions = {}
+
+    @property
+    def latest_date(self):
+        """反映済みの最新の日付（銘柄がない場合は None）"""
+        if len(self.last_dates) == 0:
+            return None
+        return pd.Timestamp(self.last_dates.max())
+
+    @classmethod
+    def from_history(cls, df):
+        """
+        株価データの全期間を順に反映した状態を作成する
+
+        Args:
+            df (pd.DataFrame): Code・Date・Close 列を含む株価データ
+
+        Returns:
+            IndicatorState: 状態
+        """
+        state = cls()
+        state.update(df, collect=False)
+        return state
+
+    def _add_codes(self, codes):
+        """状態にない銘柄を追加する"""
+        new_codes = [code for code in dict.fromkeys(codes) if code not in self._positions]
+        if not new_codes:
+            return
+        n = len(new_codes)
+        self.codes = np.concatenate([self.codes, np.array(new_codes, dtype=str)])
+        self.last_dates = np.concatenate([self.last_dates, np.full(n, np.datetime64("NaT"), dtype="datetime64[ns]")])
+        self.closes = np.vstack([self.closes, np.full((n, WINDOW_SIZE), np.nan)])
+        for name in EMA_SPANS:
+            self.ema[name] = np.concatenate([self.ema[name], np.full(n, np.nan)])
+            self.ema_weights[name] = np.concatenate([self.ema_weights[name], np.ones(n)])
+        self.prev_macd_diff = np.concatenate([self.prev_macd_diff, np.full(n, np.nan)])
+        self._positions = {code: i for i, code in enumerate(self.codes.tolist())}
+
+    def _step(self, rows, close):
+        """
+        指定した銘柄に1本ずつ足を反映し、その足の指標を返す
+
+        Args:
+            rows (np.ndarray): 状態の行番号（重複なし）
+            close (np.ndarray): 新しい足の終値
+
+        Returns:
+            dict: 列名をキー、値の配列を値とする辞書
+        """
+        window = np.concatenate([self.closes[rows, 1:], close[:, None]], axis=1)
+        self.closes[rows] = window
+
+        out = {}
+        for size in SMA_WINDOWS:
+            out[f"SMA{size}"] = _window_stats(window[:, -size:])
+
+        # ボリンジャーバンドの計算
+        std = _window_stats(window[:, -BB_WINDOW:], ddof=1)
+        out["BB_middle"] = out[f"SMA{BB_WINDOW}"]
+        out["BB_upper"] = out["BB_middle"] + (std * BB_NUM_STD)
+        out["BB_lower"] = out["BB_middle"] - (std * BB_NUM_STD)
+
+        # バンドウォークの検出
+        with np.errstate(invalid="ignore", divide="ignore"):
+            if PCT_CHANGE_FILLS_NA:
+                current = _last_valid(window)
+                before = _last_valid(window[:, :-BAND_WALK_WINDOW])
+            else:
+                current = close
+                before = window[:, -BAND_WALK_WINDOW - 1]
+            price_change = np.abs(current / before - 1)
+            price_position = (close - out["BB_lower"]) / (out["BB_upper"] - out["BB_lower"])
+            is_quiet = price_change <= BAND_WALK_THRESHOLD
+            out["UpperBandWalk"] = is_quiet & (price_position >= 0.8) & (price_position <= 0.9)
+            out["LowerBandWalk"] = is_quiet & (price_position >= 0.1) & (price_position <= 0.2)
+
+        # MACDの計算
+        for name in ["ema12", "ema26"]:
+            self.ema[name][rows], self.ema_weights[name][rows] = _ewm_step(
+                self.ema[name][rows], self.ema_weights[name][rows], close, _alpha(EMA_SPANS[name]))
+        macd = self.ema["ema12"][rows] - self.ema["ema26"][rows]
+        self.ema["signal"][rows], self.ema_weights["signal"][rows] = _ewm_step(
+            self.ema["signal"][rows], self.ema_weights["signal"][rows], macd, _alpha(EMA_SPANS["signal"]))
+        signal = self.ema["signal"][rows]
+        out["MACD"] = macd
+        out["MACD_signal"] = signal
+        out["MACD_histogram"] = macd - signal
+
+        # MACDのクロスオーバー検出
+        macd_diff = macd - signal
+        prev_macd_diff = self.prev_macd_diff[rows]
+        with np.errstate(invalid="ignore"):
+            out["MACD_golden_cross"] = (prev_macd_diff < 0) & (macd_diff > 0)
+            out["MACD_dead_cross"] = (prev_macd_diff > 0) & (macd_diff < 0)
+        self.prev_macd_diff[rows] = macd_diff
+        return out
+
+    def update(self, df, collect=True):
+        """
+        新しい足を状態に反映し、その足の技術指標を計算する
+
+        銘柄ごとに反映済みの日付より後の行だけを使う（それ以前の行は無視する）。
+
+        Args:
+            df (pd.DataFrame): Code・Date・Close 列を含む株価データ
+            collect (bool): False の場合は状態だけを更新し、結果を作らない
+
+        Returns:
+            pd.DataFrame: 反映した行に技術指標の列を追加したデータフレーム（Code・Date 順）
+        """
+        df = df.assign(Code=df["Code"].astype(str), Date=pd.to_datetime(df["Date"]))
+        self._add_codes(df["Code"].unique())
+
+        rows = np.array([self._positions[code] for code in df["Code"]], dtype=np.int64)
+        dates = df["Date"].to_numpy(dtype="datetime64[ns]")
+        last_dates = self.last_dates[rows]
+        is_new = np.isnat(last_dates) | (dates > last_dates)
+        df = df[is_new]
+        rows = rows[is_new]
+        dates = dates[is_new]
+
+        order = np.lexsort((rows, dates))
+        df = df.iloc[order]
+        rows = rows[order]
+        dates = dates[order]
+        close = pd.to_numeric(df["Close"]).to_numpy(dtype=np.float64, na_value=np.nan)
+
+        # 1つの日付に同じ銘柄は1行なので、日付ごとにまとめて1本進める
+        boundaries = np.flatnonzero(dates[1:] != dates[:-1]) + 1
+        results = {column: [] for column in INDICATOR_COLUMNS}
+        for start, end in zip(np.r_[0, boundaries], np.r_[boundaries, len(df)]):
+            out = self._step(rows[start:end], close[start:end])
+            if collect:
+                for column in INDICATOR_COLUMNS:
+                    results[column].append(out[column])
+        if len(df):
+            self.last_dates[rows] = dates
+
+        if not collect:
+            return None
+        result_df = df.copy()
+        for column in INDICATOR_COLUMNS:
+            dtype = bool if column in BOOL_INDICATOR_COLUMNS else np.float64
+            values = np.concatenate(results[column]) if results[column] else np.empty(0, dtype=dtype)
+            result_df[column] = values
+        return result_df.sort_values(["Code", "Date"], kind="stable").reset_index(drop=True)
+
+    def save(self, path):
+        """
+        状態をファイルに保存する（一時ファイルに書き出してから置き換える）
+
+        Args:
+            path (str | Path): 保存先のファイル（.npz）
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        arrays = {
+            "codes": self.codes,
+            "last_dates": self.last_dates,
+            "closes": self.closes,
+            "prev_macd_diff": self.prev_macd_diff,
+        }
+        for name in EMA_SPANS:
+            arrays[name] = self.ema[name]
+            arrays[f"{name}_weight"] = self.ema_weights[name]
+
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        保存した状態を読み込む
+
+        Args:
+            path (str | Path): 保存先のファイル（.npz）
+
+        Returns:
+            IndicatorState: 状態
+        """
+        state = cls()
+        with np.load(path) as arrays:
+            state.codes = arrays["codes"]
+            state.last_dates = arrays["last_dates"]
+            state.closes = arrays["closes"]
+            state.prev_macd_diff = arrays["prev_macd_diff"]
+            for name in EMA_SPANS:
+                state.ema[name] = arrays[name]
+                state.ema_weights[name] = arrays[f"{name}_weight"]
+        state._positions = {code: i for i, code in enumerate(state.codes.tolist())}
+        return state
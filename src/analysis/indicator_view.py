@@ -0,0 +1,161 @@
+"""
+必要になった銘柄・指標の列だけを計算して返すビュー
+
+process_stock_data は全銘柄の指標をすべて計算するが、チャートや分析画面が使うのは選んだ銘柄の
+一部の指標だけ。IndicatorView は列を要求されたときに、その銘柄の株価だけを読み込んで
+要求された指標（と依存する中間結果）だけを計算する。
+
+- 指標は銘柄の全期間で計算してから期間で切り出すため、全期間の計算と同じ値になる
+- 計算結果は銘柄ごとに保持し、保持する銘柄数は max_codes まで（古く使われた銘柄から捨てる）
+- cache_dir を指定すると計算した指標の列を銘柄ごとのファイルに保存し、株価の日付と値が
+  変わっていなければ次回以降はファイルから読み込む
+
+    view = IndicatorView(lambda codes: load_prices(prices_path, codes=codes))
+    df = view.frame(["72030"], ["Date", "Close", "SMA25", "MACD"], start="2025-01-01")
+"""
+import hashlib
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List
+
+import numpy as np
+import pandas as pd
+
+from .indicators import INDICATORS, Node, evaluate
+
+
+# 計算結果を保持する銘柄数の上限
+DEFAULT_MAX_CODES = 64
+
+# 保存した指標が有効かどうかを確かめる株価の列（指標の計算に使う列）
+INPUT_COLUMNS = ["Close", "High", "Low"]
+
+# 保存ファイルの中で指標以外に使うキー
+_META_KEYS = ("Date", "_input_digest")
+
+
+def _input_digest(prices: pd.DataFrame) -> str:
+    """指標の計算に使う株価の値のハッシュ（株価が修正されたら保存した指標を使わない）"""
+    digest = hashlib.sha1()
+    for column in INPUT_COLUMNS:
+        if column in prices.columns:
+            digest.update(column.encode())
+            digest.update(prices[column].to_numpy(dtype=np.float64, na_value=np.nan).tobytes())
+    return digest.hexdigest()
+
+
+class _CodeEntry:
+    """1銘柄の株価と計算済みの値"""
+
+    def __init__(self, prices: pd.DataFrame):
+        self.prices = prices
+        self.nodes: Dict[Node, pd.Series] = {}
+        self.columns: Dict[str, np.ndarray] = {}
+
+
+class IndicatorView:
+    """
+    指標の列を必要になったときに計算するビュー
+
+    Attributes:
+        loader: 証券コードのリストを受け取り、その銘柄の全期間の株価を返す関数
+        cache_dir: 計算した指標を保存するディレクトリ（None の場合は保存しない）
+        max_codes: 計算結果を保持する銘柄数の上限
+    """
+
+    def __init__(self, loader: Callable[[List[str]], pd.DataFrame], cache_dir=None, max_codes: int = DEFAULT_MAX_CODES):
+        self.loader = loader
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self.max_codes = max_codes
+        self._entries: "OrderedDict[str, _CodeEntry]" = OrderedDict()
+
+    def clear(self) -> None:
+        """保持している計算結果を捨てる（株価を更新した後に呼ぶ）"""
+        self._entries.clear()
+
+    def _cache_file(self, code: str) -> Path:
+        return self.cache_dir / f"{code}.npz"
+
+    def _entry(self, code: str, prices: pd.DataFrame = None) -> _CodeEntry:
+        """銘柄の計算結果を返す（保持していなければ株価を読み込む）"""
+        if code in self._entries:
+            self._entries.move_to_end(code)
+            return self._entries[code]
+
+        if prices is None:
+            prices = self.loader([code])
+        prices = prices.sort_values("Date", kind="stable").reset_index(drop=True)
+        entry = _CodeEntry(prices)
+
+        # 保存済みの列は、株価の日付と値が同じ場合だけ使う
+        if self.cache_dir is not None and self._cache_file(code).exists():
+            with np.load(self._cache_file(code)) as stored:
+                dates = prices["Date"].to_numpy(dtype="datetime64[ns]")
+                if ("_input_digest" in stored.files
+                        and np.array_equal(stored["Date"], dates)
+                        and str(stored["_input_digest"]) == _input_digest(prices)):
+                    entry.columns = {name: stored[name] for name in stored.files if name not in _META_KEYS}
+
+        self._entries[code] = entry
+        while len(self._entries) > self.max_codes:
+            self._entries.popitem(last=False)
+        return entry
+
+    def _materialize(self, code: str, entry: _CodeEntry, names: List[str]) -> None:
+        """まだ計算していない指標を計算する"""
+        missing = [name for name in names if name not in entry.columns]
+        if not missing:
+            return
+        groups = np.zeros(len(entry.prices), dtype=np.int64)
+        entry.columns.update(evaluate(entry.prices, groups, missing, cache=entry.nodes))
+
+        if self.cache_dir is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            path = self._cache_file(code)
+            tmp_path = path.with_name(path.name + ".tmp")
+            with open(tmp_path, "wb") as f:
+                np.savez(f, Date=entry.prices["Date"].to_numpy(dtype="datetime64[ns]"),
+                         _input_digest=np.array(_input_digest(entry.prices)), **entry.columns)
+            os.replace(tmp_path, path)
+
+    def frame(self, codes: Iterable[str], columns: List[str], start=None, end=None) -> pd.DataFrame:
+        """
+        銘柄・期間を指定して株価と指標の列を返す
+
+        Args:
+            codes: 証券コード
+            columns: 列名（株価の列と indicators に登録した指標名）
+            start (str | datetime): 開始日（None の場合は最初から）
+            end (str | datetime): 終了日（None の場合は最後まで）
+
+        Returns:
+            pd.DataFrame: 指定した列のデータフレーム（銘柄ごとに日付順）
+        """
+        codes = [str(code) for code in codes]
+        names = [column for column in columns if column in INDICATORS]
+
+        # 保持していない銘柄はまとめて読み込む（max_codes より多い銘柄を指定しても読み直さない）
+        entries = {}
+        missing = [code for code in codes if code not in self._entries]
+        if missing:
+            loaded = self.loader(missing)
+            loaded_codes = loaded["Code"].astype(str)
+            for code in missing:
+                entries[code] = self._entry(code, loaded[loaded_codes == code])
+
+        frames = []
+        for code in codes:
+            entry = entries[code] if code in entries else self._entry(code)
+            self._materialize(code, entry, names)
+
+            df = entry.prices.assign(**{name: entry.columns[name] for name in names})
+            if start is not None:
+                df = df[df["Date"] >= pd.Timestamp(start)]
+            if end is not None:
+                df = df[df["Date"] <= pd.Timestamp(end)]
+            frames.append(df[list(columns)])
+
+        if not frames:
+            return pd.DataFrame(columns=columns)
+        return pd.concat(frames, ignore_index=True)
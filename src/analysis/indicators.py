@@ -0,0 +1,272 @@
+"""
+技術指標を宣言的に登録し、依存関係の DAG として計算するモジュール
+
+各指標は「演算・入力・パラメータ」の組（Node）で宣言する。入力には株価の列名・登録済みの
+指標名・別の Node を指定でき、同じ演算・入力・パラメータの Node は1つにまとめられるため、
+共有する中間結果（移動平均・移動標準偏差・EMA・前日の値など）は銘柄ごとに1回だけ計算される。
+例えば BB_middle は SMA25 と同じ Node で、MACD_histogram とクロスオーバー判定の差分も同じ Node になる。
+
+    register('SMA10', node('rolling_mean', 'Close', window=10))
+    evaluate(df_sorted, groups, ['SMA10', 'RSI14'])
+"""
+from collections import namedtuple
+from typing import Callable, Dict, Iterable, List, Union
+
+import numpy as np
+import pandas as pd
+
+
+Node = namedtuple('Node', ['op', 'inputs', 'params'])
+
+# 演算名 -> (関数, 出力の型)
+OPERATIONS: Dict[str, tuple] = {}
+
+# 指標名 -> Node
+INDICATORS: Dict[str, Node] = {}
+
+
+def node(op: str, *inputs: Union[str, Node], **params) -> Node:
+    """演算・入力・パラメータから Node を作成（同じ内容の Node は等しい）"""
+    if op not in OPERATIONS:
+        raise KeyError(f"未登録の演算です: {op}")
+    return Node(op, tuple(inputs), tuple(sorted(params.items())))
+
+
+def operation(name: str, dtype=np.float64, grouped: bool = False) -> Callable:
+    """演算を登録するデコレーター
+
+    Args:
+        name: 演算名
+        dtype: 出力の型
+        grouped: True の場合は最初の入力を銘柄ごとにまとめた GroupBy を受け取る
+    """
+    def decorator(func):
+        OPERATIONS[name] = (func, np.dtype(dtype), grouped)
+        return func
+    return decorator
+
+
+def register(name: str, definition: Node) -> None:
+    """指標を登録"""
+    INDICATORS[name] = definition
+
+
+def _resolve(item: Union[str, Node]) -> Union[str, Node]:
+    """登録済みの指標名は Node に置き換える（株価の列名はそのまま）"""
+    if isinstance(item, str) and item in INDICATORS:
+        return INDICATORS[item]
+    return item
+
+
+def plan(names: Iterable[str]) -> List[Node]:
+    """指標の計算に必要な Node を依存関係の順に並べる（同じ Node は1回だけ）
+
+    Args:
+        names: 指標名
+
+    Returns:
+        List[Node]: 計算する順の Node のリスト
+    """
+    order, visiting, done = [], set(), set()
+
+    def visit(item):
+        item = _resolve(item)
+        if not isinstance(item, Node) or item in done:
+            return
+        if item in visiting:
+            raise ValueError(f"指標の依存関係が循環しています: {item.op}")
+        visiting.add(item)
+        for child in item.inputs:
+            visit(child)
+        visiting.discard(item)
+        done.add(item)
+        order.append(item)
+
+    for name in names:
+        if name not in INDICATORS:
+            raise KeyError(f"未登録の指標です: {name}")
+        visit(name)
+    return order
+
+
+def required_columns(names: Iterable[str]) -> List[str]:
+    """指標の計算に必要な株価の列名"""
+    columns = []
+    for item in plan(names):
+        for child in item.inputs:
+            child = _resolve(child)
+            if isinstance(child, str) and child not in columns:
+                columns.append(child)
+    return columns
+
+
+def output_dtype(name: str) -> np.dtype:
+    """指標の出力の型"""
+    return OPERATIONS[INDICATORS[name].op][1]
+
+
+def evaluate(prices: pd.DataFrame, groups: np.ndarray, names: Iterable[str],
+             cache: Dict[Node, pd.Series] = None) -> Dict[str, np.ndarray]:
+    """銘柄ごとに並んだ株価から指標を計算
+
+    Args:
+        prices: 銘柄ごと（銘柄内は日付順）に並べた株価（required_columns の列を含む）
+        groups: 各行の銘柄の番号（昇順）
+        names: 指標名
+        cache: 計算済みの Node の値（同じ prices・groups で計算したもの）。計算した Node を追加する
+
+    Returns:
+        Dict[str, np.ndarray]: 指標名をキーとする行の順の配列
+    """
+    names = list(names)
+    prices = prices.reset_index(drop=True)
+    values: Dict[Node, pd.Series] = {} if cache is None else cache
+    grouped = {}
+
+    def value(item):
+        item = _resolve(item)
+        return prices[item] if isinstance(item, str) else values[item]
+
+    for item in plan(names):
+        if item in values:
+            continue
+        func, _, is_grouped = OPERATIONS[item.op]
+        args = [value(child) for child in item.inputs]
+        if is_grouped:
+            # 同じ入力の GroupBy は使い回す
+            key = _resolve(item.inputs[0])
+            if key not in grouped:
+                grouped[key] = args[0].groupby(groups, sort=True)
+            args[0] = grouped[key]
+        values[item] = func(*args, **dict(item.params))
+
+    return {name: values[INDICATORS[name]].to_numpy() for name in names}
+
+
+def _group_values(result: pd.Series) -> pd.Series:
+    """銘柄ごとの計算結果（銘柄・元のインデックスの MultiIndex）を行の順に戻す"""
+    return pd.Series(result.to_numpy())
+
+
+# ---- 演算 ----
+
+@operation('rolling_mean', grouped=True)
+def _rolling_mean(by_code, window):
+    return _group_values(by_code.rolling(window=window).mean())
+
+
+@operation('rolling_std', grouped=True)
+def _rolling_std(by_code, window):
+    return _group_values(by_code.rolling(window=window).std())
+
+
+@operation('ema', grouped=True)
+def _ema(by_code, span):
+    return _group_values(by_code.ewm(span=span, adjust=False).mean())
+
+
+@operation('wilder', grouped=True)
+def _wilder(by_code, period):
+    """ワイルダーの平滑化（alpha = 1 / period の指数平滑）"""
+    return _group_values(by_code.ewm(alpha=1 / period, adjust=False).mean())
+
+
+@operation('shift', grouped=True)
+def _shift(by_code, periods):
+    return _group_values(by_code.shift(periods))
+
+
+@operation('pct_change', grouped=True)
+def _pct_change(by_code, periods):
+    return _group_values(by_code.pct_change(periods))
+
+
+@operation('abs')
+def _abs(x):
+    return x.abs()
+
+
+@operation('sub')
+def _sub(a, b):
+    return a - b
+
+
+@operation('add_scaled')
+def _add_scaled(a, b, scale):
+    """a + b × scale"""
+    return a + (b * scale)
+
+
+@operation('band_position')
+def _band_position(close, upper, lower):
+    """バンドの幅に対する価格の位置（0-1の範囲）"""
+    band_width = upper - lower
+    return (close - lower) / band_width
+
+
+@operation('band_walk', dtype=bool)
+def _band_walk(price_change, price_position, threshold, low, high):
+    """価格変動が閾値以下で、価格がバンドの low〜high の位置にある"""
+    return (price_change <= threshold) & (price_position.between(low, high))
+
+
+@operation('cross', dtype=bool)
+def _cross(diff, prev_diff, direction):
+    """差分の符号が前日から変わった日（direction が 'up' なら負から正、'down' なら正から負）"""
+    if direction == 'up':
+        return (prev_diff < 0) & (diff > 0)
+    return (prev_diff > 0) & (diff < 0)
+
+
+@operation('gain')
+def _gain(delta):
+    return delta.clip(lower=0)
+
+
+@operation('loss')
+def _loss(delta):
+    return (-delta).clip(lower=0)
+
+
+@operation('rsi')
+def _rsi(avg_gain, avg_loss):
+    return 100 - 100 / (1 + avg_gain / avg_loss)
+
+
+@operation('true_range')
+def _true_range(high, low, prev_close):
+    return pd.concat([high - low, (high - prev_close).abs(), (low - prev_close).abs()], axis=1).max(axis=1, skipna=False)
+
+
+# ---- 指標 ----
+
+# 移動平均
+for _window in [5, 25, 75, 200]:
+    register(f'SMA{_window}', node('rolling_mean', 'Close', window=_window))
+
+# ボリンジャーバンド（中心は SMA25 と同じ Node）
+register('BB_middle', node('rolling_mean', 'Close', window=25))
+_bb_std = node('rolling_std', 'Close', window=25)
+register('BB_upper', node('add_scaled', 'BB_middle', _bb_std, scale=2.0))
+register('BB_lower', node('add_scaled', 'BB_middle', _bb_std, scale=-2.0))
+
+# バンドウォーク（上部と下部で変動率とバンド内の位置を共有）
+_price_change = node('abs', node('pct_change', 'Close', periods=25))
+_price_position = node('band_position', 'Close', 'BB_upper', 'BB_lower')
+register('UpperBandWalk', node('band_walk', _price_change, _price_position, threshold=0.05, low=0.8, high=0.9))
+register('LowerBandWalk', node('band_walk', _price_change, _price_position, threshold=0.05, low=0.1, high=0.2))
+
+# MACD（ヒストグラムとクロスオーバーの差分は同じ Node）
+register('MACD', node('sub', node('ema', 'Close', span=12), node('ema', 'Close', span=26)))
+register('MACD_signal', node('ema', 'MACD', span=9))
+register('MACD_histogram', node('sub', 'MACD', 'MACD_signal'))
+_macd_diff = INDICATORS['MACD_histogram']
+_prev_macd_diff = node('shift', _macd_diff, periods=1)
+register('MACD_golden_cross', node('cross', _macd_diff, _prev_macd_diff, direction='up'))
+register('MACD_dead_cross', node('cross', _macd_diff, _prev_macd_diff, direction='down'))
+
+# RSI・ATR（前日の終値は両方で共有）
+_prev_close = node('shift', 'Close', periods=1)
+_delta = node('sub', 'Close', _prev_close)
+register('RSI14', node('rsi', node('wilder', node('gain', _delta), period=14), node('wilder', node('loss', _delta), period=14)))
+register('ATR14', node('wilder', node('true_range', 'High', 'Low', _prev_close), period=14))
@@ -1,9 +1,13 @@
 import os
-from typing import Dict, List
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, Tuple
 
 import numpy as np
 import pandas as pd
 
+from .indicators import evaluate, output_dtype, required_columns
+
 
 def calculate_sma(data: pd.DataFrame, window: int) -> pd.Series:
     """単純移動平均（SMA）を計算"""
@@ -102,51 +106,162 @@ def detect_band_walk(close: pd.Series, upper_band: pd.Series, lower_band: pd.Ser
     }
 
 
-def process_stock_data(df: pd.DataFrame) -> pd.DataFrame:
-    """株価データを読み込み、技術指標を計算"""
-    
-    # 会社ごとにグループ化して処理
-    result_dfs = []
-    for company in df['Code'].unique():
-        company_data = df[df['Code'] == company].copy()
-        
-        # 終値を使用して技術指標を計算
-        close_prices = company_data['Close']
-        
-        # 移動平均の計算
-        company_data['SMA5'] = calculate_sma(close_prices, 5)
-        company_data['SMA25'] = calculate_sma(close_prices, 25)
-        company_data['SMA75'] = calculate_sma(close_prices, 75)
-        company_data['SMA200'] = calculate_sma(close_prices, 200)
-        
-        # ボリンジャーバンドの計算
-        bb = calculate_bollinger_bands(close_prices)
-        company_data['BB_middle'] = bb['middle']
-        company_data['BB_upper'] = bb['upper']
-        company_data['BB_lower'] = bb['lower']
-        
-        # バンドウォークの検出（上部と下部）
-        band_walks = detect_band_walk(
-            close_prices,
-            company_data['BB_upper'],
-            company_data['BB_lower']
-        )
-        company_data['UpperBandWalk'] = band_walks['upper_band_walk']
-        company_data['LowerBandWalk'] = band_walks['lower_band_walk']
-        
-        # MACDの計算
-        macd = calculate_macd(close_prices)
-        company_data['MACD'] = macd['macd']
-        company_data['MACD_signal'] = macd['signal']
-        company_data['MACD_histogram'] = macd['histogram']
-        
-        # MACDのクロスオーバー検出
-        crossovers = detect_macd_crossovers(macd['macd'], macd['signal'])
-        company_data['MACD_golden_cross'] = crossovers['golden_cross']
-        company_data['MACD_dead_cross'] = crossovers['dead_cross']
-        
-        result_dfs.append(company_data)
-    
-    # 全データを結合
-    result_df = pd.concat(result_dfs)
+# process_stock_data が追加する列（indicators の登録名）
+INDICATOR_COLUMNS = [
+    'SMA5', 'SMA25', 'SMA75', 'SMA200',
+    'BB_middle', 'BB_upper', 'BB_lower',
+    'UpperBandWalk', 'LowerBandWalk',
+    'MACD', 'MACD_signal', 'MACD_histogram',
+    'MACD_golden_cross', 'MACD_dead_cross',
+]
+BOOL_INDICATOR_COLUMNS = [column for column in INDICATOR_COLUMNS if output_dtype(column) == bool]
+
+
+def compute_indicators(prices: pd.DataFrame, groups: np.ndarray, names: List[str] = INDICATOR_COLUMNS) -> Dict[str, np.ndarray]:
+    """銘柄ごとに並んだ株価から技術指標を計算
+
+    Args:
+        prices: 銘柄ごと（銘柄内は日付順）に並べた株価（計算に必要な列を含む）
+        groups: 各行の銘柄の番号（昇順）
+        names: 計算する指標名（indicators に登録した名前）
+
+    Returns:
+        Dict[str, np.ndarray]: 指標名をキーとする行の順の配列
+    """
+    return evaluate(prices, groups, names)
+
+
+def _attach_arrays(refs: Dict) -> Tuple[List[shared_memory.SharedMemory], Dict[str, np.ndarray]]:
+    """共有メモリに割り当てた配列を開く"""
+    blocks, arrays = [], {}
+    for key, (name, dtype, shape) in refs.items():
+        shm = shared_memory.SharedMemory(name=name)
+        blocks.append(shm)
+        arrays[key] = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    return blocks, arrays
+
+
+def _compute_shard(inputs: Dict, groups_ref: tuple, outputs: Dict, start: int, end: int) -> None:
+    """ワーカープロセスで start〜end 行目の技術指標を計算し、共有メモリの出力に書き込む"""
+    blocks, input_arrays = _attach_arrays(inputs)
+    try:
+        group_blocks, group_arrays = _attach_arrays({'groups': groups_ref})
+        blocks += group_blocks
+        output_blocks, output_arrays = _attach_arrays(outputs)
+        blocks += output_blocks
+
+        prices = pd.DataFrame({column: array[start:end] for column, array in input_arrays.items()})
+        indicators = compute_indicators(prices, group_arrays['groups'][start:end], list(outputs))
+        for name, array in output_arrays.items():
+            array[start:end] = indicators[name]
+        del prices, input_arrays, group_arrays, output_arrays
+    finally:
+        for shm in blocks:
+            shm.close()
+
+
+def _shard_bounds(groups: np.ndarray, n_shards: int) -> List[Tuple[int, int]]:
+    """銘柄の途中で分かれないように、行数がほぼ等しい範囲に分ける"""
+    starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]]) if len(groups) else np.array([0])
+    targets = np.arange(1, n_shards) * len(groups) / n_shards
+    cuts = np.unique(starts[np.minimum(np.searchsorted(starts, targets), len(starts) - 1)])
+    edges = [0] + [int(cut) for cut in cuts if 0 < cut < len(groups)] + [len(groups)]
+    return [(start, end) for start, end in zip(edges[:-1], edges[1:]) if start < end]
+
+
+def _float_values(series: pd.Series) -> np.ndarray:
+    """列を共有メモリに置ける浮動小数点の配列にする（float32 などの型はそのまま）"""
+    values = series.to_numpy()
+    if values.dtype.kind != 'f':
+        values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+    return values
+
+
+def compute_indicators_parallel(prices: pd.DataFrame, groups: np.ndarray, max_workers: int,
+                                names: List[str] = INDICATOR_COLUMNS) -> Dict[str, np.ndarray]:
+    """銘柄ごとに分けた範囲をプロセスで並列に計算
+
+    計算に必要な列と銘柄の番号は共有メモリに置き、各ワーカーは担当する行の範囲だけを読み、
+    結果を共有メモリの出力配列の同じ範囲に書き込む（データフレームのやり取りや結合はしない）。
+    銘柄の途中では分けないため、結果は compute_indicators と同じになる。
+
+    Args:
+        prices: 銘柄ごと（銘柄内は日付順）に並べた株価（計算に必要な列を含む）
+        groups: 各行の銘柄の番号（昇順）
+        max_workers: プロセス数
+        names: 計算する指標名
+
+    Returns:
+        Dict[str, np.ndarray]: 指標名をキーとする行の順の配列
+    """
+    n = len(prices)
+    inputs = {column: _float_values(prices[column]) for column in required_columns(names)}
+    specs = {('input', column): values.dtype for column, values in inputs.items()}
+    specs[('groups', None)] = np.dtype(np.int64)
+    specs.update({('output', name): output_dtype(name) for name in names})
+
+    blocks = {}
+    try:
+        arrays = {}
+        for key, dtype in specs.items():
+            blocks[key] = shared_memory.SharedMemory(create=True, size=max(n * dtype.itemsize, 1))
+            arrays[key] = np.ndarray((n,), dtype=dtype, buffer=blocks[key].buf)
+        for column, values in inputs.items():
+            arrays[('input', column)][:] = values
+        arrays[('groups', None)][:] = groups
+
+        refs = {key: (blocks[key].name, specs[key].str, (n,)) for key in specs}
+        input_refs = {column: refs[('input', column)] for column in inputs}
+        output_refs = {name: refs[('output', name)] for name in names}
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(_compute_shard, input_refs, refs[('groups', None)], output_refs, start, end)
+                for start, end in _shard_bounds(groups, max_workers)
+            ]
+            for future in futures:
+                future.result()
+
+        # 共有メモリは解放するため、データフレームに渡す配列へ1回だけコピーする
+        indicators = {name: arrays[('output', name)].copy() for name in names}
+        del arrays
+        return indicators
+    finally:
+        for shm in blocks.values():
+            shm.close()
+            shm.unlink()
+
+
+def process_stock_data(df: pd.DataFrame, max_workers: int = 1, indicators: List[str] = None) -> pd.DataFrame:
+    """株価データを読み込み、技術指標を計算
+
+    最初に一度だけ銘柄ごとに並べ替え、各指標は銘柄の境界で区切った移動窓・指数平滑で
+    全銘柄をまとめて計算する。銘柄ごとに切り出して計算した場合と同じ結果になる
+    （銘柄は最初に現れた順、銘柄内の行は元の順、インデックスも元のまま）。
+    指標は indicators モジュールの登録から依存関係の順に計算し、共有する中間結果は1回だけ計算する。
+
+    Args:
+        df: Code・Close 列（指標によっては High・Low 列）を含む株価データ
+        max_workers: 2以上の場合は銘柄を分けてその数のプロセスで並列に計算する
+        indicators: 追加する指標名（None の場合は INDICATOR_COLUMNS。例: INDICATOR_COLUMNS + ['RSI14', 'ATR14']）
+    """
+    if max_workers < 1:
+        raise ValueError("max_workers には1以上の値を指定してください。")
+
+    # 銘柄を最初に現れた順の番号にして、安定ソートで銘柄ごとに並べる
+    group_ids, _ = pd.factorize(df['Code'])
+    order = np.argsort(group_ids, kind='stable')
+    order = order[group_ids[order] >= 0]
+    result_df = df.iloc[order].copy()
+    groups = group_ids[order].astype(np.int64)
+
+    # 技術指標を計算
+    names = list(INDICATOR_COLUMNS if indicators is None else indicators)
+    prices = result_df[required_columns(names)]
+    if max_workers > 1:
+        values = compute_indicators_parallel(prices, groups, max_workers, names)
+    else:
+        values = compute_indicators(prices, groups, names)
+
+    for name in names:
+        result_df[name] = values[name]
     return result_df
@@ -0,0 +1,202 @@
+"""
+シグナルのビットマップでスクリーニングするモジュール
+
+直近 N 営業日の各シグナル（MACD のクロス・バンドウォークなど）を、営業日ごとに
+「その日にシグナルが出た銘柄」のビット列（銘柄数ビット）として持っておく。条件は
+Signal を & | ~ で組み合わせ、within(n) で「直近 n 営業日のどこかで成立」にまとめる。
+評価はビット列の論理演算だけなので、データフレームを走査せずにすぐ結果が返る。
+
+    golden_upper = (Signal('MACD_golden_cross') & Signal('UpperBandWalk')).within(3)
+    index = SignalIndex.load(index_file)
+    codes = index.codes_matching(golden_upper)
+
+同じ日に両方のシグナルが出た銘柄は (A & B).within(n)、別々の日でもよい場合は
+A.within(n) & B.within(n) と書く。
+"""
+import os
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+# ビットマップに含めるシグナルの列
+SIGNAL_COLUMNS = ['UpperBandWalk', 'LowerBandWalk', 'MACD_golden_cross', 'MACD_dead_cross']
+
+# ビットマップに含める直近の営業日数
+INDEX_DAYS = 20
+
+
+class Query(ABC):
+    """スクリーニングの条件（& | ~ と within で組み合わせる）"""
+
+    def __and__(self, other):
+        return _Combine(np.bitwise_and, self, other)
+
+    def __or__(self, other):
+        return _Combine(np.bitwise_or, self, other)
+
+    def __invert__(self):
+        return _Not(self)
+
+    def within(self, days):
+        """直近 days 営業日のいずれかの日に条件が成立した銘柄"""
+        return _Within(self, days)
+
+    @abstractmethod
+    def evaluate(self, index):
+        """
+        条件を評価する
+
+        Args:
+            index (SignalIndex): ビットマップ
+
+        Returns:
+            np.ndarray: [営業日 × 銘柄のビット列] の uint8 配列（within で1日分にまとめた場合は1行）
+        """
+
+
+class Signal(Query):
+    """1つのシグナルの列"""
+
+    def __init__(self, name):
+        self.name = name
+
+    def evaluate(self, index):
+        if self.name not in index.bitmaps:
+            raise KeyError(f"ビットマップにないシグナルです: {self.name}")
+        return index.bitmaps[self.name]
+
+
+class _Combine(Query):
+    def __init__(self, func, left, right):
+        self.func = func
+        self.left = left
+        self.right = right
+
+    def evaluate(self, index):
+        # 1日分にまとめた条件と営業日ごとの条件は、1日分の条件をすべての日に当てはめる
+        return self.func(self.left.evaluate(index), self.right.evaluate(index))
+
+
+class _Not(Query):
+    def __init__(self, query):
+        self.query = query
+
+    def evaluate(self, index):
+        # 銘柄数を超える末尾のビットは立てない
+        return np.bitwise_and(np.bitwise_not(self.query.evaluate(index)), index.valid_bits)
+
+
+class _Within(Query):
+    def __init__(self, query, days):
+        if days < 1:
+            raise ValueError("days には1以上の値を指定してください。")
+        self.query = query
+        self.days = days
+
+    def evaluate(self, index):
+        if self.days > len(index.dates):
+            raise ValueError(f"ビットマップにある営業日（{len(index.dates)}日）より長い期間は指定できません: {self.days}")
+        bits = self.query.evaluate(index)
+        return np.bitwise_or.reduce(bits[-self.days:], axis=0, keepdims=True)
+
+
+class SignalIndex:
+    """
+    直近の営業日ごとのシグナルのビットマップ
+
+    Attributes:
+        codes: 証券コードの配列（昇順。ビットの位置に対応）
+        dates: 営業日の配列（datetime64[D]、昇順。ビットマップの行に対応）
+        bitmaps: シグナル名をキー、[営業日 × 銘柄のビット列] の uint8 配列を値とする辞書
+    """
+
+    def __init__(self, codes, dates, bitmaps):
+        self.codes = np.asarray(codes, dtype=str)
+        self.dates = np.asarray(dates, dtype="datetime64[D]")
+        self.bitmaps = bitmaps
+        self.valid_bits = np.packbits(np.ones(len(self.codes), dtype=bool))[None, :]
+
+    @property
+    def latest_date(self):
+        """ビットマップの最新の営業日（営業日がない場合は None）"""
+        return pd.Timestamp(self.dates[-1]) if len(self.dates) else None
+
+    @classmethod
+    def from_frame(cls, df, signals=SIGNAL_COLUMNS, days=INDEX_DAYS):
+        """
+        株価・指標のデータからビットマップを作成する
+
+        Args:
+            df (pd.DataFrame): Code・Date とシグナルの列を含むデータ（直近 days 営業日を含む期間）
+            signals (list): ビットマップにするシグナルの列名
+            days (int): ビットマップに含める直近の営業日数
+
+        Returns:
+            SignalIndex: ビットマップ
+        """
+        row_dates = pd.to_datetime(df["Date"]).to_numpy().astype("datetime64[D]")
+        dates = np.unique(row_dates)[-days:]
+        recent = row_dates >= dates[0] if len(dates) else np.zeros(len(df), dtype=bool)
+        row_codes = np.asarray(df["Code"].astype(str), dtype=str)[recent]
+        codes = np.unique(row_codes)
+
+        code_index = np.searchsorted(codes, row_codes)
+        date_index = np.searchsorted(dates, row_dates[recent])
+        bitmaps = {}
+        for signal in signals:
+            matrix = np.zeros((len(dates), len(codes)), dtype=bool)
+            hits = df[signal].fillna(False).to_numpy(dtype=bool)[recent]
+            matrix[date_index[hits], code_index[hits]] = True
+            bitmaps[signal] = np.packbits(matrix, axis=1)
+        return cls(codes, dates, bitmaps)
+
+    def codes_matching(self, query):
+        """
+        条件に合う銘柄を返す
+
+        within でまとめていない条件は最新の営業日で判定する。
+
+        Args:
+            query (Query): 条件
+
+        Returns:
+            list: 証券コードのリスト（昇順）
+        """
+        bits = query.evaluate(self)
+        if len(bits) == 0:
+            return []
+        matched = np.unpackbits(bits[-1], count=len(self.codes)).astype(bool)
+        return self.codes[matched].tolist()
+
+    def save(self, path):
+        """
+        ビットマップをファイルに保存する（一時ファイルに書き出してから置き換える）
+
+        Args:
+            path (str | Path): 保存先のファイル（.npz）
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(f, codes=self.codes, dates=self.dates,
+                     **{f"signal_{name}": bitmap for name, bitmap in self.bitmaps.items()})
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        保存したビットマップを読み込む
+
+        Args:
+            path (str | Path): 保存先のファイル（.npz）
+
+        Returns:
+            SignalIndex: ビットマップ
+        """
+        with np.load(path) as arrays:
+            bitmaps = {name[len("signal_"):]: arrays[name] for name in arrays.files if name.startswith("signal_")}
+            return cls(arrays["codes"], arrays["dates"], bitmaps)
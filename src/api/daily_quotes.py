@@ -0,0 +1,153 @@
+"""
+日次株価（/prices/daily_quotes）の取得を担当するモジュール
+"""
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from .http_client import get_client
+
+
+QUOTES_PATH = "/prices/daily_quotes"
+
+# 同時に実行するリクエスト数の既定値
+DEFAULT_MAX_WORKERS = 8
+
+
+def iter_daily_quotes(params, id_token):
+    """
+    daily_quotes のレスポンスを pagination_key を辿りながら1ページずつ返すジェネレータ
+
+    Args:
+        params (dict): リクエストパラメータ（code / date / from / to）
+        id_token (str): IDトークン
+
+    Yields:
+        list: 1ページ分の株価レコードのリスト
+    """
+    headers = {"Authorization": f"Bearer {id_token}"}
+    params = dict(params)
+
+    while True:
+        data = get_client().get_json(QUOTES_PATH, headers=headers, params=params)
+
+        records = data.get("daily_quotes", [])
+        if records:
+            yield records
+
+        pagination_key = data.get("pagination_key")
+        if not pagination_key:
+            break
+        params["pagination_key"] = pagination_key
+
+
+def iter_date_ranges(from_date, to_date, span_days=365):
+    """
+    期間を重複しない span_days 日ごとの区間に分割する
+
+    Args:
+        from_date (str): 開始日（YYYY-MM-DD形式）
+        to_date (str): 終了日（YYYY-MM-DD形式）
+        span_days (int): 1区間の日数
+
+    Yields:
+        tuple: (区間の開始日, 区間の終了日)
+    """
+    current_from = datetime.strptime(from_date, "%Y-%m-%d")
+    end = datetime.strptime(to_date, "%Y-%m-%d")
+
+    while current_from <= end:
+        current_to = min(current_from + timedelta(days=span_days), end)
+        yield current_from.strftime("%Y-%m-%d"), current_to.strftime("%Y-%m-%d")
+        current_from = current_to + timedelta(days=1)
+
+
+def fetch_daily_quotes(code, from_date, to_date, id_token):
+    """
+    指定された銘柄の日次株価データを取得する関数
+
+    Args:
+        code (str): 証券コード
+        from_date (str): 開始日（YYYY-MM-DD形式）
+        to_date (str): 終了日（YYYY-MM-DD形式）
+        id_token (str): IDトークン
+
+    Returns:
+        pd.DataFrame: 日次株価データ
+    """
+    # 日付範囲を1年ずつに分割して取得
+    all_data = []
+    for current_from, current_to in iter_date_ranges(from_date, to_date):
+        params = {
+            "code": code,
+            "from": current_from,
+            "to": current_to
+        }
+        for records in iter_daily_quotes(params, id_token):
+            all_data.extend(records)
+
+    return pd.DataFrame(all_data)
+
+
+def fetch_daily_quotes_by_date(date, id_token, codes=None):
+    """
+    指定日の全上場銘柄の日次株価データを取得する関数
+
+    Args:
+        date (str): 取得日（YYYY-MM-DD形式）
+        id_token (str): IDトークン
+        codes (set): 指定した場合はページごとにこの銘柄だけを残す
+
+    Returns:
+        pd.DataFrame: 日次株価データ（休場日は空）
+    """
+    frames = []
+    for records in iter_daily_quotes({"date": date}, id_token):
+        page = pd.DataFrame(records)
+        if codes is not None:
+            page = page[page["Code"].isin(codes)]
+        frames.append(page)
+
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
+
+
+def ordered_map(func, items, max_workers):
+    """
+    スレッドプールで func を並列実行し、結果を items の順に返すジェネレータ
+
+    先読みするタスク数を max_workers の2倍までに抑えるため、
+    保持する結果の数は対象数ではなく並列数で決まる。
+
+    Args:
+        func (callable): 各要素に適用する関数
+        items (list): 入力のリスト
+        max_workers (int): 同時に実行するタスク数の上限
+
+    Yields:
+        tuple: (入力の要素, 結果, 例外)。成功時の例外は None
+    """
+    if max_workers < 1:
+        raise ValueError("max_workers には1以上の値を指定してください。")
+
+    items = iter(items)
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for item in items:
+            pending.append((item, executor.submit(func, item)))
+            if len(pending) >= max_workers * 2:
+                break
+
+        while pending:
+            item, future = pending.popleft()
+            try:
+                yield item, future.result(), None
+            except Exception as e:
+                yield item, None, e
+
+            next_item = next(items, None)
+            if next_item is not None:
+                pending.append((next_item, executor.submit(func, next_item)))
@@ -0,0 +1,338 @@
+"""
+株価取得ジョブの定義と、複数ジョブをまとめて取得する実行モジュール
+
+各ジョブは「対象銘柄の選び方」「期間」「出力先」を宣言するだけで、実際の取得は
+全ジョブの (銘柄, 日付) の和集合から保存済みの分を除いた最小限のリクエストで行う。
+各ジョブの出力ファイルは、共有ストアに保存された株価から作成する。
+"""
+import argparse
+import os
+import sys
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable
+
+import pandas as pd
+
+# プロジェクトのルートディレクトリを取得
+project_root = Path(__file__).parent.parent.parent
+sys.path.append(str(project_root))
+
+from src.api.daily_quotes import DEFAULT_MAX_WORKERS
+from src.api.fetch_planner import merge_intervals, plan_requests, subtract_coverage
+from src.api.fetch_runs import FetchRun
+from src.api.quote_store import QuoteStore
+from src.storage import compact_frame, prices_exist, update_prices
+
+
+raw_data_dir = project_root / 'data' / 'raw'
+processed_data_dir = project_root / 'data' / 'processed'
+
+
+def load_listed_companies():
+    """
+    上場企業データを読み込んで分析用のデータフレームを作成する関数
+
+    Returns:
+        pd.DataFrame: 上場企業データのデータフレーム
+    """
+    df = pd.read_csv(
+        raw_data_dir / 'listed_companies.csv',
+        dtype={'Code': str},
+        parse_dates=['Date'],
+    )
+    return compact_frame(df)
+
+
+def load_top500_companies():
+    """
+    取引量上位500社のデータを読み込む関数
+
+    Returns:
+        pd.DataFrame: 取引量上位500社のデータフレーム
+    """
+    df = pd.read_csv(
+        processed_data_dir / 'turnover_top500_companies.csv',
+        dtype={'Code': str}
+    )
+    return compact_frame(df)
+
+
+def top500_universe(df_listed):
+    """取引量上位500社を対象銘柄として選ぶ"""
+    return df_listed[df_listed["Code"].isin(load_top500_companies()["Code"])]
+
+
+def market_universe(markets):
+    """
+    指定した市場区分の全銘柄を対象銘柄として選ぶ関数を作成する
+
+    Args:
+        markets (list): 市場区分名のリスト（例: ['プライム', 'スタンダード']）
+
+    Returns:
+        callable: 上場企業データから対象銘柄を抽出する関数
+    """
+    def select(df_listed):
+        return df_listed[df_listed["MarketCodeName"].isin(markets)]
+    return select
+
+
+@dataclass
+class FetchJob:
+    """
+    株価取得ジョブの定義
+
+    Attributes:
+        name: ジョブ名
+        universe: 上場企業データから対象銘柄を抽出する関数
+        from_date: 開始日（YYYY-MM-DD形式）
+        to_date: 終了日（YYYY-MM-DD形式）
+        output_file: 出力先のパス（拡張子なしの場合は Parquet で保存する）
+
+    出力する株価データは Code だけを持ち、銘柄名や業種は CompanyStore から結合する。
+    """
+    name: str
+    universe: Callable[[pd.DataFrame], pd.DataFrame]
+    from_date: str
+    to_date: str
+    output_file: Path
+
+
+def top500_job():
+    """取引量上位500社の直近2年分を取得するジョブ"""
+    return FetchJob(
+        name="top500",
+        universe=top500_universe,
+        from_date=(datetime.now() - timedelta(days=(365*2))).strftime("%Y-%m-%d"),
+        to_date=datetime.now().strftime("%Y-%m-%d"),
+        output_file=raw_data_dir / 'stock_prices',
+    )
+
+
+def market_2025q1_job():
+    """プライム・スタンダード・グロースの全銘柄の2025年Q1を取得するジョブ"""
+    return FetchJob(
+        name="2025q1",
+        universe=market_universe(['プライム', 'スタンダード', 'グロース']),
+        from_date="2025-01-01",
+        to_date="2025-03-31",
+        output_file=raw_data_dir / 'stock_prices_2025q1',
+    )
+
+
+def collect_needed_ranges(jobs, targets):
+    """
+    全ジョブで必要な銘柄ごとの期間の和集合を求める
+
+    Args:
+        jobs (list): FetchJob のリスト
+        targets (dict): ジョブ名をキー、対象企業のデータフレームを値とする辞書
+
+    Returns:
+        dict: 証券コードをキー、必要な (開始日, 終了日) のリストを値とする辞書
+    """
+    needed = {}
+    for job in jobs:
+        for code in targets[job.name]["Code"].unique():
+            needed.setdefault(code, []).append((job.from_date, job.to_date))
+    return {code: merge_intervals(intervals) for code, intervals in needed.items()}
+
+
+def fetch_missing_quotes(store, needed, id_token, max_workers=DEFAULT_MAX_WORKERS,
+                         mode=None, full_resync=False, job_names=()):
+    """
+    必要な期間のうち共有ストアにない分だけを取得して追記する
+
+    取得はチェックポイント付きの実行（FetchRun）として行い、中断しても再開できる。
+
+    Args:
+        store (QuoteStore): 共有ストア
+        needed (dict): 証券コードをキー、必要な (開始日, 終了日) のリストを値とする辞書
+        id_token (str): IDトークン
+        max_workers (int): 同時に実行するリクエスト数の上限
+        mode (str): 取得方式を固定する場合に指定（"code" / "date"）
+        full_resync (bool): True の場合は保存済みの期間を無視して取得し直す
+        job_names (tuple): 実行記録に残すジョブ名
+
+    Returns:
+        int: 追記した行数
+    """
+    missing = {}
+    for code, intervals in needed.items():
+        covered = None if full_resync else store.coverage.get(code)
+        code_missing = []
+        for from_date, to_date in intervals:
+            code_missing.extend(subtract_coverage(from_date, to_date, covered))
+        if code_missing:
+            missing[code] = merge_intervals(code_missing)
+
+    plan = plan_requests(missing, mode=mode)
+    if plan.is_empty():
+        print("株価データは最新です。")
+        return 0
+    print(f"取得計画: 日付単位 {len(plan.date_codes)}件 / 銘柄単位 {len(plan.code_ranges)}件"
+          f"（約{plan.request_count}リクエスト）")
+
+    run = FetchRun.create(plan, missing, job_names, runs_dir=store.runs_dir)
+    run.execute(id_token, max_workers=max_workers)
+    return run.merge_into(store)
+
+
+def materialize_job(job, store, df_target, full=False):
+    """
+    共有ストアからジョブの出力ファイルを作成する
+
+    出力済みのデータセットがある場合は、新しい日付の分だけを追記する。
+
+    Args:
+        job (FetchJob): ジョブ
+        store (QuoteStore): 共有ストア
+        df_target (pd.DataFrame): ジョブの対象企業のデータフレーム
+        full (bool): True の場合は出力全体を書き直す
+
+    Returns:
+        int: 出力した行数
+    """
+    order = df_target[["Code"]].drop_duplicates("Code").reset_index(drop=True)
+    order["Code"] = order["Code"].astype(str)
+    order["_order"] = order.index
+
+    df = store.read(order["Code"], job.from_date, job.to_date)
+    if df.empty:
+        return 0
+
+    # 銘柄ごとに日付順に並べる（対象企業の並び順を保つ）
+    df = df.merge(order, on="Code", how="inner")
+    df = df.sort_values(["_order", "Date"], kind="stable").drop(columns="_order")
+
+    return update_prices(df, job.output_file, full=full)
+
+
+def run_fetch_jobs(jobs, max_workers=DEFAULT_MAX_WORKERS, mode=None, full_resync=False, store=None,
+                   df_listed=None):
+    """
+    複数の取得ジョブをまとめて実行する
+
+    全ジョブの対象銘柄・期間の和集合から共有ストアにない分だけを取得し、
+    その後ジョブごとの出力ファイルを作成する。
+
+    Args:
+        jobs (list): FetchJob のリスト
+        max_workers (int): 同時に実行するリクエスト数の上限
+        mode (str): 取得方式を固定する場合に指定（"code" / "date"）
+        full_resync (bool): True の場合は保存済みの期間を無視して取得し直す
+        store (QuoteStore): 共有ストア（省略時は data/raw/daily_quotes）
+        df_listed (pd.DataFrame): 上場企業データ（省略時は listed_companies.csv を読み込む）
+
+    Returns:
+        dict: ジョブ名をキー、出力した行数を値とする辞書
+    """
+    # 環境変数からIDトークンを取得
+    id_token = os.getenv('JQUANTS_ID_TOKEN')
+    if not id_token:
+        raise ValueError("環境変数 JQUANTS_ID_TOKEN が設定されていません。")
+
+    store = store or QuoteStore()
+    if df_listed is None:
+        df_listed = load_listed_companies()
+    targets = {job.name: job.universe(df_listed) for job in jobs}
+
+    needed = collect_needed_ranges(jobs, targets)
+    fetch_missing_quotes(
+        store, needed, id_token,
+        max_workers=max_workers, mode=mode, full_resync=full_resync,
+        job_names=[job.name for job in jobs],
+    )
+    return materialize_jobs(jobs, store, targets, full=full_resync)
+
+
+def materialize_jobs(jobs, store, targets, full=False):
+    """
+    共有ストアから各ジョブの出力ファイルを作成する
+
+    Args:
+        jobs (list): FetchJob のリスト
+        store (QuoteStore): 共有ストア
+        targets (dict): ジョブ名をキー、対象企業のデータフレームを値とする辞書
+        full (bool): True の場合は出力全体を書き直す
+
+    Returns:
+        dict: ジョブ名をキー、出力した行数を値とする辞書
+    """
+    results = {}
+    for job in jobs:
+        n_rows = materialize_job(job, store, targets[job.name], full=full)
+        if n_rows:
+            print(f"[{job.name}] {n_rows}行のデータを保存しました: {job.output_file}")
+        elif prices_exist(job.output_file):
+            print(f"[{job.name}] 新しいデータはありません。")
+        else:
+            print(f"[{job.name}] データの取得に失敗しました。")
+        results[job.name] = n_rows
+    return results
+
+
+def resume_fetch_run(run_id=None, max_workers=DEFAULT_MAX_WORKERS, store=None, df_listed=None):
+    """
+    中断・失敗した取得を再開する
+
+    未完了・失敗の単位だけを取得し直し、シャードを共有ストアにまとめてから
+    その実行のジョブの出力ファイルを作成し直す。
+
+    Args:
+        run_id (str): 実行ID。None の場合は最新の未完了の実行を再開する
+        max_workers (int): 同時に実行するリクエスト数の上限
+        store (QuoteStore): 共有ストア（省略時は data/raw/daily_quotes）
+        df_listed (pd.DataFrame): 上場企業データ（省略時は listed_companies.csv を読み込む）
+
+    Returns:
+        dict: ジョブ名をキー、出力した行数を値とする辞書
+    """
+    id_token = os.getenv('JQUANTS_ID_TOKEN')
+    if not id_token:
+        raise ValueError("環境変数 JQUANTS_ID_TOKEN が設定されていません。")
+
+    store = store or QuoteStore()
+    run = FetchRun.load(run_id, runs_dir=store.runs_dir)
+    if run is None:
+        print("再開できる取得はありません。")
+        return {}
+
+    run.execute(id_token, max_workers=max_workers)
+    run.merge_into(store)
+
+    jobs = [JOBS[name]() for name in run.manifest["job_names"] if name in JOBS]
+    if df_listed is None:
+        df_listed = load_listed_companies()
+    targets = {job.name: job.universe(df_listed) for job in jobs}
+    return materialize_jobs(jobs, store, targets)
+
+
+# 名前で指定できるジョブ
+JOBS = {
+    "top500": top500_job,
+    "2025q1": market_2025q1_job,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="株価取得ジョブをまとめて実行する")
+    parser.add_argument("--jobs", default=",".join(JOBS), help="実行するジョブ名（カンマ区切り）")
+    parser.add_argument("--workers", type=int, default=DEFAULT_MAX_WORKERS, help="同時に実行するリクエスト数")
+    parser.add_argument("--mode", choices=["code", "date"], default=None, help="取得方式（省略時は自動）")
+    parser.add_argument("--full-resync", action="store_true", help="保存済みの期間を無視して取得し直す")
+    parser.add_argument("--resume", nargs="?", const="latest", default=None,
+                        help="中断した取得を再開する（実行IDを省略すると最新の未完了の実行）")
+    args = parser.parse_args()
+
+    if args.resume:
+        resume_fetch_run(None if args.resume == "latest" else args.resume, max_workers=args.workers)
+    else:
+        run_fetch_jobs(
+            [JOBS[name]() for name in args.jobs.split(",")],
+            max_workers=args.workers,
+            mode=args.mode,
+            full_resync=args.full_resync,
+        )
@@ -0,0 +1,207 @@
+"""
+株価取得の方式（銘柄単位 / 日付単位）を決定し、必要最小限のリクエストを計画するモジュール
+"""
+import math
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+from .trading_calendar import list_trading_days
+
+
+# 銘柄単位の取得で1リクエストあたりに含める日数（fetch_daily_quotes の分割単位）
+CODE_REQUEST_SPAN_DAYS = 365
+
+FETCH_MODE_CODE = "code"
+FETCH_MODE_DATE = "date"
+
+
+def list_business_days(from_date, to_date):
+    """
+    期間内の営業日（土日・祝日・年末年始を除く日付）を列挙する
+
+    Args:
+        from_date (str): 開始日（YYYY-MM-DD形式）
+        to_date (str): 終了日（YYYY-MM-DD形式）
+
+    Returns:
+        list: 営業日の日付（YYYY-MM-DD形式）のリスト
+    """
+    return list_trading_days(from_date, to_date)
+
+
+def clip_to_trading_days(from_date, to_date):
+    """
+    期間の両端の休業日を除く
+
+    Args:
+        from_date (str): 開始日（YYYY-MM-DD形式）
+        to_date (str): 終了日（YYYY-MM-DD形式）
+
+    Returns:
+        tuple: 最初と最後の営業日の (開始日, 終了日)。営業日がない場合は None
+    """
+    days = list_business_days(from_date, to_date)
+    if not days:
+        return None
+    return days[0], days[-1]
+
+
+def estimate_request_counts(n_codes, from_date, to_date):
+    """
+    各取得方式で必要となるリクエスト数を見積もる
+
+    Args:
+        n_codes (int): 対象銘柄数
+        from_date (str): 開始日（YYYY-MM-DD形式）
+        to_date (str): 終了日（YYYY-MM-DD形式）
+
+    Returns:
+        dict: 取得方式ごとのリクエスト数
+    """
+    span_days = (datetime.strptime(to_date, "%Y-%m-%d") - datetime.strptime(from_date, "%Y-%m-%d")).days
+    chunks_per_code = max(1, math.ceil((span_days + 1) / (CODE_REQUEST_SPAN_DAYS + 1)))
+    return {
+        FETCH_MODE_CODE: n_codes * chunks_per_code,
+        FETCH_MODE_DATE: len(list_business_days(from_date, to_date)),
+    }
+
+
+def plan_fetch_mode(n_codes, from_date, to_date):
+    """
+    銘柄数と期間から、リクエスト数が少なくなる取得方式を選択する
+
+    Args:
+        n_codes (int): 対象銘柄数
+        from_date (str): 開始日（YYYY-MM-DD形式）
+        to_date (str): 終了日（YYYY-MM-DD形式）
+
+    Returns:
+        str: FETCH_MODE_CODE または FETCH_MODE_DATE
+    """
+    counts = estimate_request_counts(n_codes, from_date, to_date)
+    if counts[FETCH_MODE_DATE] < counts[FETCH_MODE_CODE]:
+        return FETCH_MODE_DATE
+    return FETCH_MODE_CODE
+
+
+def _shift_date(date, days):
+    return (datetime.strptime(date, "%Y-%m-%d") + timedelta(days=days)).strftime("%Y-%m-%d")
+
+
+def merge_intervals(intervals):
+    """
+    日付区間の和集合を求める（隣接する区間や、間が休業日だけの区間もつなげる）
+
+    Args:
+        intervals (list): (開始日, 終了日) のリスト
+
+    Returns:
+        list: 重ならないように併合した (開始日, 終了日) のリスト
+    """
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and (start <= _shift_date(merged[-1][1], 1)
+                       or not list_business_days(_shift_date(merged[-1][1], 1), _shift_date(start, -1))):
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def subtract_coverage(from_date, to_date, covered):
+    """
+    取得したい期間から保存済みの期間を除いた、未取得の期間を求める
+
+    保存済みの期間の間に欠けている期間があれば、その期間だけを未取得とする。
+
+    Args:
+        from_date (str): 取得したい期間の開始日（YYYY-MM-DD形式）
+        to_date (str): 取得したい期間の終了日（YYYY-MM-DD形式）
+        covered (list): 保存済みの (開始日, 終了日) のリスト（昇順で重ならない）。None の場合は未保存
+
+    Returns:
+        list: 未取得の (開始日, 終了日) のリスト
+    """
+    missing = []
+    start = from_date
+    for first, last in covered or []:
+        if last < start:
+            continue
+        if first > to_date:
+            break
+        if start < first:
+            missing.append((start, _shift_date(first, -1)))
+        start = max(start, _shift_date(last, 1))
+    if start <= to_date:
+        missing.append((start, to_date))
+    return missing
+
+
+@dataclass
+class FetchPlan:
+    """
+    株価取得のリクエスト計画
+
+    Attributes:
+        date_codes: 日付単位で取得する日付と、その日に必要な証券コードの集合
+        code_ranges: 銘柄単位で取得する (証券コード, 開始日, 終了日) のリスト
+    """
+    date_codes: dict = field(default_factory=dict)
+    code_ranges: list = field(default_factory=list)
+
+    @property
+    def request_count(self):
+        """計画どおりに取得した場合のリクエスト数（ページ送りを除く）"""
+        n_code_requests = sum(
+            estimate_request_counts(1, from_date, to_date)[FETCH_MODE_CODE]
+            for _, from_date, to_date in self.code_ranges
+        )
+        return len(self.date_codes) + n_code_requests
+
+    def is_empty(self):
+        return not self.date_codes and not self.code_ranges
+
+
+def plan_requests(missing, mode=None):
+    """
+    銘柄ごとの未取得期間から、リクエスト数が最小になるよう取得方法を計画する
+
+    未取得期間は両端の休業日を除いてから、同じ期間を持つ銘柄をまとめ、まとまりごとに
+    銘柄単位・日付単位を選ぶ。
+    日付単位で取得する日はその日の全銘柄が返るため、その日だけで期間が埋まる
+    銘柄は銘柄単位のリクエストを出さずに相乗りさせる。
+
+    Args:
+        missing (dict): 証券コードをキー、未取得の (開始日, 終了日) のリストを値とする辞書
+        mode (str): 取得方式を固定する場合に指定（"code" / "date"）
+
+    Returns:
+        FetchPlan: リクエスト計画
+    """
+    # 休業日だけの期間（週末・連休など）はリクエストしない
+    groups = {}
+    for code, intervals in missing.items():
+        for from_date, to_date in intervals:
+            interval = clip_to_trading_days(from_date, to_date)
+            if interval is not None:
+                groups.setdefault(interval, []).append(code)
+
+    plan = FetchPlan()
+    code_groups = []
+    for (from_date, to_date), codes in sorted(groups.items()):
+        group_mode = mode or plan_fetch_mode(len(codes), from_date, to_date)
+        if group_mode == FETCH_MODE_DATE:
+            for date in list_business_days(from_date, to_date):
+                plan.date_codes.setdefault(date, set()).update(codes)
+        else:
+            code_groups.append((from_date, to_date, codes))
+
+    for from_date, to_date, codes in code_groups:
+        dates = list_business_days(from_date, to_date)
+        if dates and all(date in plan.date_codes for date in dates):
+            for date in dates:
+                plan.date_codes[date].update(codes)
+        else:
+            plan.code_ranges.extend((code, from_date, to_date) for code in codes)
+
+    return plan
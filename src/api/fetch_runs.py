@@ -0,0 +1,296 @@
+"""
+チェックポイント付きで株価を取得し、中断しても再開できるようにするモジュール
+
+取得計画の各単位（日付単位・銘柄単位のリクエスト）を完了するたびに個別のファイル
+（シャード）として保存し、どの単位が成功・失敗したかを実行記録（manifest.json）に残す。
+クラッシュやトークン切れで中断した場合も、再開時は未完了・失敗の単位だけを取得し直し、
+最後にシャードを共有ストアへまとめる。
+"""
+import json
+import shutil
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from .daily_quotes import DEFAULT_MAX_WORKERS, fetch_daily_quotes, fetch_daily_quotes_by_date, ordered_map
+
+
+DEFAULT_RUNS_DIR = Path(__file__).parent.parent.parent / 'data' / 'raw' / 'runs'
+
+# 実行記録を保存する間隔（秒）。シャードの有無が完了の正なので、間引いても再開できる
+MANIFEST_SAVE_INTERVAL = 2.0
+
+STATUS_PENDING = "pending"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+STATUS_MERGED = "merged"
+
+
+def _date_unit_id(date):
+    return f"date_{date}"
+
+
+def _code_unit_id(code, from_date, to_date):
+    return f"code_{code}_{from_date}_{to_date}"
+
+
+def _last_date(quotes):
+    """株価データの最終日（YYYY-MM-DD形式。データがない場合は None）"""
+    if quotes.empty:
+        return None
+    return pd.to_datetime(quotes["Date"]).max().strftime("%Y-%m-%d")
+
+
+class FetchRun:
+    """
+    1回分の取得の実行記録とシャードを管理するクラス
+
+    Attributes:
+        run_id: 実行ID
+        run_dir: 実行記録とシャードを保存するディレクトリ
+        manifest: 実行記録（ジョブ名・未取得期間・単位ごとの状態）
+    """
+
+    def __init__(self, run_dir, manifest):
+        self.run_dir = Path(run_dir)
+        self.manifest = manifest
+        self._saved_at = 0.0
+
+    @property
+    def run_id(self):
+        return self.manifest["run_id"]
+
+    @property
+    def shard_dir(self):
+        return self.run_dir / 'shards'
+
+    @property
+    def units(self):
+        return self.manifest["units"]
+
+    @classmethod
+    def create(cls, plan, missing, job_names, runs_dir=DEFAULT_RUNS_DIR):
+        """
+        取得計画から新しい実行記録を作成する
+
+        Args:
+            plan (FetchPlan): リクエスト計画
+            missing (dict): 証券コードをキー、未取得の (開始日, 終了日) のリストを値とする辞書
+            job_names (list): この取得で出力するジョブ名
+            runs_dir (Path): 実行記録を保存するディレクトリ
+
+        Returns:
+            FetchRun: 作成した実行記録
+        """
+        run_id = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        units = {}
+        for date, codes in sorted(plan.date_codes.items()):
+            units[_date_unit_id(date)] = {
+                "kind": "date", "date": date, "codes": sorted(codes), "status": STATUS_PENDING,
+            }
+        for code, from_date, to_date in plan.code_ranges:
+            units[_code_unit_id(code, from_date, to_date)] = {
+                "kind": "code", "code": code, "from": from_date, "to": to_date, "status": STATUS_PENDING,
+            }
+
+        manifest = {
+            "run_id": run_id,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "job_names": list(job_names),
+            "missing": {code: [list(interval) for interval in intervals] for code, intervals in missing.items()},
+            "units": units,
+            "status": STATUS_PENDING,
+        }
+        run = cls(Path(runs_dir) / run_id, manifest)
+        run.shard_dir.mkdir(parents=True, exist_ok=True)
+        run.save_manifest()
+        return run
+
+    @classmethod
+    def load(cls, run_id=None, runs_dir=DEFAULT_RUNS_DIR):
+        """
+        実行記録を読み込む
+
+        Args:
+            run_id (str): 実行ID。None の場合は最新の未完了の実行を読み込む
+            runs_dir (Path): 実行記録を保存するディレクトリ
+
+        Returns:
+            FetchRun: 実行記録（見つからない場合は None）
+        """
+        runs_dir = Path(runs_dir)
+        if run_id is None:
+            candidates = sorted(runs_dir.glob("*/manifest.json"), reverse=True)
+            for manifest_path in candidates:
+                manifest = json.loads(manifest_path.read_text())
+                if manifest["status"] != STATUS_MERGED:
+                    return cls(manifest_path.parent, manifest)
+            return None
+
+        manifest_path = runs_dir / run_id / 'manifest.json'
+        if not manifest_path.exists():
+            return None
+        return cls(manifest_path.parent, json.loads(manifest_path.read_text()))
+
+    def save_manifest(self, force=True):
+        """
+        実行記録を保存する
+
+        Args:
+            force (bool): False の場合は前回の保存から一定時間経っていなければ保存しない
+        """
+        if not force and time.monotonic() - self._saved_at < MANIFEST_SAVE_INTERVAL:
+            return
+        manifest_path = self.run_dir / 'manifest.json'
+        tmp_path = manifest_path.with_name(manifest_path.name + ".tmp")
+        tmp_path.write_text(json.dumps(self.manifest, ensure_ascii=False, indent=1))
+        tmp_path.replace(manifest_path)
+        self._saved_at = time.monotonic()
+
+    def _shard_path(self, unit_id):
+        return self.shard_dir / f"{unit_id}.csv"
+
+    def _write_shard(self, unit_id, df):
+        tmp_path = self.shard_dir / f"{unit_id}.csv.tmp"
+        df.to_csv(tmp_path, index=False)
+        tmp_path.replace(self._shard_path(unit_id))
+
+    def _unit_last_date(self, unit_id):
+        """単位で取得できたデータの最終日（データがない場合は None）"""
+        unit = self.units[unit_id]
+        if "last_date" not in unit:
+            # 最終日を記録する前の実行記録や、実行記録の保存前に中断した単位はシャードから求める
+            shard_path = self._shard_path(unit_id)
+            shard = pd.read_csv(shard_path, usecols=["Date"]) if shard_path.exists() else pd.DataFrame()
+            unit["last_date"] = _last_date(shard)
+        return unit["last_date"]
+
+    def _sync_with_shards(self):
+        """実行記録の保存前に中断した場合に備え、シャードがある単位は完了として扱う"""
+        for unit_id, unit in self.units.items():
+            if unit["status"] in (STATUS_PENDING, STATUS_FAILED) and self._shard_path(unit_id).exists():
+                unit["status"] = STATUS_DONE
+                unit.pop("error", None)
+
+    def pending_units(self):
+        """未完了・失敗の単位IDのリストを返す"""
+        self._sync_with_shards()
+        return [unit_id for unit_id, unit in self.units.items() if unit["status"] in (STATUS_PENDING, STATUS_FAILED)]
+
+    def execute(self, id_token, max_workers=DEFAULT_MAX_WORKERS):
+        """
+        未完了・失敗の単位を取得し、完了した単位ごとにシャードを保存する
+
+        Args:
+            id_token (str): IDトークン
+            max_workers (int): 同時に実行するリクエスト数の上限
+
+        Returns:
+            int: 失敗した単位の数
+        """
+        unit_ids = self.pending_units()
+        print(f"[{self.run_id}] {len(unit_ids)}件のリクエスト単位を取得します")
+
+        def fetch_unit(unit_id):
+            unit = self.units[unit_id]
+            if unit["kind"] == "date":
+                return fetch_daily_quotes_by_date(unit["date"], id_token, codes=set(unit["codes"]))
+            print(f"Fetching data for {unit['code']} ({unit['from']} 〜 {unit['to']})...")
+            return fetch_daily_quotes(unit["code"], unit["from"], unit["to"], id_token)
+
+        n_failed = 0
+        try:
+            for unit_id, quotes, error in ordered_map(fetch_unit, unit_ids, max_workers):
+                unit = self.units[unit_id]
+                if error is not None:
+                    print(f"Error fetching data for {unit_id}: {error}")
+                    unit["status"] = STATUS_FAILED
+                    unit["error"] = f"{type(error).__name__}: {error}"
+                    n_failed += 1
+                else:
+                    # 休場日などでデータがない単位はシャードを作らずに完了とする
+                    if not quotes.empty:
+                        self._write_shard(unit_id, quotes)
+                    unit["status"] = STATUS_DONE
+                    unit["rows"] = len(quotes)
+                    unit["last_date"] = _last_date(quotes)
+                    unit.pop("error", None)
+                self.save_manifest(force=False)
+        finally:
+            self.save_manifest()
+
+        return n_failed
+
+    def merge_into(self, store):
+        """
+        完了した単位のシャードを共有ストアに追記し、取得済みの期間を更新する
+
+        失敗した単位がある場合は、その単位に関わる期間を取得済みとしない。
+        データが返らなかった期間（未公開の日付など）も取得済みとせず、取得できたデータの最終日までとする。
+
+        Args:
+            store (QuoteStore): 共有ストア
+
+        Returns:
+            int: 追記した行数
+        """
+        self._sync_with_shards()
+        done_ids = [unit_id for unit_id, unit in self.units.items() if unit["status"] == STATUS_DONE]
+
+        def iter_shards():
+            for unit_id in done_ids:
+                if self._shard_path(unit_id).exists():
+                    yield pd.read_csv(self._shard_path(unit_id), dtype={"Code": str})
+
+        n_rows = store.append(iter_shards())
+
+        # 取得済みの期間を更新する（当日分はまだ公開されていない可能性があるため前日まで）
+        # データが返らなかった期間（未公開の日付など）は取得済みとせず、
+        # 単位ごとに実際に取得できたデータの最終日までを取得済みとする
+        incomplete_codes = set()
+        incomplete_dates = []
+        code_last_dates = {}
+        date_last_dates = []
+        for unit_id, unit in self.units.items():
+            if unit["status"] not in (STATUS_DONE, STATUS_MERGED):
+                if unit["kind"] == "code":
+                    incomplete_codes.add(unit["code"])
+                else:
+                    incomplete_dates.append(unit["date"])
+                continue
+            last_date = self._unit_last_date(unit_id)
+            if last_date is None:
+                continue
+            if unit["kind"] == "code":
+                code_last_dates.setdefault(unit["code"], []).append(last_date)
+            else:
+                date_last_dates.append((last_date, set(unit["codes"])))
+
+        settled_date = store.settled_date()
+        for code, intervals in self.manifest["missing"].items():
+            if code in incomplete_codes:
+                continue
+            last_dates = code_last_dates.get(code, []) + [date for date, codes in date_last_dates if code in codes]
+            for from_date, to_date in intervals:
+                if any(from_date <= date <= to_date for date in incomplete_dates):
+                    continue
+                fetched = [date for date in last_dates if from_date <= date <= to_date]
+                if fetched:
+                    store.extend_coverage(code, from_date, min(max(fetched), settled_date))
+        store.save_coverage()
+
+        for unit_id in done_ids:
+            self.units[unit_id]["status"] = STATUS_MERGED
+        complete = not incomplete_codes and not incomplete_dates
+        self.manifest["status"] = STATUS_MERGED if complete else STATUS_FAILED
+        self.save_manifest()
+
+        if complete:
+            shutil.rmtree(self.shard_dir, ignore_errors=True)
+        else:
+            print(f"[{self.run_id}] 取得に失敗した単位があります。"
+                  f"python -m src.api.fetch_jobs --resume {self.run_id} で再開できます。")
+        return n_rows
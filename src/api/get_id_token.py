@@ -1,7 +1,7 @@
 import json
 import os
-import requests
 
+from .http_client import get_client
 from .token_utils import load_env, update_env_file
 
 
@@ -16,8 +16,9 @@ def get_id_token():
         return None
     
     # IDトークンを取得
-    r_post = requests.post(
-        f"https://api.jquants.com/v1/token/auth_refresh?refreshtoken={refresh_token}"
+    r_post = get_client().post(
+        "/token/auth_refresh",
+        params={"refreshtoken": refresh_token}
     )
     id_token = r_post.json().get("idToken")
     
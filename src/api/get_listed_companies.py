@@ -7,7 +7,13 @@ import sys
 import pandas as pd
 from pathlib import Path
 
-from token_utils import load_env
+# プロジェクトのルートディレクトリを取得
+project_root = Path(__file__).parent.parent.parent
+sys.path.append(str(project_root))
+
+from src.api.http_client import get_client
+from src.api.token_utils import load_env
+from src.storage import CompanyStore
 
 
 def get_listed_companies():
@@ -27,19 +33,19 @@ def get_listed_companies():
     
     # 上場銘柄一覧を取得
     headers = {"Authorization": f"Bearer {id_token}"}
-    r_get = requests.get(
-        "https://api.jquants.com/v1/listed/info",
-        headers=headers
-    )
-    
-    if r_get.status_code == 200:
-        companies = r_get.json().get("info", [])
-        print(f"{len(companies)}件の上場銘柄を取得しました。")
-        return companies
-    else:
-        print(f"上場銘柄一覧の取得に失敗しました。ステータスコード: {r_get.status_code}")
+    try:
+        data = get_client().get_json(
+            "/listed/info",
+            headers=headers
+        )
+    except requests.HTTPError as e:
+        print(f"上場銘柄一覧の取得に失敗しました。ステータスコード: {e.response.status_code}")
         return None
 
+    companies = data.get("info", [])
+    print(f"{len(companies)}件の上場銘柄を取得しました。")
+    return companies
+
 
 def save_to_csv(companies, filename="listed_companies.csv"):
     """上場銘柄一覧をCSVファイルに保存する
@@ -53,7 +59,7 @@ def save_to_csv(companies, filename="listed_companies.csv"):
         return
     
     # 保存先ディレクトリのパスを取得
-    save_dir = Path(__file__).parent.parent.parent / 'data' / 'raw'
+    save_dir = project_root / 'data' / 'raw'
     
     # ディレクトリが存在しない場合は作成
     # ensure_dir_exists(save_dir)
@@ -79,5 +85,9 @@ if __name__ == "__main__":
             print(f"銘柄コード: {company.get('Code')}, 銘柄名: {company.get('CompanyName')}")
     
         # CSVファイルに保存
-        save_to_csv(companies) 
+        save_to_csv(companies)
+
+        # 企業情報のストアには内容が変わった銘柄だけを追記する
+        n_versions = CompanyStore().update(df)
+        print(f"企業情報を{n_versions}件更新しました。")
 # %%
@@ -1,8 +1,8 @@
 from datetime import datetime, timedelta
 import json
 import os
-import requests
 
+from .http_client import get_client
 from .token_utils import load_env, update_env_file
 
 
@@ -17,8 +17,8 @@ def get_refresh_token():
     }
     
     # リフレッシュトークンを取得
-    r_post = requests.post(
-        "https://api.jquants.com/v1/token/auth_user",
+    r_post = get_client().post(
+        "/token/auth_user",
         data=json.dumps(data)
     )
     refresh_token = r_post.json().get("refreshToken")
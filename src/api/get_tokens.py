@@ -1,22 +1,18 @@
 # %%
-from .get_refresh_token import get_refresh_token
-from .get_id_token import get_id_token
+from .token_manager import TokenError, get_token_manager
 
 
 def get_all_tokens():
     """
-    リフレッシュトークンとIDトークンを順番に取得する
+    有効なIDトークンを用意する
+
+    保存済みのIDトークンが有効ならそのまま使い、切れている場合だけリフレッシュトークン
+    （さらに切れていればパスワードログイン）から再発行する。
     """
-    # リフレッシュトークンの取得
-    refresh_token = get_refresh_token()
-    if not refresh_token:
-        print("リフレッシュトークンの取得に失敗したため、処理を中止します。")
-        return False
-    
-    # IDトークンの取得
-    id_token = get_id_token()
-    if not id_token:
-        print("IDトークンの取得に失敗したため、処理を中止します。")
+    try:
+        get_token_manager().get_id_token()
+    except TokenError as e:
+        print(f"{e} 処理を中止します。")
         return False
     
     print("トークンの取得が完了しました。")
@@ -0,0 +1,278 @@
+"""
+J-Quants API への HTTP 通信を共通化するモジュール
+
+セッションを共有して接続を再利用し、レート制限・リトライ・バックオフをまとめて扱う。
+"""
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .response_cache import ResponseCache, get_cache_policy
+
+
+API_BASE_URL = "https://api.jquants.com/v1"
+
+# 1秒あたりのリクエスト数の上限と、瞬間的に許容するリクエスト数
+DEFAULT_RATE_PER_SEC = 5.0
+DEFAULT_BURST = 10
+
+# リトライの設定
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BACKOFF_BASE = 0.5
+DEFAULT_BACKOFF_MAX = 30.0
+DEFAULT_TIMEOUT = 30
+
+# 接続プールの大きさ（並列取得のスレッド数以上にする）
+DEFAULT_POOL_SIZE = 32
+
+# リトライ対象のステータスコード
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    トークンバケット方式のレートリミッター
+
+    rate_per_sec の速度でトークンが補充され、1リクエストごとに1トークンを消費する。
+    サーバーから Retry-After を受け取った場合は、その時刻まで全スレッドの送信を止める。
+    """
+
+    def __init__(self, rate_per_sec=DEFAULT_RATE_PER_SEC, burst=DEFAULT_BURST):
+        if rate_per_sec <= 0:
+            raise ValueError("rate_per_sec には正の値を指定してください。")
+        self.rate_per_sec = rate_per_sec
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated_at = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """トークンを1つ取得できるまで待機する"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity,
+                    self._tokens + (now - self._updated_at) * self.rate_per_sec,
+                )
+                self._updated_at = now
+
+                if now < self._blocked_until:
+                    wait = self._blocked_until - now
+                elif self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                else:
+                    wait = (1 - self._tokens) / self.rate_per_sec
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """
+        指定秒数のあいだ送信を止める
+
+        Args:
+            seconds (float): 停止する秒数
+        """
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+
+
+def parse_retry_after(value):
+    """
+    Retry-After ヘッダーの値を秒数に変換する
+
+    Args:
+        value (str): 秒数または HTTP-date 形式の値
+
+    Returns:
+        float: 待機する秒数（解釈できない場合は None）
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class JQuantsClient:
+    """
+    J-Quants API 用の HTTP クライアント
+
+    スレッド間で共有でき、接続プール・レート制限・指数バックオフ（ジッター付き）による
+    リトライを備える。cache を指定すると get_json のレスポンスをディスクにキャッシュする。
+    token_manager が登録されていれば、401 を受け取ったリクエストはIDトークンを
+    再発行して再送する。
+    """
+
+    def __init__(self, base_url=None, rate_per_sec=DEFAULT_RATE_PER_SEC, burst=DEFAULT_BURST,
+                 max_retries=DEFAULT_MAX_RETRIES, backoff_base=DEFAULT_BACKOFF_BASE,
+                 backoff_max=DEFAULT_BACKOFF_MAX, timeout=DEFAULT_TIMEOUT,
+                 pool_size=DEFAULT_POOL_SIZE, cache=None):
+        self.base_url = (base_url or os.getenv("JQUANTS_API_BASE_URL") or API_BASE_URL).rstrip("/")
+        self.limiter = TokenBucket(rate_per_sec, burst)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.cache = cache
+        self.token_manager = None
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _backoff(self, attempt):
+        """指数バックオフの待機秒数を計算する（フルジッター）"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def request(self, method, path, **kwargs):
+        """
+        リクエストを送信する。429/5xx や接続エラーの場合はリトライする
+
+        Args:
+            method (str): HTTPメソッド
+            path (str): base_url からの相対パス（例: "/listed/info"）
+            **kwargs: requests に渡す引数
+
+        Returns:
+            requests.Response: 最後に受け取ったレスポンス
+        """
+        url = f"{self.base_url}{path}"
+        kwargs.setdefault("timeout", self.timeout)
+        reauthenticated = False
+
+        for attempt in range(self.max_retries + 1):
+            id_token = self._bearer_token(kwargs)
+            if id_token and self.token_manager is not None:
+                # 再発行済みの古いトークンは最新のものに差し替えて送る
+                current = self.token_manager.current_token_for(id_token)
+                if current != id_token:
+                    self._set_bearer_token(kwargs, current)
+
+            self.limiter.acquire()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.max_retries:
+                    raise
+                wait = self._backoff(attempt)
+                print(f"通信エラーのため{wait:.1f}秒後に再試行します: {e}")
+                time.sleep(wait)
+                continue
+
+            if response.status_code == 401 and id_token and self.token_manager is not None and not reauthenticated:
+                print(f"IDトークンが無効なため、再発行して再試行します: {path}")
+                self._set_bearer_token(kwargs, self.token_manager.handle_unauthorized(self._bearer_token(kwargs)))
+                reauthenticated = True
+                continue
+
+            if response.status_code not in RETRY_STATUS_CODES or attempt == self.max_retries:
+                return response
+
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            wait = max(retry_after or 0.0, self._backoff(attempt))
+            if response.status_code == 429:
+                # 他のスレッドも含めて送信を止める
+                self.limiter.pause(wait)
+            print(f"ステータスコード {response.status_code} のため{wait:.1f}秒後に再試行します: {path}")
+            time.sleep(wait)
+
+        return response
+
+    @staticmethod
+    def _bearer_token(kwargs):
+        """リクエストの Authorization ヘッダーからIDトークンを取り出す"""
+        authorization = (kwargs.get("headers") or {}).get("Authorization", "")
+        if authorization.startswith("Bearer "):
+            return authorization[len("Bearer "):]
+        return None
+
+    @staticmethod
+    def _set_bearer_token(kwargs, id_token):
+        """リクエストの Authorization ヘッダーのIDトークンを置き換える"""
+        kwargs["headers"] = {**kwargs.get("headers", {}), "Authorization": f"Bearer {id_token}"}
+
+    def get(self, path, **kwargs):
+        """GETリクエストを送信する"""
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path, **kwargs):
+        """POSTリクエストを送信する"""
+        return self.request("POST", path, **kwargs)
+
+    def get_json(self, path, params=None, use_cache=True, **kwargs):
+        """
+        GETリクエストを送信し、成功した場合はレスポンスのJSONを返す
+
+        キャッシュが有効な場合は、キャッシュ済みのレスポンスがあればリクエストせずに返す。
+
+        Args:
+            path (str): base_url からの相対パス
+            params (dict): リクエストパラメータ
+            use_cache (bool): False の場合はキャッシュを使わない
+            **kwargs: requests に渡す引数
+
+        Raises:
+            requests.HTTPError: リトライ後もエラーのステータスコードが返った場合
+        """
+        cacheable, ttl = get_cache_policy(path, params)
+        cacheable = cacheable and use_cache and self.cache is not None
+
+        if cacheable:
+            data = self.cache.get(path, params)
+            if data is not None:
+                return data
+
+        response = self.get(path, params=params, **kwargs)
+        response.raise_for_status()
+        data = response.json()
+
+        if cacheable:
+            self.cache.set(path, params, data, ttl=ttl)
+        return data
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """
+    プロセス全体で共有する JQuantsClient を取得する
+
+    Returns:
+        JQuantsClient: 共有クライアント
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            cache = None if os.getenv("JQUANTS_DISABLE_CACHE") else ResponseCache()
+            _client = JQuantsClient(cache=cache)
+        return _client
+
+
+def set_client(client):
+    """
+    共有クライアントを差し替える（スタブサーバーに向けたベンチマークなどで使う）
+
+    Args:
+        client (JQuantsClient): 新しい共有クライアント
+    """
+    global _client
+    with _client_lock:
+        _client = client
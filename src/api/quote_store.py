@@ -0,0 +1,145 @@
+"""
+取得済みの日次株価をジョブ間で共有して保存するモジュール
+
+株価は企業情報を付けずに型付きの Parquet データセット（年ごとのパーティションと
+追記セグメント、src/storage/partitioned.py）に保存し、銘柄ごとに取得済みの期間
+（開始日〜終了日の区間のリスト）を別ファイルに記録する。読み込みは銘柄・期間で
+絞り込むため、必要なパーティション・行グループだけを読む。
+"""
+import json
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+from ..storage.partitioned import PartitionedDataset, is_partitioned_dataset
+from ..storage.price_store import normalize_dtypes
+from .fetch_planner import merge_intervals
+from .response_cache import today_jst
+
+
+DEFAULT_STORE_PATH = Path(__file__).parent.parent.parent / 'data' / 'raw' / 'daily_quotes'
+
+
+class QuoteStore:
+    """
+    日次株価の共有ストア
+
+    Attributes:
+        root: 株価データのデータセットのディレクトリ
+        coverage: 証券コードをキー、取得済みの (開始日, 終了日) のリスト（昇順）を値とする辞書
+    """
+
+    def __init__(self, root=DEFAULT_STORE_PATH):
+        self.root = Path(root)
+        self.dataset = PartitionedDataset(self.root)
+        self.coverage_file = self.root.with_name(self.root.name + ".coverage.json")
+        self.runs_dir = self.root.parent / 'runs'
+        self._migrate_csv()
+        self.coverage = self._load_coverage()
+
+    def _migrate_csv(self):
+        """以前の形式（CSV）のストアがあればデータセットに変換する"""
+        csv_file = self.root.with_name(self.root.name + ".csv")
+        if is_partitioned_dataset(self.root) or not csv_file.exists():
+            return
+        print(f"共有ストアを Parquet に変換します: {csv_file}")
+        df = pd.read_csv(csv_file, dtype={"Code": str})
+        df = df.drop_duplicates(["Code", "Date"], keep="last")
+        self.dataset.write(normalize_dtypes(df))
+        csv_file.unlink()
+
+    def _load_coverage(self):
+        if self.coverage_file.exists():
+            coverage = {}
+            for code, intervals in json.loads(self.coverage_file.read_text()).items():
+                # 以前の形式は1つの (開始日, 終了日)
+                if intervals and isinstance(intervals[0], str):
+                    intervals = [intervals]
+                coverage[code] = [tuple(interval) for interval in intervals]
+            return coverage
+        if not is_partitioned_dataset(self.root):
+            return {}
+
+        # 記録ファイルがない場合は株価データから再構築する（銘柄ごとに最初〜最後の日付）
+        df = self.dataset.load(columns=["Code", "Date"])
+        dates = df.groupby("Code")["Date"].agg(["min", "max"])
+        return {
+            code: [(row["min"].strftime("%Y-%m-%d"), row["max"].strftime("%Y-%m-%d"))]
+            for code, row in dates.iterrows()
+        }
+
+    def save_coverage(self):
+        """取得済みの期間を保存する"""
+        self.coverage_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.coverage_file.with_name(self.coverage_file.name + ".tmp")
+        tmp_file.write_text(json.dumps(
+            {code: [list(interval) for interval in intervals] for code, intervals in self.coverage.items()},
+            indent=2,
+            sort_keys=True,
+        ))
+        tmp_file.replace(self.coverage_file)
+
+    @staticmethod
+    def settled_date():
+        """
+        取得済みとみなしてよい最後の日付（前日）を返す
+
+        当日分はまだ公開されていない可能性があるため、次回の取得で取り直す。
+        """
+        return (datetime.strptime(today_jst(), "%Y-%m-%d") - timedelta(days=1)).strftime("%Y-%m-%d")
+
+    def extend_coverage(self, code, from_date, to_date):
+        """
+        銘柄の取得済みの期間に区間を加える
+
+        Args:
+            code (str): 証券コード
+            from_date (str): 取得した期間の開始日（YYYY-MM-DD形式）
+            to_date (str): 取得した期間の終了日（YYYY-MM-DD形式）
+        """
+        if from_date > to_date:
+            return
+        self.coverage[code] = merge_intervals(self.coverage.get(code, []) + [(from_date, to_date)])
+
+    def append(self, batches):
+        """
+        株価データのバッチを追記する
+
+        バッチはまとめて1つのセグメントとして書き込むため、途中で失敗しても既存データは壊れない。
+        セグメントがたまったら年のパーティションにまとめる。
+
+        Args:
+            batches (iterable): pd.DataFrame のバッチ
+
+        Returns:
+            int: 追記した行数
+        """
+        frames = [batch for batch in batches if not batch.empty]
+        if not frames:
+            return 0
+        df = normalize_dtypes(pd.concat(frames, ignore_index=True))
+        if is_partitioned_dataset(self.root):
+            self.dataset.append(df)
+            self.dataset.maybe_compact()
+        else:
+            self.dataset.write(df)
+        return len(df)
+
+    def read(self, codes, from_date, to_date):
+        """
+        指定した銘柄・期間の株価データを読み込む
+
+        同じ (Code, Date) が複数回保存されている場合は、後から追記したものを使う。
+
+        Args:
+            codes (iterable): 証券コード
+            from_date (str): 開始日（YYYY-MM-DD形式）
+            to_date (str): 終了日（YYYY-MM-DD形式）
+
+        Returns:
+            pd.DataFrame: 株価データ
+        """
+        if not is_partitioned_dataset(self.root):
+            return pd.DataFrame()
+        return self.dataset.load(codes=codes, start=from_date, end=to_date)
@@ -0,0 +1,203 @@
+"""
+API レスポンスをローカルディスクにキャッシュするモジュール
+
+確定済みの過去の株価は変わらないため無期限で保持し、当日分や上場銘柄一覧には
+有効期限（TTL）を設ける。キャッシュ全体の容量は上限を超えたら最も古く参照された
+エントリから削除する（LRU）。
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+
+DEFAULT_CACHE_DIR = Path(__file__).parent.parent.parent / 'data' / 'cache' / 'http'
+
+# キャッシュ全体の容量の上限（バイト）
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+# 有効期限（秒）
+RECENT_QUOTES_TTL = 60 * 60
+LISTED_INFO_TTL = 24 * 60 * 60
+
+JST = timezone(timedelta(hours=9))
+
+
+def today_jst():
+    """日本時間の今日の日付（YYYY-MM-DD形式）を取得する"""
+    return datetime.now(JST).strftime("%Y-%m-%d")
+
+
+def get_cache_policy(path, params):
+    """
+    エンドポイントとパラメータから、キャッシュの可否と有効期限を決める
+
+    Args:
+        path (str): エンドポイントのパス
+        params (dict): リクエストパラメータ
+
+    Returns:
+        tuple: (キャッシュするか, 有効期限の秒数。None の場合は無期限)
+    """
+    params = params or {}
+
+    if path == "/prices/daily_quotes":
+        last_date = params.get("date") or params.get("to")
+        if last_date and last_date.replace("-", "") < today_jst().replace("-", ""):
+            # 前日までの株価は確定しているため無期限
+            return True, None
+        return True, RECENT_QUOTES_TTL
+
+    if path == "/listed/info":
+        return True, LISTED_INFO_TTL
+
+    return False, None
+
+
+def make_cache_key(path, params):
+    """
+    エンドポイントと正規化したパラメータからキャッシュキーを作成する
+
+    Args:
+        path (str): エンドポイントのパス
+        params (dict): リクエストパラメータ
+
+    Returns:
+        str: キャッシュキー
+    """
+    normalized = json.dumps(
+        {"path": path, "params": {k: str(v) for k, v in (params or {}).items()}},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    JSON レスポンスのディスクキャッシュ
+
+    1レスポンスを1ファイルとして保存し、ファイルの更新時刻を最終参照時刻として LRU 削除に使う。
+    スレッド間で共有できる。
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total_bytes = None
+
+    def _entry_path(self, key):
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def _iter_entries(self):
+        if not self.cache_dir.exists():
+            return
+        yield from self.cache_dir.glob("*/*.json")
+
+    def _stat_entries(self):
+        """(最終参照時刻, サイズ, パス) のリストを返す。途中で削除されたファイルは除く"""
+        entries = []
+        for entry_path in self._iter_entries():
+            try:
+                stat = entry_path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry_path))
+        return entries
+
+    def get(self, path, params):
+        """
+        キャッシュされたレスポンスを取得する
+
+        Args:
+            path (str): エンドポイントのパス
+            params (dict): リクエストパラメータ
+
+        Returns:
+            dict: レスポンスのJSON（キャッシュがないか期限切れの場合は None）
+        """
+        entry_path = self._entry_path(make_cache_key(path, params))
+        try:
+            entry = json.loads(entry_path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+        expires_at = entry.get("expires_at")
+        if expires_at is not None and expires_at < time.time():
+            self._remove(entry_path)
+            return None
+
+        # 最終参照時刻を更新する
+        try:
+            os.utime(entry_path)
+        except FileNotFoundError:
+            return None
+        return entry["data"]
+
+    def set(self, path, params, data, ttl=None):
+        """
+        レスポンスをキャッシュに保存する
+
+        Args:
+            path (str): エンドポイントのパス
+            params (dict): リクエストパラメータ
+            data (dict): レスポンスのJSON
+            ttl (float): 有効期限の秒数（None の場合は無期限）
+        """
+        entry_path = self._entry_path(make_cache_key(path, params))
+        entry = {
+            "path": path,
+            "params": params,
+            "stored_at": time.time(),
+            "expires_at": None if ttl is None else time.time() + ttl,
+            "data": data,
+        }
+        body = json.dumps(entry, ensure_ascii=False).encode("utf-8")
+
+        entry_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = entry_path.with_name(f"{entry_path.name}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(body)
+
+        with self._lock:
+            old_size = entry_path.stat().st_size if entry_path.exists() else 0
+            tmp_path.replace(entry_path)
+            if self._total_bytes is not None:
+                self._total_bytes += len(body) - old_size
+            self._evict_if_needed()
+
+    def _remove(self, entry_path):
+        try:
+            size = entry_path.stat().st_size
+            entry_path.unlink()
+        except FileNotFoundError:
+            return
+        with self._lock:
+            if self._total_bytes is not None:
+                self._total_bytes -= size
+
+    def _evict_if_needed(self):
+        """容量の上限を超えていれば、最終参照が古い順に削除する（ロック取得済みで呼ぶ）"""
+        if self._total_bytes is None:
+            self._total_bytes = sum(size for _, size, _ in self._stat_entries())
+        if self._total_bytes <= self.max_bytes:
+            return
+
+        entries = sorted(self._stat_entries(), key=lambda entry: entry[0])
+        # 上限の9割まで削除して、削除処理が頻発しないようにする
+        target = self.max_bytes * 0.9
+        for _, size, entry_path in entries:
+            if self._total_bytes <= target:
+                break
+            entry_path.unlink(missing_ok=True)
+            self._total_bytes -= size
+
+    def clear(self):
+        """キャッシュをすべて削除する"""
+        with self._lock:
+            for entry_path in self._iter_entries():
+                entry_path.unlink(missing_ok=True)
+            self._total_bytes = 0
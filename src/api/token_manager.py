@@ -0,0 +1,191 @@
+"""
+リフレッシュトークン・IDトークンの有効期限を管理するモジュール
+
+発行時刻とあわせてトークンを保存しておき、有効なIDトークンがあれば再利用する。
+IDトークンが切れていればリフレッシュトークンから再発行し、リフレッシュトークンも
+切れている場合だけメールアドレスとパスワードでログインし直す。
+"""
+import json
+import os
+import threading
+import time
+
+from .http_client import get_client
+from .token_utils import get_env_path, load_env, update_env_file
+
+
+# トークンの有効期限（秒）。期限ぎりぎりで使わないよう余裕を持たせる
+ID_TOKEN_LIFETIME = 24 * 60 * 60
+REFRESH_TOKEN_LIFETIME = 7 * 24 * 60 * 60
+EXPIRY_MARGIN = 10 * 60
+
+
+class TokenError(Exception):
+    """トークンを取得できなかった場合の例外"""
+
+
+def get_token_state_path():
+    """トークンと発行時刻を保存するファイルのパスを取得"""
+    return get_env_path().with_name('.jquants_tokens.json')
+
+
+class TokenManager:
+    """
+    J-Quants API のトークンを管理するクラス
+
+    複数スレッドから同時に呼び出しても、再発行のリクエストは1回にまとめられる。
+    """
+
+    def __init__(self, state_path=None):
+        self.state_path = state_path or get_token_state_path()
+        self._lock = threading.RLock()
+        self._state = self._load_state()
+        # 再発行により置き換えられた古いIDトークン
+        self._superseded = set()
+
+    def _load_state(self):
+        load_env()
+        if self.state_path.exists():
+            return json.loads(self.state_path.read_text())
+
+        # 初回は .env のトークンを発行時刻不明として引き継ぐ
+        return {
+            "refresh_token": os.getenv("JQUANTS_REFRESH_TOKEN"),
+            "refresh_issued_at": None,
+            "id_token": None,
+            "id_issued_at": None,
+        }
+
+    def _save_state(self):
+        tmp_path = self.state_path.with_name(self.state_path.name + ".tmp")
+        tmp_path.write_text(json.dumps(self._state, indent=2))
+        os.chmod(tmp_path, 0o600)
+        tmp_path.replace(self.state_path)
+
+    @staticmethod
+    def _is_valid(issued_at, lifetime):
+        return issued_at is not None and time.time() < issued_at + lifetime - EXPIRY_MARGIN
+
+    def _login(self):
+        """メールアドレスとパスワードでログインし、リフレッシュトークンを取得する"""
+        data = {
+            "mailaddress": os.getenv("JQUANTS_EMAIL"),
+            "password": os.getenv("JQUANTS_PASSWORD")
+        }
+        r_post = get_client().post("/token/auth_user", data=json.dumps(data))
+        refresh_token = r_post.json().get("refreshToken") if r_post.ok else None
+        if not refresh_token:
+            raise TokenError(f"リフレッシュトークンの取得に失敗しました。ステータスコード: {r_post.status_code}")
+
+        self._state["refresh_token"] = refresh_token
+        self._state["refresh_issued_at"] = time.time()
+        update_env_file("JQUANTS_REFRESH_TOKEN", refresh_token)
+        os.environ["JQUANTS_REFRESH_TOKEN"] = refresh_token
+
+    def _refresh(self):
+        """リフレッシュトークンからIDトークンを取得する。失敗した場合は None を返す"""
+        refresh_token = self._state.get("refresh_token")
+        if not refresh_token:
+            return None
+
+        r_post = get_client().post("/token/auth_refresh", params={"refreshtoken": refresh_token})
+        if not r_post.ok:
+            return None
+        return r_post.json().get("idToken")
+
+    def _issue_id_token(self):
+        """IDトークンを再発行する（ロック取得済みで呼ぶ）"""
+        id_token = None
+        if self._state.get("refresh_issued_at") is None or self._is_valid(
+            self._state["refresh_issued_at"], REFRESH_TOKEN_LIFETIME
+        ):
+            id_token = self._refresh()
+            if id_token and self._state.get("refresh_issued_at") is None:
+                # 発行時刻不明のリフレッシュトークンは、使えた時点を発行時刻とみなす
+                self._state["refresh_issued_at"] = time.time()
+
+        if not id_token:
+            print("リフレッシュトークンが無効なため、ログインし直します。")
+            self._login()
+            id_token = self._refresh()
+        if not id_token:
+            raise TokenError("IDトークンの取得に失敗しました。")
+
+        if self._state.get("id_token"):
+            self._superseded.add(self._state["id_token"])
+        self._state["id_token"] = id_token
+        self._state["id_issued_at"] = time.time()
+        self._save_state()
+        update_env_file("JQUANTS_ID_TOKEN", id_token)
+        os.environ["JQUANTS_ID_TOKEN"] = id_token
+        return id_token
+
+    def get_id_token(self, force_refresh=False):
+        """
+        有効なIDトークンを取得する
+
+        Args:
+            force_refresh (bool): True の場合は有効期限内でも再発行する
+
+        Returns:
+            str: IDトークン
+
+        Raises:
+            TokenError: トークンを取得できなかった場合
+        """
+        with self._lock:
+            if not force_refresh and self._is_valid(self._state.get("id_issued_at"), ID_TOKEN_LIFETIME):
+                return self._state["id_token"]
+            return self._issue_id_token()
+
+    def handle_unauthorized(self, stale_token):
+        """
+        401 を受け取ったリクエストのために、新しいIDトークンを取得する
+
+        他のスレッドがすでに再発行していれば、そのトークンをそのまま返す。
+
+        Args:
+            stale_token (str): 401 になったリクエストで使ったIDトークン
+
+        Returns:
+            str: 新しいIDトークン
+        """
+        with self._lock:
+            current = self._state.get("id_token")
+            if current and stale_token != current:
+                return current
+            return self._issue_id_token()
+
+    def current_token_for(self, token):
+        """
+        渡されたIDトークンが再発行済みの古いものであれば、最新のIDトークンに置き換える
+
+        Args:
+            token (str): リクエストに使おうとしているIDトークン
+
+        Returns:
+            str: 送信に使うIDトークン
+        """
+        with self._lock:
+            if token in self._superseded:
+                return self._state["id_token"]
+            return token
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_token_manager():
+    """
+    プロセス全体で共有する TokenManager を取得し、共有 HTTP クライアントに登録する
+
+    Returns:
+        TokenManager: 共有トークンマネージャー
+    """
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = TokenManager()
+            get_client().token_manager = _manager
+        return _manager
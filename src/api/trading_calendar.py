@@ -0,0 +1,195 @@
+"""
+東証の営業日カレンダーを扱うモジュール
+
+土日・祝日（jpholiday）・年末年始の休業日（12/31〜1/3）を除いた営業日を、昇順の
+datetime64[D] の配列として一度だけ作成しておく。営業日の判定・営業日の番号・n 営業日前の
+日付・期間内の休業日などはこの配列の二分探索（np.searchsorted）で求めるため、
+日付の配列をまとめて渡しても1回の呼び出しで済む。
+
+jpholiday は任意の依存パッケージで、インストールされていない場合は土日と年末年始だけを
+休業日とする（祝日は営業日として扱うため、祝日の取得リクエストは空振りになる）。
+
+    calendar = get_trading_calendar()
+    calendar.sessions_between("2025-04-25", "2025-05-07")   # GW の祝日を除いた営業日
+    calendar.sessions_back("2025-05-07", 3)                   # 3営業日前の日付
+"""
+import threading
+from datetime import datetime
+
+import numpy as np
+
+from .response_cache import today_jst
+
+try:
+    import jpholiday
+    JPHOLIDAY_AVAILABLE = True
+except ImportError:
+    JPHOLIDAY_AVAILABLE = False
+
+
+# カレンダーを作成する期間（終了年は今年の翌年まで）
+CALENDAR_START = "2000-01-01"
+
+# 年末年始の休業日（月, 日）
+YEAR_END_HOLIDAYS = [(12, 31), (1, 1), (1, 2), (1, 3)]
+
+
+def _to_days(dates):
+    """日付（文字列・datetime・Timestamp またはその配列）を datetime64[D] にする"""
+    return np.asarray(dates, dtype="datetime64[ns]").astype("datetime64[D]")
+
+
+def build_holidays(start, end):
+    """
+    期間内の平日の休業日（祝日・年末年始）を求める
+
+    Args:
+        start (str): 開始日（YYYY-MM-DD形式）
+        end (str): 終了日（YYYY-MM-DD形式）
+
+    Returns:
+        np.ndarray: 休業日の配列（datetime64[D]、昇順）
+    """
+    start_date = datetime.strptime(start, "%Y-%m-%d").date()
+    end_date = datetime.strptime(end, "%Y-%m-%d").date()
+    holidays = [
+        f"{year}-{month:02d}-{day:02d}"
+        for year in range(start_date.year, end_date.year + 1)
+        for month, day in YEAR_END_HOLIDAYS
+    ]
+    if JPHOLIDAY_AVAILABLE:
+        holidays.extend(holiday[0].strftime("%Y-%m-%d") for holiday in jpholiday.between(start_date, end_date))
+
+    days = np.unique(np.array(holidays, dtype="datetime64[D]"))
+    days = days[(days >= np.datetime64(start)) & (days <= np.datetime64(end))]
+    return days[np.is_busday(days)]
+
+
+class TradingCalendar:
+    """
+    東証の営業日カレンダー
+
+    Attributes:
+        start: カレンダーの開始日（datetime64[D]）
+        end: カレンダーの終了日（datetime64[D]）
+        holidays: 平日の休業日の配列（datetime64[D]、昇順）
+        sessions: 営業日の配列（datetime64[D]、昇順）
+    """
+
+    def __init__(self, start=CALENDAR_START, end=None, holidays=None):
+        if end is None:
+            end = f"{int(today_jst()[:4]) + 1}-12-31"
+        self.start = np.datetime64(start, "D")
+        self.end = np.datetime64(end, "D")
+        self.holidays = build_holidays(str(self.start), str(self.end)) if holidays is None else _to_days(holidays)
+
+        days = np.arange(self.start, self.end + 1, dtype="datetime64[D]")
+        self.sessions = days[np.is_busday(days, holidays=self.holidays)]
+
+    def is_session(self, dates):
+        """
+        営業日かどうかを判定する
+
+        Args:
+            dates: 日付または日付の配列
+
+        Returns:
+            bool | np.ndarray: 営業日なら True
+        """
+        days = _to_days(dates)
+        index = np.searchsorted(self.sessions, days)
+        found = np.take(self.sessions, np.minimum(index, len(self.sessions) - 1)) == days
+        return found if found.ndim else bool(found)
+
+    def session_index(self, dates):
+        """
+        日付以前で最後の営業日の番号を返す（営業日の場合はその日の番号）
+
+        2つの日付の番号の差が、その間の営業日数になる。
+
+        Args:
+            dates: 日付または日付の配列
+
+        Returns:
+            int | np.ndarray: 営業日の番号（カレンダーの開始日より前の場合は -1）
+        """
+        index = np.searchsorted(self.sessions, _to_days(dates), side="right") - 1
+        return index if index.ndim else int(index)
+
+    def sessions_back(self, dates, n):
+        """
+        日付以前で最後の営業日から n 営業日前の日付を返す（n=0 の場合はその営業日）
+
+        Args:
+            dates: 日付または日付の配列
+            n (int): さかのぼる営業日数
+
+        Returns:
+            np.datetime64 | np.ndarray: 営業日（datetime64[D]）
+        """
+        index = self.session_index(dates) - n
+        if np.any(index < 0):
+            raise ValueError("カレンダーの開始日より前の営業日は求められません。")
+        return self.sessions[index]
+
+    def sessions_between(self, start, end):
+        """
+        期間内の営業日を返す
+
+        Args:
+            start: 開始日
+            end: 終了日
+
+        Returns:
+            np.ndarray: 営業日の配列（datetime64[D]、昇順）
+        """
+        lo = np.searchsorted(self.sessions, _to_days(start), side="left")
+        hi = np.searchsorted(self.sessions, _to_days(end), side="right")
+        return self.sessions[lo:hi]
+
+    def holidays_between(self, start, end):
+        """
+        期間内の平日の休業日を返す（チャートの rangebreaks に使う）
+
+        Args:
+            start: 開始日
+            end: 終了日
+
+        Returns:
+            np.ndarray: 休業日の配列（datetime64[D]、昇順）
+        """
+        lo = np.searchsorted(self.holidays, _to_days(start), side="left")
+        hi = np.searchsorted(self.holidays, _to_days(end), side="right")
+        return self.holidays[lo:hi]
+
+
+_calendar = None
+_calendar_lock = threading.Lock()
+
+
+def get_trading_calendar():
+    """
+    プロセス全体で共有する TradingCalendar を取得する
+
+    Returns:
+        TradingCalendar: 共有カレンダー
+    """
+    global _calendar
+    with _calendar_lock:
+        if _calendar is None:
+            _calendar = TradingCalendar()
+        return _calendar
+
+
+def list_trading_days(from_date, to_date):
+    """
+    期間内の営業日を列挙する
+
+    Args:
+        from_date (str): 開始日（YYYY-MM-DD形式）
+        to_date (str): 終了日（YYYY-MM-DD形式）
+
+    Returns:
+        list: 営業日の日付（YYYY-MM-DD形式）のリスト
+    """
+    return np.datetime_as_string(get_trading_calendar().sessions_between(from_date, to_date)).tolist()
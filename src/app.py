@@ -1,154 +1,150 @@
-from datetime import datetime, timedelta
+from datetime import datetime
 
-import jpholiday
 import pandas as pd
 from pathlib import Path
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import streamlit as st
 
+from analysis.indicator_view import IndicatorView
 from analysis.processer import process_stock_data
+from analysis.screening import INDEX_DAYS, SIGNAL_COLUMNS, Signal, SignalIndex
+from api.trading_calendar import get_trading_calendar
+from storage import CompanyStore, compact_frame, latest_price_date, load_prices
 
 
-def load_stock_prices_analyzed():
+# チャートで使う列（指標は選んだ銘柄の分だけ計算する）
+APP_COLUMNS = [
+    'Date', 'Code',
+    'Open', 'High', 'Low', 'Close', 'Volume',
+    'SMA5', 'SMA25', 'SMA75', 'BB_upper', 'BB_lower',
+    'UpperBandWalk', 'LowerBandWalk',
+    'MACD', 'MACD_signal', 'MACD_histogram', 'MACD_golden_cross', 'MACD_dead_cross',
+]
+
+# スクリーニングで使う列
+SCREENING_COLUMNS = ['Date', 'Code', *SIGNAL_COLUMNS]
+
+ANALYZED_PATH = Path(__file__).parent.parent / 'data' / 'processed' / 'stock_prices_analyzed'
+PRICES_PATH = Path(__file__).parent.parent / 'data' / 'raw' / 'stock_prices'
+
+# 処理時に作成したスクリーニング用のビットマップ
+SIGNAL_INDEX_FILE = Path(__file__).parent.parent / 'data' / 'processed' / 'signal_index.npz'
+
+# チャート用に計算した指標の保存先
+INDICATOR_CACHE_DIR = Path(__file__).parent.parent / 'data' / 'processed' / 'indicator_cache'
+
+# チャートを表示する開始日
+CHART_START_DATE = '2025-01-01'
+
+# 分析タイプごとのスクリーニング条件（日数は営業日）
+SCREENS = {
+    ('macd', 'golden'): Signal('MACD_golden_cross').within(1),
+    ('macd', 'dead'): Signal('MACD_dead_cross').within(1),
+    ('band_walk', 'upper'): Signal('UpperBandWalk').within(3),
+    ('band_walk', 'lower'): Signal('LowerBandWalk').within(3),
+    ('golden_upper', None): (Signal('MACD_golden_cross') & Signal('UpperBandWalk')).within(3),
+    ('dead_lower', None): (Signal('MACD_dead_cross') & Signal('LowerBandWalk')).within(3),
+}
+
+
+def load_stock_prices_analyzed(codes=None, start=None, end=None):
     """
     株価データを読み込む関数
-    
+
+    Args:
+        codes (list): 読み込む証券コード（None の場合はすべて）
+        start (str | datetime): 開始日（None の場合は最初から）
+        end (str | datetime): 終了日（None の場合は最後まで）
+
     Returns:
         pd.DataFrame: 株価データ
     """
-    file_name = 'stock_prices_analyzed.csv'
-    file_path = Path(__file__).parent.parent / 'data' / 'processed' / file_name
-    df = pd.read_csv(
-        file_path,
-        dtype={'Code': str,},
-        parse_dates=['Date'],
-    )
-    return df
+    df = load_prices(ANALYZED_PATH, columns=SCREENING_COLUMNS, codes=codes, start=start, end=end)
+    return compact_frame(df)
 
 
-def get_recent_cross_companies(df: pd.DataFrame, days: int = 1, cross_type: str = 'golden') -> pd.DataFrame:
+@st.cache_resource
+def get_indicator_view(latest_date):
     """
-    直近の指定日数でMACDのクロスが発生した企業を取得
-    
+    チャート用の指標のビューを返す関数
+
     Args:
-        df (pd.DataFrame): 株価データ
-        days (int): 直近何日分を確認するか（デフォルト: 1）
-        cross_type (str): クロスの種類（'golden', 'dead'）
-    
+        latest_date (pd.Timestamp): 株価データの最新日（更新されたら新しいビューを作る）
+
     Returns:
-        pd.DataFrame: クロスが発生した企業の情報
+        IndicatorView: 選んだ銘柄の指標だけを計算するビュー
     """
-    # 日付を文字列からdatetimeに変換
-    df['Date'] = pd.to_datetime(df['Date'])
-    
-    # 直近の日付を取得
-    latest_date = df['Date'].max()
-    start_date = latest_date - timedelta(days=days)
-    
-    # 直近の期間でクロスが発生した企業を抽出
-    recent_data = df[df['Date'] >= start_date]
-    
-    # クロスの種類に応じて条件を設定
-    if cross_type == 'golden':
-        cross_condition = recent_data['MACD_golden_cross'] == True
-    else:  # 'dead'
-        cross_condition = recent_data['MACD_dead_cross'] == True
-    
-    cross_companies = recent_data[cross_condition][['Code', 'CompanyName']].drop_duplicates()
-    
-    return cross_companies
+    return IndicatorView(lambda codes: load_prices(PRICES_PATH, codes=codes), cache_dir=INDICATOR_CACHE_DIR)
 
 
-def get_recent_band_walk_companies(df: pd.DataFrame, days: int = 3, band_type: str = 'upper') -> pd.DataFrame:
+@st.cache_resource
+def get_signal_index(latest_date):
     """
-    直近の指定日数でバンドウォークが発生した企業を取得
-    
+    スクリーニング用のシグナルのビットマップを返す関数
+
+    処理時に保存したビットマップが最新日のものであれば読み込み、なければ直近の期間から作成する。
+
     Args:
-        df (pd.DataFrame): 株価データ
-        days (int): 直近何日分を確認するか（デフォルト: 3）
-        band_type (str): バンドウォークの種類（'upper', 'lower'）
-    
+        latest_date (pd.Timestamp): 株価データの最新日（更新されたら読み込み直す）
+
     Returns:
-        pd.DataFrame: バンドウォークが発生した企業の情報
+        SignalIndex: 直近の営業日ごとのシグナルのビットマップ
     """
-    # 日付を文字列からdatetimeに変換
-    df['Date'] = pd.to_datetime(df['Date'])
-    
-    # 直近の日付を取得
-    latest_date = df['Date'].max()
-    start_date = latest_date - timedelta(days=days)
-    
-    # 直近の期間でバンドウォークが発生した企業を抽出
-    recent_data = df[df['Date'] >= start_date]
-    
-    # バンドウォークの種類に応じて条件を設定
-    if band_type == 'upper':
-        band_condition = recent_data['UpperBandWalk'] == True
-    else:  # 'lower'
-        band_condition = recent_data['LowerBandWalk'] == True
-    
-    band_walk_companies = recent_data[band_condition][['Code', 'CompanyName']].drop_duplicates()
-    
-    return band_walk_companies
+    if SIGNAL_INDEX_FILE.exists():
+        index = SignalIndex.load(SIGNAL_INDEX_FILE)
+        if index.latest_date == latest_date:
+            return index
+    df = load_stock_prices_analyzed(start=get_trading_calendar().sessions_back(latest_date, INDEX_DAYS - 1))
+    return SignalIndex.from_frame(df)
 
 
-def get_recent_golden_cross_upper_band_walk_companies(df: pd.DataFrame, days: int = 3) -> pd.DataFrame:
+def load_chart_data(code, start=CHART_START_DATE):
     """
-    直近の指定日数でMACDゴールデンクロスと上部バンドウォークの両方が発生した企業を取得
-    
+    チャートに表示する株価と指標を取得する関数
+
     Args:
-        df (pd.DataFrame): 株価データ
-        days (int): 直近何日分を確認するか（デフォルト: 3）
-    
+        code (str): 証券コード
+        start (str | datetime): 開始日
+
     Returns:
-        pd.DataFrame: 条件を満たす企業の情報
+        pd.DataFrame: 株価と指標のデータ
     """
-    # 日付を文字列からdatetimeに変換
-    df['Date'] = pd.to_datetime(df['Date'])
-    
-    # 直近の日付を取得
-    latest_date = df['Date'].max()
-    start_date = latest_date - timedelta(days=days)
-    
-    # 直近の期間で条件を満たす企業を抽出
-    recent_data = df[df['Date'] >= start_date]
-    
-    # ゴールデンクロスと上部バンドウォークの両方の条件
-    condition = (recent_data['MACD_golden_cross'] == True) & (recent_data['UpperBandWalk'] == True)
-    
-    target_companies = recent_data[condition][['Code', 'CompanyName']].drop_duplicates()
-    
-    return target_companies
+    view = get_indicator_view(latest_price_date(PRICES_PATH))
+    return compact_frame(view.frame([code], APP_COLUMNS, start=start))
 
 
-def get_recent_dead_cross_lower_band_walk_companies(df: pd.DataFrame, days: int = 3) -> pd.DataFrame:
+def screen_companies(analysis_type: str, option: str = None) -> pd.DataFrame:
     """
-    直近の指定日数でMACDデッドクロスと下部バンドウォークの両方が発生した企業を取得
-    
+    分析タイプに合う企業を取得する
+
     Args:
-        df (pd.DataFrame): 株価データ
-        days (int): 直近何日分を確認するか（デフォルト: 3）
-    
+        analysis_type (str): 分析タイプ（'macd', 'band_walk', 'golden_upper', 'dead_lower'）
+        option (str): クロス・バンドウォークの種類（'golden', 'dead', 'upper', 'lower'）
+
     Returns:
-        pd.DataFrame: 条件を満たす企業の情報
+        pd.DataFrame: Code・CompanyName 列を持つ企業の情報
     """
-    # 日付を文字列からdatetimeに変換
-    df['Date'] = pd.to_datetime(df['Date'])
-    
-    # 直近の日付を取得
-    latest_date = df['Date'].max()
-    start_date = latest_date - timedelta(days=days)
-    
-    # 直近の期間で条件を満たす企業を抽出
-    recent_data = df[df['Date'] >= start_date]
-    
-    # デッドクロスと下部バンドウォークの両方の条件
-    condition = (recent_data['MACD_dead_cross'] == True) & (recent_data['LowerBandWalk'] == True)
-    
-    target_companies = recent_data[condition][['Code', 'CompanyName']].drop_duplicates()
-    
-    return target_companies
+    index = get_signal_index(latest_price_date(ANALYZED_PATH))
+    codes = index.codes_matching(SCREENS[(analysis_type, option)])
+
+    # 銘柄名は企業情報のストアから取得する
+    return CompanyStore().lookup(codes, columns=['CompanyName'])
+
+
+@st.cache_data
+def get_chart_holidays(start, end):
+    """
+    チャートの rangebreaks に指定する平日の休業日を返す関数
+
+    Args:
+        start (pd.Timestamp): 表示する期間の開始日
+        end (pd.Timestamp): 表示する期間の終了日
+
+    Returns:
+        list: 休業日（YYYY-MM-DD形式）のリスト
+    """
+    return get_trading_calendar().holidays_between(start, end).astype(str).tolist()
 
 
 def plot_stock_info_streamlit(df, code, company_name, title: str = "株価チャート"):
@@ -160,14 +156,14 @@ def plot_stock_info_streamlit(df, code, company_name, title: str = "株価チャ
         title (str): グラフのタイトル
     """
     stock_data = df[df['Code'] == code].copy()
-    stock_data = stock_data.loc[stock_data['Date']>='2025-01-01']
+    stock_data = stock_data.loc[stock_data['Date']>=CHART_START_DATE]
 
 
     # 土日祝日を除外
     # df = remove_holidays(df)
 
-    # 祝日を取得
-    holidays = [holiday[0] for holiday in jpholiday.between(stock_data['Date'].min(), stock_data['Date'].max())]
+    # 祝日・年末年始の休業日を取得
+    holidays = get_chart_holidays(stock_data['Date'].min(), stock_data['Date'].max())
     
     # 日付を文字列に変換
     # stock_data["Date"] = stock_data["Date"].dt.strftime('%Y-%m-%d')
@@ -370,8 +366,6 @@ def main():
     
     st.title('株価チャート分析アプリ')
     
-    df_with_indicators = load_stock_prices_analyzed()
-    
     # 分析タイプの選択
     analysis_type = st.radio(
         "分析タイプを選択してください",
@@ -398,7 +392,7 @@ def main():
         )
         
         # 直近5営業日でクロスが発生した企業を取得
-        target_companies = get_recent_cross_companies(df_with_indicators, cross_type=cross_type)
+        target_companies = screen_companies(analysis_type, cross_type)
         
         if len(target_companies) == 0:
             st.warning(f"直近5営業日で{'ゴールデン' if cross_type == 'golden' else 'デッド'}クロスが発生した企業はありません。")
@@ -416,21 +410,21 @@ def main():
         )
         
         # 直近5営業日でバンドウォークが発生した企業を取得
-        target_companies = get_recent_band_walk_companies(df_with_indicators, band_type=band_type)
+        target_companies = screen_companies(analysis_type, band_type)
         
         if len(target_companies) == 0:
             st.warning(f"直近5営業日で{'上部' if band_type == 'upper' else '下部'}バンドウォークが発生した企業はありません。")
             return
     elif analysis_type == 'golden_upper':
         # 直近5営業日でゴールデンクロスと上部バンドウォークが発生した企業を取得
-        target_companies = get_recent_golden_cross_upper_band_walk_companies(df_with_indicators)
+        target_companies = screen_companies(analysis_type)
         
         if len(target_companies) == 0:
             st.warning("直近5営業日でゴールデンクロスと上部バンドウォークが同時に発生した企業はありません。")
             return
     else:  # dead_lower
         # 直近5営業日でデッドクロスと下部バンドウォークが発生した企業を取得
-        target_companies = get_recent_dead_cross_lower_band_walk_companies(df_with_indicators)
+        target_companies = screen_companies(analysis_type)
         
         if len(target_companies) == 0:
             st.warning("直近5営業日でデッドクロスと下部バンドウォークが同時に発生した企業はありません。")
@@ -438,14 +432,18 @@ def main():
     
     
     # 企業選択
-    company_options = [f"{row['CompanyName']} ({row['Code']})" for _, row in target_companies.iterrows()]
+    company_options = [
+        f"{name} ({code})" for code, name in zip(target_companies['Code'], target_companies['CompanyName'])
+    ]
     selected_company = st.selectbox("企業を選択してください", company_options)
     
     # 選択された企業のコードを取得
     selected_code = selected_company.split('(')[-1].strip(')')
     selected_name = selected_company.split('(')[0].strip()
 
-    plot_stock_info_streamlit(df_with_indicators, selected_code, selected_name)
+    # チャートは選択した銘柄だけを読み込み、使う指標だけを計算する
+    stock_data = load_chart_data(selected_code)
+    plot_stock_info_streamlit(stock_data, selected_code, selected_name)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,110 @@
+"""
+株価取得処理のスループットをスタブサーバーに対して計測するベンチマーク
+
+並列数ごとに取得ジョブ（fetch_stock_prices と同じ構成）を実行し、リクエスト数/秒・
+総実行時間・銘柄数/秒を表示する。
+
+    python -m src.bench.fetch_benchmark --codes 500 --days 730 --latency 0.05 --workers 1,4,8,16
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+from src.api.fetch_jobs import FetchJob, run_fetch_jobs
+from src.api.http_client import JQuantsClient, set_client
+from src.api.quote_store import QuoteStore
+from src.bench.jquants_stub_server import ID_TOKEN, StubConfig, StubServer
+
+
+def run_once(server, df_listed, from_date, to_date, max_workers, mode, rate_per_sec):
+    """
+    1つの並列数で取得ジョブを実行し、計測結果を返す
+
+    Args:
+        server (StubServer): 起動済みのスタブサーバー
+        df_listed (pd.DataFrame): 上場企業データ
+        from_date (str): 開始日（YYYY-MM-DD形式）
+        to_date (str): 終了日（YYYY-MM-DD形式）
+        max_workers (int): 同時に実行するリクエスト数の上限
+        mode (str): 取得方式（"code" / "date" / None）
+        rate_per_sec (float): クライアント側のレート制限
+
+    Returns:
+        dict: 計測結果
+    """
+    set_client(JQuantsClient(base_url=server.base_url, rate_per_sec=rate_per_sec, burst=max_workers))
+    server.state.reset_stats()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_dir = Path(tmp_dir)
+        job = FetchJob(
+            name="benchmark",
+            universe=lambda df: df,
+            from_date=from_date,
+            to_date=to_date,
+            output_file=tmp_dir / 'stock_prices',
+        )
+        start = time.perf_counter()
+        results = run_fetch_jobs(
+            [job],
+            max_workers=max_workers,
+            mode=mode,
+            store=QuoteStore(tmp_dir / 'daily_quotes'),
+            df_listed=df_listed,
+        )
+        elapsed = time.perf_counter() - start
+
+    return {
+        "workers": max_workers,
+        "wall_sec": round(elapsed, 3),
+        "requests": server.state.request_count,
+        "requests_per_sec": round(server.state.request_count / elapsed, 1),
+        "codes_per_sec": round(len(df_listed) / elapsed, 1),
+        "rows": results["benchmark"],
+        "status": dict(sorted(server.state.status_counts.items())),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="株価取得処理のベンチマーク")
+    parser.add_argument("--codes", type=int, default=500, help="対象銘柄数")
+    parser.add_argument("--days", type=int, default=365 * 2, help="取得期間（日数）")
+    parser.add_argument("--workers", default="1,2,4,8,16", help="計測する並列数（カンマ区切り）")
+    parser.add_argument("--mode", choices=["code", "date"], default=None, help="取得方式（省略時は自動）")
+    parser.add_argument("--latency", type=float, default=0.05, help="スタブの応答遅延（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="スタブが 500 を返す確率")
+    parser.add_argument("--server-rate-limit", type=int, default=0, help="スタブの1秒あたりの上限（0で無制限）")
+    parser.add_argument("--client-rate", type=float, default=1000.0, help="クライアント側の1秒あたりの上限")
+    args = parser.parse_args()
+
+    to_date = datetime.now().strftime("%Y-%m-%d")
+    from_date = (datetime.now() - timedelta(days=args.days)).strftime("%Y-%m-%d")
+
+    config = StubConfig(
+        n_codes=args.codes,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        rate_limit=args.server_rate_limit,
+        start_date=from_date,
+        end_date=to_date,
+    )
+    os.environ["JQUANTS_ID_TOKEN"] = ID_TOKEN
+
+    with StubServer(config) as server:
+        df_listed = pd.DataFrame(server.state.data.listed_info)
+        rows = [
+            run_once(server, df_listed, from_date, to_date, int(workers), args.mode, args.client_rate)
+            for workers in args.workers.split(",")
+        ]
+
+    print()
+    print(pd.DataFrame(rows).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
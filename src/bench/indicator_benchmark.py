@@ -0,0 +1,154 @@
+"""
+技術指標の計算（process_stock_data）の一致確認と実行時間を計測するベンチマーク
+
+合成した株価データで、銘柄ごとに切り出して計算する従来の方法（process_stock_data_by_code）と
+全銘柄をまとめて計算する process_stock_data の結果が同じであることを確認し、実行時間を比較する。
+欠損した終値・銘柄が交互に並んだ行・インデックスの並びも確認に含める。
+あわせて、銘柄ごとの状態（IndicatorState）から新しい営業日の分だけを計算した結果が
+全期間の計算と一致すること（移動平均・標準偏差は丸め誤差の範囲）と、その実行時間も計測する。
+最後にプロセス数を 1 から --max-workers まで変えたときの実行時間を比較する。
+
+    python -m src.bench.indicator_benchmark --codes 4000 --days 500 --max-workers 8
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.analysis.indicator_state import IndicatorState
+from src.analysis.processer import (
+    INDICATOR_COLUMNS,
+    calculate_bollinger_bands,
+    calculate_macd,
+    calculate_sma,
+    detect_band_walk,
+    detect_macd_crossovers,
+    process_stock_data,
+)
+from src.bench.storage_benchmark import make_prices, measure
+
+
+def process_stock_data_by_code(df):
+    """銘柄ごとに切り出して技術指標を計算する（比較用の従来の実装）"""
+    result_dfs = []
+    for company in df['Code'].unique():
+        company_data = df[df['Code'] == company].copy()
+        close_prices = company_data['Close']
+
+        company_data['SMA5'] = calculate_sma(close_prices, 5)
+        company_data['SMA25'] = calculate_sma(close_prices, 25)
+        company_data['SMA75'] = calculate_sma(close_prices, 75)
+        company_data['SMA200'] = calculate_sma(close_prices, 200)
+
+        bb = calculate_bollinger_bands(close_prices)
+        company_data['BB_middle'] = bb['middle']
+        company_data['BB_upper'] = bb['upper']
+        company_data['BB_lower'] = bb['lower']
+
+        band_walks = detect_band_walk(close_prices, company_data['BB_upper'], company_data['BB_lower'])
+        company_data['UpperBandWalk'] = band_walks['upper_band_walk']
+        company_data['LowerBandWalk'] = band_walks['lower_band_walk']
+
+        macd = calculate_macd(close_prices)
+        company_data['MACD'] = macd['macd']
+        company_data['MACD_signal'] = macd['signal']
+        company_data['MACD_histogram'] = macd['histogram']
+
+        crossovers = detect_macd_crossovers(macd['macd'], macd['signal'])
+        company_data['MACD_golden_cross'] = crossovers['golden_cross']
+        company_data['MACD_dead_cross'] = crossovers['dead_cross']
+
+        result_dfs.append(company_data)
+    return pd.concat(result_dfs)
+
+
+def make_parity_prices(n_codes=30, days=300, seed=1):
+    """
+    一致確認用の株価データを作成する
+
+    日付順（銘柄が交互に並ぶ）に並べ、終値の一部を欠損させ、短い期間しかない銘柄を含める。
+    """
+    df = make_prices(n_codes, 2, seed=seed)
+    df = df[df.groupby("Code")["Date"].rank(ascending=False) <= days]
+    # 上場したばかりの銘柄（指標の期間より短い）
+    df = df[~((df["Code"] == df["Code"].iloc[0]) & (df["Date"] < df["Date"].max() - pd.Timedelta(days=20)))]
+    df = df.sort_values(["Date", "Code"]).reset_index(drop=True)
+    df.index = df.index * 2 + 10
+
+    rng = np.random.default_rng(seed)
+    df.loc[rng.random(len(df)) < 0.01, "Close"] = np.nan
+    return df
+
+
+def check_parity(df):
+    """2つの実装の結果が同じであることを確認する（異なる場合は AssertionError）"""
+    expected = process_stock_data_by_code(df)
+    actual = process_stock_data(df)
+    pd.testing.assert_frame_equal(actual, expected, check_exact=True)
+
+
+def check_streaming_parity(df, n_days=10, rtol=1e-9):
+    """
+    直近 n_days 営業日を状態から計算した結果が全期間の計算と一致することを確認する
+
+    Returns:
+        IndicatorState: n_days 営業日前までを反映した状態
+    """
+    cut = np.sort(df["Date"].unique())[-n_days]
+    state = IndicatorState.from_history(df[df["Date"] < cut])
+    actual = state.update(df[df["Date"] >= cut])
+
+    expected = process_stock_data(df)
+    expected = expected[expected["Date"] >= cut].sort_values(["Code", "Date"], kind="stable").reset_index(drop=True)
+    pd.testing.assert_frame_equal(actual, expected, check_exact=False, rtol=rtol, check_dtype=False)
+    for column in INDICATOR_COLUMNS:
+        if expected[column].dtype == bool:
+            assert (actual[column] == expected[column]).all(), column
+    return state
+
+
+def main():
+    parser = argparse.ArgumentParser(description="技術指標の計算の一致確認とベンチマーク")
+    parser.add_argument("--codes", type=int, default=4000, help="銘柄数")
+    parser.add_argument("--days", type=int, default=500, help="営業日数")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count(), help="並列計算で試す最大のプロセス数")
+    args = parser.parse_args()
+
+    check_parity(make_parity_prices())
+    print("一致確認: OK（欠損・銘柄が交互に並んだ行・短い銘柄を含むデータ）")
+    check_streaming_parity(make_parity_prices(days=400))
+    print("一致確認: OK（状態から直近の営業日だけを計算）")
+    df_parity = make_parity_prices()
+    pd.testing.assert_frame_equal(process_stock_data(df_parity, max_workers=3), process_stock_data(df_parity), check_exact=True)
+    print("一致確認: OK（プロセスで並列に計算）")
+
+    df = make_prices(args.codes, args.days // 250 + 1)
+    df = df[df.groupby("Code")["Date"].rank(ascending=False) <= args.days].reset_index(drop=True)
+    print(f"\n{len(df):,}行（{args.codes}銘柄 × {args.days}営業日）")
+
+    by_code_sec, expected = measure(lambda: process_stock_data_by_code(df), repeat=1)
+    vectorized_sec, actual = measure(lambda: process_stock_data(df))
+    pd.testing.assert_frame_equal(actual, expected, check_exact=True)
+
+    print(f"銘柄ごとに計算: {by_code_sec:8.2f}秒")
+    print(f"まとめて計算:   {vectorized_sec:8.2f}秒（{by_code_sec / vectorized_sec:.1f}倍）")
+
+    last_date = df["Date"].max()
+    state = IndicatorState.from_history(df[df["Date"] < last_date])
+    df_last = df[df["Date"] == last_date]
+    streaming_sec, _ = measure(lambda: state.update(df_last), repeat=1)
+    print(f"状態から1日分:  {streaming_sec:8.2f}秒")
+
+    print("\nプロセス数ごとの実行時間:")
+    workers_list = sorted({1, args.max_workers} | {2 ** i for i in range(args.max_workers.bit_length()) if 2 ** i <= args.max_workers})
+    base_sec = None
+    for max_workers in workers_list:
+        sec, result = measure(lambda: process_stock_data(df, max_workers=max_workers))
+        pd.testing.assert_frame_equal(result, expected, check_exact=True)
+        base_sec = base_sec or sec
+        print(f"  {max_workers:3d}プロセス: {sec:8.2f}秒（{base_sec / sec:.1f}倍）")
+
+
+if __name__ == "__main__":
+    main()
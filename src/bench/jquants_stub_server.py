@@ -0,0 +1,313 @@
+"""
+J-Quants API のオフライン用スタブサーバー
+
+本プロジェクトで使うエンドポイント（/token/auth_user, /token/auth_refresh,
+/listed/info, /prices/daily_quotes）を合成データで再現する。応答の遅延・エラー率・
+429 によるスロットリングを設定でき、ネットワークのない環境で取得処理の計測や
+回帰確認に使う。
+
+    python -m src.bench.jquants_stub_server --port 8765 --latency 0.05
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from src.api.trading_calendar import list_trading_days
+
+
+REFRESH_TOKEN = "stub-refresh-token"
+ID_TOKEN = "stub-id-token"
+
+MARKETS = ['プライム', 'スタンダード', 'グロース']
+SECTORS17 = ['食品', '情報通信・サービスその他', '電機・精密', '銀行', '自動車・輸送機']
+SECTORS33 = ['食料品', '情報・通信業', '電気機器', '銀行業', '輸送用機器']
+
+
+class StubConfig:
+    """
+    スタブサーバーの設定
+
+    Attributes:
+        n_codes: 合成する銘柄数
+        latency: 1リクエストあたりの応答遅延（秒）
+        error_rate: 500 を返す確率
+        rate_limit: 1秒あたりに受け付けるリクエスト数（超えると 429。0 で無制限）
+        page_size: 1ページあたりの最大レコード数
+        start_date / end_date: 株価を合成する期間
+    """
+
+    def __init__(self, n_codes=500, latency=0.0, error_rate=0.0, rate_limit=0,
+                 page_size=5000, start_date="2015-01-01", end_date=None, seed=0):
+        self.n_codes = n_codes
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.page_size = page_size
+        self.start_date = start_date
+        self.end_date = end_date or time.strftime("%Y-%m-%d")
+        self.seed = seed
+
+
+class StubData:
+    """合成した上場銘柄一覧と日次株価"""
+
+    def __init__(self, config):
+        self.codes = [f"{1300 + i * 7:04d}0" for i in range(config.n_codes)]
+        # 実際の API と同じく、休業日の株価は返さない
+        self.dates = list_trading_days(config.start_date, config.end_date)
+        self._date_index = {date: i for i, date in enumerate(self.dates)}
+        self.seed = config.seed
+
+        self.listed_info = [
+            {
+                "Date": self.dates[-1],
+                "Code": code,
+                "CompanyName": f"スタブ銘柄{i:04d}",
+                "MarketCodeName": MARKETS[i % len(MARKETS)],
+                "Sector17CodeName": SECTORS17[i % len(SECTORS17)],
+                "Sector33CodeName": SECTORS33[i % len(SECTORS33)],
+            }
+            for i, code in enumerate(self.codes)
+        ]
+
+    def quote(self, code, date):
+        """銘柄と日付から決定的に1日分の株価レコードを合成する"""
+        digest = hashlib.md5(f"{self.seed}:{code}".encode()).digest()
+        base = 500 + int.from_bytes(digest[:2], "big") % 5000
+        rng = random.Random(f"{self.seed}:{code}:{date}")
+        close = round(base * (1 + 0.3 * ((self._date_index[date] % 250) / 250 - 0.5)) * rng.uniform(0.98, 1.02), 1)
+        open_ = round(close * rng.uniform(0.98, 1.02), 1)
+        volume = rng.randint(10_000, 5_000_000)
+        return {
+            "Date": date,
+            "Code": code,
+            "Open": open_,
+            "High": round(max(open_, close) * 1.01, 1),
+            "Low": round(min(open_, close) * 0.99, 1),
+            "Close": close,
+            "Volume": float(volume),
+            "TurnoverValue": float(round(volume * close)),
+            "AdjustmentFactor": 1.0,
+        }
+
+    def daily_quotes(self, code=None, date=None, from_date=None, to_date=None):
+        """クエリ条件に合う株価レコードを返す"""
+        if date:
+            date = date if "-" in date else f"{date[:4]}-{date[4:6]}-{date[6:]}"
+            if date not in self._date_index:
+                return []
+            codes = [code] if code else self.codes
+            return [self.quote(c, date) for c in codes if c in self.codes]
+
+        if code not in self.codes:
+            return []
+        dates = [d for d in self.dates if (not from_date or d >= from_date) and (not to_date or d <= to_date)]
+        return [self.quote(code, d) for d in dates]
+
+
+class StubState:
+    """リクエスト数などの統計とスロットリングの状態"""
+
+    def __init__(self, config):
+        self.config = config
+        self.data = StubData(config)
+        self.lock = threading.Lock()
+        self.request_count = 0
+        self.status_counts = {}
+        self._window_start = time.monotonic()
+        self._window_count = 0
+
+    def record(self, status):
+        with self.lock:
+            self.status_counts[status] = self.status_counts.get(status, 0) + 1
+
+    def admit(self):
+        """レート制限を超えていなければ True を返す"""
+        with self.lock:
+            self.request_count += 1
+            if not self.config.rate_limit:
+                return True
+            now = time.monotonic()
+            if now - self._window_start >= 1.0:
+                self._window_start = now
+                self._window_count = 0
+            self._window_count += 1
+            return self._window_count <= self.config.rate_limit
+
+    def reset_stats(self):
+        with self.lock:
+            self.request_count = 0
+            self.status_counts = {}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """スタブサーバーのリクエストハンドラー"""
+
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body, headers=None):
+        payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+        self.state.record(status)
+
+    def _pre_handle(self):
+        """遅延・スロットリング・エラーを適用する。応答済みなら True を返す"""
+        config = self.state.config
+        if not self.state.admit():
+            self._send_json(429, {"message": "Too Many Requests"}, {"Retry-After": "1"})
+            return True
+        if config.latency:
+            time.sleep(config.latency)
+        if config.error_rate and random.random() < config.error_rate:
+            self._send_json(500, {"message": "Internal Server Error"})
+            return True
+        return False
+
+    def _authorized(self):
+        if self.headers.get("Authorization") == f"Bearer {ID_TOKEN}":
+            return True
+        self._send_json(401, {"message": "The incoming token is invalid or expired."})
+        return False
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        if self._pre_handle():
+            return
+
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        if url.path == "/v1/token/auth_user":
+            self._send_json(200, {"refreshToken": REFRESH_TOKEN})
+        elif url.path == "/v1/token/auth_refresh":
+            if query.get("refreshtoken", [""])[0] != REFRESH_TOKEN:
+                self._send_json(400, {"message": "'refreshtoken' is invalid."})
+            else:
+                self._send_json(200, {"idToken": ID_TOKEN})
+        else:
+            self._send_json(404, {"message": "Not Found"})
+
+    def do_GET(self):
+        if self._pre_handle():
+            return
+
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        if url.path == "/v1/listed/info":
+            if self._authorized():
+                self._send_json(200, {"info": self.state.data.listed_info})
+        elif url.path == "/v1/prices/daily_quotes":
+            if self._authorized():
+                self._send_daily_quotes(query)
+        else:
+            self._send_json(404, {"message": "Not Found"})
+
+    def _send_daily_quotes(self, query):
+        if not query.get("code") and not query.get("date"):
+            self._send_json(400, {"message": "This API requires at least 1 parameter as follows; 'date','code'."})
+            return
+
+        records = self.state.data.daily_quotes(
+            code=query.get("code"),
+            date=query.get("date"),
+            from_date=query.get("from"),
+            to_date=query.get("to"),
+        )
+        offset = int(query.get("pagination_key") or 0)
+        page_size = self.state.config.page_size
+        body = {"daily_quotes": records[offset:offset + page_size]}
+        if offset + page_size < len(records):
+            body["pagination_key"] = str(offset + page_size)
+        self._send_json(200, body)
+
+
+class StubServer:
+    """
+    スタブサーバーをバックグラウンドのスレッドで起動・停止する
+
+    with StubServer(StubConfig(latency=0.05)) as server:
+        print(server.base_url)
+    """
+
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.config = config or StubConfig()
+        self.httpd = ThreadingHTTPServer((host, port), StubHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.state = StubState(self.config)
+        self._thread = None
+
+    @property
+    def state(self):
+        return self.httpd.state
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="J-Quants API のスタブサーバー")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--codes", type=int, default=500, help="合成する銘柄数")
+    parser.add_argument("--latency", type=float, default=0.0, help="応答遅延（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="500 を返す確率")
+    parser.add_argument("--rate-limit", type=int, default=0, help="1秒あたりの上限リクエスト数（0で無制限）")
+    parser.add_argument("--page-size", type=int, default=5000, help="1ページあたりの最大レコード数")
+    args = parser.parse_args()
+
+    config = StubConfig(
+        n_codes=args.codes,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+        page_size=args.page_size,
+    )
+    server = StubServer(config, host=args.host, port=args.port)
+    print(f"スタブサーバーを起動しました: {server.base_url}")
+    print(f"JQUANTS_API_BASE_URL={server.base_url} を設定して利用してください。")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+株価データの保存形式ごとの読み込み時間を計測するベンチマーク
+
+合成した株価データを CSV と年ごとに分割したデータセットで保存し、全件・1銘柄全期間・
+1銘柄直近3ヶ月の読み込み時間を比較する。
+
+    python -m src.bench.storage_benchmark --codes 2000 --years 10
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.storage import load_prices, save_prices
+
+
+def make_prices(n_codes, years, seed=0):
+    """
+    合成した株価データを作成する
+
+    Args:
+        n_codes (int): 銘柄数
+        years (int): 期間（年数）
+        seed (int): 乱数のシード
+
+    Returns:
+        pd.DataFrame: 株価データ
+    """
+    rng = np.random.default_rng(seed)
+    end = pd.Timestamp.today().normalize()
+    dates = pd.bdate_range(end - pd.DateOffset(years=years), end)
+    codes = [f"{1300 + i * 3:04d}0" for i in range(n_codes)]
+    n = len(dates) * len(codes)
+    close = 1000 * np.exp(np.cumsum(rng.normal(0, 0.02, (len(codes), len(dates))), axis=1)).ravel()
+    return pd.DataFrame({
+        "Date": np.tile(dates, len(codes)),
+        "Code": np.repeat(codes, len(dates)),
+        "Open": close * rng.uniform(0.98, 1.02, n),
+        "High": close * 1.02,
+        "Low": close * 0.98,
+        "Close": close,
+        "Volume": rng.integers(10_000, 5_000_000, n).astype(float),
+        "CompanyName": np.repeat([f"銘柄{i:04d}" for i in range(len(codes))], len(dates)),
+    })
+
+
+def measure(func, repeat=3):
+    """関数を repeat 回実行し、最短の実行時間（秒）と最後の結果を返す"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="株価データの読み込み時間のベンチマーク")
+    parser.add_argument("--codes", type=int, default=2000, help="銘柄数")
+    parser.add_argument("--years", type=int, default=10, help="期間（年数）")
+    args = parser.parse_args()
+
+    df = make_prices(args.codes, args.years)
+    code = df["Code"].iloc[len(df) // 2]
+    recent = df["Date"].max() - pd.DateOffset(months=3)
+    print(f"{len(df):,}行（{args.codes}銘柄 × {args.years}年）")
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for format in ["csv", "parquet"]:
+            path = Path(tmp_dir) / format / 'stock_prices'
+            save_prices(df, path, format=format)
+            size = sum(f.stat().st_size for f in path.parent.rglob("*") if f.is_file())
+
+            full_sec, _ = measure(lambda: load_prices(path), repeat=1)
+            one_sec, one = measure(lambda: load_prices(path, codes=[code]))
+            recent_sec, _ = measure(lambda: load_prices(path, codes=[code], start=recent))
+            rows.append({
+                "format": format,
+                "size_mb": round(size / 1e6, 1),
+                "full_sec": round(full_sec, 3),
+                "one_code_ms": round(one_sec * 1000, 1),
+                "one_code_3m_ms": round(recent_sec * 1000, 1),
+                "one_code_rows": len(one),
+            })
+
+    print(pd.DataFrame(rows).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,10 @@
+import argparse
 import os
 import sys
 from pathlib import Path
 
+import pandas as pd
+
 # プロジェクトのルートディレクトリを取得
 project_root = Path(__file__).parent.parent
 
@@ -11,34 +14,121 @@ sys.path.append(str(project_root))
 # 各モジュールをインポート
 from src.api.get_tokens import get_all_tokens
 from src.api.fetch_stock_prices import fetch_stock_prices
+from src.api.trading_calendar import get_trading_calendar
+from src.analysis.chunked import process_dataset_chunked, write_panel_chunked
+from src.analysis.indicator_state import IndicatorState
 from src.analysis.processer import process_stock_data
-import pandas as pd
+from src.analysis.screening import INDEX_DAYS, SIGNAL_COLUMNS, SignalIndex
+from src.storage import (
+    AnalyticsDB, PanelStore, PartitionedDataset, latest_price_date, load_prices, prices_exist, update_prices,
+)
+from src.storage.analytics_db import DUCKDB_AVAILABLE
 
 
-def main():
+def main(full_resync=False, max_workers=1, max_memory_mb=None):
     print("1. トークンの取得を開始します...")
     if not get_all_tokens():
         print("トークンの取得に失敗しました。処理を中止します。")
         return
 
     print("\n2. 株価データの取得を開始します...")
-    fetch_stock_prices()
+    fetch_stock_prices(full_resync=full_resync)
 
     print("\n3. 株価データの分析を開始します...")
     # 処理済みデータの読み込み
-    processed_data_path = project_root / 'data' / 'raw' / 'stock_prices.csv'
-    if not processed_data_path.exists():
+    processed_data_path = project_root / 'data' / 'raw' / 'stock_prices'
+    if not prices_exist(processed_data_path):
         print("株価データが見つかりません。処理を中止します。")
         return
 
-    df = pd.read_csv(processed_data_path)
-    processed_df = process_stock_data(df)
+    output_path = project_root / 'data' / 'processed' / 'stock_prices_analyzed'
+    state_file = project_root / 'data' / 'processed' / 'indicator_state.npz'
+    new_df = None
+    if not full_resync and state_file.exists() and prices_exist(output_path):
+        # 銘柄ごとの状態から新しい営業日の分だけを計算して追記する
+        state = IndicatorState.load(state_file)
+        df_new = load_prices(processed_data_path, start=state.latest_date)
+        # 状態にない銘柄（新しく対象になった銘柄）は全期間を反映する
+        new_codes = sorted(set(df_new['Code'].astype(str)) - set(state.codes.tolist()))
+        if new_codes:
+            df_new = pd.concat([
+                df_new[~df_new['Code'].astype(str).isin(new_codes)],
+                load_prices(processed_data_path, codes=new_codes),
+            ], ignore_index=True)
+        new_df = state.update(df_new)
+        if new_df.empty:
+            print("新しい営業日の株価データはありません。")
+            return
+        PartitionedDataset(output_path).append(new_df)
+        print(f"分析結果を追記しました: {output_path}（{len(new_df)}行）")
+        processed_df = None
+    elif max_memory_mb is not None:
+        # 銘柄のバッチごとに読み込んで計算し、結果を順に書き出す
+        state = IndicatorState()
+        report = process_dataset_chunked(processed_data_path, output_path, max_memory_mb, max_workers, state=state)
+        print(f"分析結果を保存しました: {output_path}（{report['rows']}行・{report['batches']}バッチ、"
+              f"最大使用メモリ {report['peak_memory_mb'] or 0:,.0f}MB）")
+        processed_df = None
+    else:
+        df = load_prices(processed_data_path)
+        processed_df = process_stock_data(df, max_workers=max_workers)
+        state = IndicatorState.from_history(df)
+
+        # 分析結果の保存（保存済みの場合は新しい日付の分だけを追記する）
+        n_rows = update_prices(processed_df, output_path, full=full_resync)
+        print(f"分析結果を保存しました: {output_path}（{n_rows}行）")
+    state.save(state_file)
+
+    # 追記したセグメントがたまっていればまとめる
+    for dataset_path in [project_root / 'data' / 'raw' / 'stock_prices', output_path]:
+        PartitionedDataset(dataset_path).maybe_compact()
+
+    # 複数のプロセスからメモリマップで共有する [銘柄 × 営業日] のパネル
+    panel = PanelStore(project_root / 'data' / 'processed' / 'panel')
+    if new_df is not None and panel.append(new_df):
+        # 日々の更新では新しい営業日の列だけを書き込む
+        print(f"パネルに追記しました: {panel.root}")
+    else:
+        if processed_df is not None:
+            panel.write(processed_df)
+        elif max_memory_mb is not None:
+            write_panel_chunked(output_path, panel, max_memory_mb)
+        else:
+            panel.write(load_prices(output_path))
+        print(f"パネルを保存しました: {panel.root}")
+
+    # スクリーニング用の [直近の営業日 × 銘柄] のシグナルのビットマップ
+    recent_start = get_trading_calendar().sessions_back(latest_price_date(output_path), INDEX_DAYS - 1)
+    recent_df = load_prices(output_path, columns=['Date', 'Code', *SIGNAL_COLUMNS], start=recent_start)
+    signal_index = SignalIndex.from_frame(recent_df)
+    signal_index.save(project_root / 'data' / 'processed' / 'signal_index.npz')
+    print(f"スクリーニング用のビットマップを保存しました（{len(signal_index.dates)}営業日・{len(signal_index.codes)}銘柄）")
 
-    # 分析結果の保存
-    output_path = project_root / 'data' / 'processed' / 'stock_prices_analyzed.csv'
-    processed_df.to_csv(output_path, index=False)
-    print(f"分析結果を保存しました: {output_path}")
+    # 集計用の分析用データベース（DuckDB がある場合のみ。データはコピーせずビューを定義し直す）
+    if DUCKDB_AVAILABLE:
+        db = AnalyticsDB()
+        db.refresh()
+        print(f"分析用データベースを更新しました: {db.db_file}")
 
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--full-resync",
+        action="store_true",
+        help="保存済みの株価データを使わずに直近2年分を取得し直す",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="技術指標を全期間計算するときのプロセス数",
+    )
+    parser.add_argument(
+        "--max-memory-mb",
+        type=float,
+        default=None,
+        help="指定した場合は銘柄のバッチごとに処理し、1バッチの使用メモリをこの値（MB）までに抑える",
+    )
+    args = parser.parse_args()
+    main(full_resync=args.full_resync, max_workers=args.workers, max_memory_mb=args.max_memory_mb) 
\ No newline at end of file
@@ -6,6 +6,9 @@ import os
 from pathlib import Path
 import datetime
 
+from analysis.indicator_view import IndicatorView
+from storage import CompanyStore, PanelStore, compact_frame, load_prices
+
 # 環境変数の読み込み
 load_dotenv()
 
@@ -24,21 +27,40 @@ st.set_page_config(
 # タイトル
 st.title("AI株価分析アプリ 📈")
 
+file_path = Path(__file__).parent.parent / 'data' / 'raw' / 'stock_prices'
+panel_path = Path(__file__).parent.parent / 'data' / 'processed' / 'panel'
+stock_columns = ['Date', 'Code', 'Open', 'Close', 'Volume', 'SMA25', 'SMA75']
+
 # データの読み込み
 @st.cache_data
-def load_data():
-    file_path = Path(__file__).parent.parent / 'data' / 'processed' / 'stock_prices_analyzed.csv'
-    df = pd.read_csv(
-        file_path,
-        dtype={
-            'Code': object,
-        },
-        parse_dates=['Date'],
-    )
-    return df
+def load_companies():
+    # 株価データにある銘柄の企業情報を企業情報のストアから取得する
+    codes = load_prices(file_path, columns=['Code'])['Code'].unique()
+    df = CompanyStore().lookup(codes, columns=['CompanyName', target_sector_size])
+    return compact_frame(df)
+
+@st.cache_resource
+def get_indicator_view():
+    # 指標は選択した銘柄の SMA25・SMA75 だけを計算する
+    return IndicatorView(lambda codes: load_prices(file_path, codes=codes))
+
+@st.cache_data
+def load_stock_data(code):
+    # main.py が保存したパネルがあれば、計算済みの株価・指標を銘柄の行だけメモリマップで読む
+    panel = PanelStore(panel_path)
+    fields = stock_columns[2:]
+    if panel.exists() and set(fields) <= set(panel.fields):
+        try:
+            return compact_frame(panel.to_frame(fields, codes=[code])[stock_columns])
+        except KeyError:
+            pass
+
+    # パネルにない銘柄は株価だけを読み込んで指標を計算する
+    df = get_indicator_view().frame([code], stock_columns)
+    return compact_frame(df)
 
 try:
-    df = load_data()
+    df = load_companies()
     
     # 業種リストを作成（銘柄数付き）
     sector_counts = df[[target_sector_size, 'Code']].drop_duplicates()[target_sector_size].value_counts()
@@ -52,12 +74,12 @@ try:
     sector_df = df[df[target_sector_size] == selected_sector]
 
     # 銘柄名とコードのリストを作成（業種で絞ったもの）
-    company_options = [f"{row['CompanyName']}（{row['Code']}）" for _, row in sector_df[['CompanyName', 'Code']].drop_duplicates().iterrows()]
+    company_options = [f"{name}（{code}）" for code, name in zip(sector_df['Code'], sector_df['CompanyName'])]
     selected_company = st.selectbox('分析する銘柄を選択してください', company_options)
 
     # 選択された銘柄コードを抽出
     selected_code = selected_company.split('（')[-1].replace('）', '')
-    stock_data = df[df['Code'] == selected_code]
+    stock_data = load_stock_data(selected_code)
     
     # デバッグ情報を表示
     st.write(f"選択した銘柄の総データ数: {len(stock_data)}")
@@ -0,0 +1,9 @@
+"""
+株価データの保存・読み込みを担当するモジュール
+"""
+from .analytics_db import AnalyticsDB, open_analytics_db
+from .companies import CompanyStore
+from .compact import compact_frame, memory_report, print_memory_report
+from .panel import PanelStore
+from .partitioned import PartitionedDataset
+from .price_store import export_csv, latest_price_date, load_prices, prices_exist, save_prices, update_prices
@@ -0,0 +1,243 @@
+"""
+株価・指標・企業情報を組み込みの分析用データベース（DuckDB）で集計するモジュール
+
+保存済みのデータセットを Parquet のまま読むビューとして1つの DuckDB ファイル
+（data/processed/analytics.duckdb）に登録し、売買代金ランキングなどを SQL で実行する。
+絞り込み・集計はデータベース側で行われるため、全件を pandas に読み込む必要がない。
+データはコピーしないので、作り直してもデータセットの大きさによらずすぐ終わる。
+サーバーは不要で、ファイルだけで動く。
+
+DuckDB は任意の依存パッケージで、インストールされていない場合やデータベースが
+データセットより古い場合、open_analytics_db() は None を返す（呼び出し側は pandas で処理する）。
+
+    python -m src.storage.analytics_db          # データベースを作り直す
+"""
+import os
+from pathlib import Path
+
+from .companies import CompanyStore
+from .partitioned import PART_FILE_NAME, PARTITION_PREFIX, SEGMENTS_DIR_NAME, PartitionedDataset
+from .price_store import resolve_path
+
+try:
+    import duckdb
+    DUCKDB_AVAILABLE = True
+except ImportError:
+    DUCKDB_AVAILABLE = False
+
+
+project_root = Path(__file__).parent.parent.parent
+
+DEFAULT_DB_FILE = project_root / 'data' / 'processed' / 'analytics.duckdb'
+
+# テーブル名と取り込むデータセット
+DEFAULT_TABLES = {
+    "prices": project_root / 'data' / 'raw' / 'stock_prices',
+    "prices_2025q1": project_root / 'data' / 'raw' / 'stock_prices_2025q1',
+    "indicators": project_root / 'data' / 'processed' / 'stock_prices_analyzed',
+}
+
+
+def _quote(value):
+    """SQL の文字列リテラルにする"""
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _dataset_files(path):
+    """データセットを構成するファイルのリストを返す"""
+    path = resolve_path(path)
+    if path.is_dir():
+        dataset = PartitionedDataset(path)
+        return [part_file for _, part_file in dataset.partitions()] + dataset.segments()
+    return [path]
+
+
+def _dataset_sql(path):
+    """
+    データセットを読み込む SELECT 文を作成する
+
+    分割保存したデータセットはファイル名のパターンで参照するため、年のパーティションが
+    増えても同じ SELECT 文で読める。セグメントがある場合は (Code, Date) ごとに最後に
+    追記した行だけを残す。
+    """
+    path = resolve_path(path)
+    if path.suffix == ".csv":
+        return f"SELECT * FROM read_csv_auto({_quote(path)}, types={{'Code': 'VARCHAR'}})"
+    if not path.is_dir():
+        return f"SELECT * FROM read_parquet({_quote(path)})"
+
+    dataset = PartitionedDataset(path)
+    patterns = []
+    if dataset.partitions():
+        patterns.append(_quote(dataset.root / f"{PARTITION_PREFIX}*" / PART_FILE_NAME))
+    if not dataset.segments():
+        return f"SELECT * FROM read_parquet([{', '.join(patterns)}], union_by_name=true)"
+    patterns.append(_quote(dataset.segments_dir / "*.parquet"))
+    return f"""
+        SELECT * EXCLUDE (filename)
+        FROM read_parquet([{', '.join(patterns)}], union_by_name=true, filename=true)
+        QUALIFY row_number() OVER (
+            PARTITION BY Code, Date
+            ORDER BY filename LIKE '%/{SEGMENTS_DIR_NAME}/%' DESC, filename DESC
+        ) = 1
+    """
+
+
+def _dataset_mtime(path):
+    """データセットを構成するファイルの最終更新時刻を返す"""
+    return max(f.stat().st_mtime for f in _dataset_files(path))
+
+
+class AnalyticsDB:
+    """
+    分析用データベース
+
+    Attributes:
+        db_file: DuckDB のファイル
+    """
+
+    def __init__(self, db_file=DEFAULT_DB_FILE):
+        self.db_file = Path(db_file)
+        self._con = None
+
+    @property
+    def con(self):
+        if self._con is None:
+            self._con = duckdb.connect(str(self.db_file), read_only=True)
+        return self._con
+
+    def close(self):
+        if self._con is not None:
+            self._con.close()
+            self._con = None
+
+    def refresh(self, tables=None, company_store=None):
+        """
+        データセットのビューと企業情報のテーブルでデータベースを作り直す
+
+        株価・指標は Parquet をそのまま読むビューとして定義するため、データはコピーしない
+        （作り直すのはビューの定義と企業情報だけ）。一時ファイルに作成してから置き換えるため、
+        読み込み中のプロセスは古いデータベースを使い続けられる。
+
+        Args:
+            tables (dict): テーブル名をキー、データセットのパスを値とする辞書（存在しないものは飛ばす）
+            company_store (CompanyStore): 企業情報のストア
+
+        Returns:
+            dict: テーブル名をキー、行数を値とする辞書
+        """
+        tables = DEFAULT_TABLES if tables is None else tables
+        company_store = company_store or CompanyStore()
+
+        self.close()
+        self.db_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.db_file.with_name(self.db_file.name + ".tmp")
+        if tmp_file.exists():
+            tmp_file.unlink()
+
+        counts = {}
+        con = duckdb.connect(str(tmp_file))
+        try:
+            for table, path in tables.items():
+                try:
+                    select_sql = _dataset_sql(path)
+                except FileNotFoundError:
+                    continue
+                # データはコピーせず、Parquet を直接読むビューにする
+                con.execute(f"CREATE VIEW {table} AS {select_sql}")
+                counts[table] = con.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+
+            company_versions = company_store.versions
+            con.register("company_versions_df", company_versions)
+            con.execute("CREATE TABLE company_versions AS SELECT * FROM company_versions_df ORDER BY Code, Date")
+            con.execute("""
+                CREATE TABLE companies AS
+                SELECT * FROM company_versions
+                QUALIFY row_number() OVER (PARTITION BY Code ORDER BY Date DESC) = 1
+            """)
+            counts["companies"] = con.execute("SELECT count(*) FROM companies").fetchone()[0]
+        finally:
+            con.close()
+
+        os.replace(tmp_file, self.db_file)
+        return counts
+
+    def tables(self):
+        """データベースにあるテーブル名のリスト"""
+        return [row[0] for row in self.con.execute("SHOW TABLES").fetchall()]
+
+    def query(self, sql, params=None):
+        """
+        SQL を実行して結果をデータフレームで返す
+
+        Args:
+            sql (str): SQL（プレースホルダーは ?）
+            params (list): プレースホルダーに渡す値
+
+        Returns:
+            pd.DataFrame: 結果
+        """
+        return self.con.execute(sql, params or []).df()
+
+    def top_turnover(self, n=500, table="prices", start=None, end=None):
+        """
+        期間の売買代金の合計が大きい銘柄を返す
+
+        Args:
+            n (int): 上位何銘柄を返すか
+            table (str): 株価のテーブル名
+            start (str | datetime): 開始日（None の場合は最初から）
+            end (str | datetime): 終了日（None の場合は最後まで）
+
+        Returns:
+            pd.DataFrame: Code・CompanyName・Volume・TurnoverValue 列を持つデータフレーム（売買代金の降順）
+        """
+        return self.query(f"""
+            SELECT p.Code, c.CompanyName, sum(p.Volume) AS Volume, sum(p.TurnoverValue) AS TurnoverValue
+            FROM {table} AS p
+            LEFT JOIN companies AS c USING (Code)
+            WHERE (? IS NULL OR p.Date >= CAST(? AS TIMESTAMP))
+              AND (? IS NULL OR p.Date <= CAST(? AS TIMESTAMP))
+            GROUP BY p.Code, c.CompanyName
+            ORDER BY TurnoverValue DESC
+            LIMIT ?
+        """, [start, start, end, end, n])
+
+
+def open_analytics_db(db_file=DEFAULT_DB_FILE, tables=None):
+    """
+    最新の分析用データベースを開く
+
+    Args:
+        db_file (Path): DuckDB のファイル
+        tables (list): 使うテーブル名（データセットより古い場合は None を返す）
+
+    Returns:
+        AnalyticsDB: データベース（DuckDB がない・データベースがない・古い場合は None）
+    """
+    db_file = Path(db_file)
+    if not DUCKDB_AVAILABLE or not db_file.exists():
+        return None
+
+    db_mtime = db_file.stat().st_mtime
+    for table in tables or DEFAULT_TABLES:
+        if table not in DEFAULT_TABLES:
+            continue
+        try:
+            if _dataset_mtime(DEFAULT_TABLES[table]) > db_mtime:
+                return None
+        except FileNotFoundError:
+            continue
+
+    db = AnalyticsDB(db_file)
+    if not set(tables or []) <= set(db.tables()):
+        db.close()
+        return None
+    return db
+
+
+if __name__ == "__main__":
+    counts = AnalyticsDB().refresh()
+    for table, count in counts.items():
+        print(f"{table}: {count:,}行")
+    print(f"分析用データベースを作成しました: {DEFAULT_DB_FILE}")
@@ -0,0 +1,113 @@
+"""
+読み込んだ株価データをメモリ効率のよい型に変換するモジュール
+
+企業名・業種名は行ごとに同じ文字列が繰り返されるためカテゴリ型に、
+価格や指標は精度が足りる範囲で float32 に、シグナルの列は真偽値型にそろえる。
+証券コードは保存時と同じ文字列のままにする（カテゴリ型にすると groupby が
+observed=True なしでは全カテゴリを返すなど、文字列と扱いが変わるため）。
+
+    python -m src.storage.compact data/processed/stock_prices_analyzed
+"""
+import numpy as np
+import pandas as pd
+
+
+# 常にカテゴリ型にする列
+CATEGORY_COLUMNS = [
+    "CompanyName", "CompanyNameEnglish",
+    "Sector17Code", "Sector17CodeName", "Sector33Code", "Sector33CodeName",
+    "ScaleCategory", "MarketCode", "MarketCodeName",
+]
+
+# 値の種類が少なくてもカテゴリ型にしない列
+STRING_COLUMNS = ["Code"]
+
+# これ以外の文字列の列も、値の種類が行数に対してこの割合以下ならカテゴリ型にする
+CATEGORY_MAX_RATIO = 0.5
+
+# 桁数が大きく float32 では精度が足りない列（出来高・売買代金）は float64 のままにする
+FLOAT64_COLUMNS = ["Volume", "TurnoverValue", "AdjustmentVolume"]
+
+BOOL_VALUES = {True: True, False: False, "True": True, "False": False, "true": True, "false": False}
+
+
+def _is_bool_like(series):
+    """真偽値（または真偽値の文字列）と欠損だけからなる列なら True を返す"""
+    values = series.dropna().unique()
+    return len(values) > 0 and all(value in BOOL_VALUES for value in values)
+
+
+def compact_frame(df):
+    """
+    データフレームの各列をメモリ効率のよい型に変換する
+
+    Args:
+        df (pd.DataFrame): 株価データや上場企業データ
+
+    Returns:
+        pd.DataFrame: 型を変換したデータフレーム
+    """
+    df = df.copy(deep=False)
+    for column in df.columns:
+        series = df[column]
+        if isinstance(series.dtype, pd.CategoricalDtype) or pd.api.types.is_datetime64_any_dtype(series):
+            continue
+
+        if pd.api.types.is_bool_dtype(series):
+            df[column] = series.astype(bool)
+        elif pd.api.types.is_float_dtype(series):
+            if column not in FLOAT64_COLUMNS:
+                df[column] = series.astype(np.float32)
+        elif column in STRING_COLUMNS:
+            continue
+        elif pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+            if _is_bool_like(series):
+                # 欠損はシグナルなし（False）として扱う
+                df[column] = series.map(BOOL_VALUES).fillna(False).astype(bool)
+            elif column in CATEGORY_COLUMNS or series.nunique() <= len(series) * CATEGORY_MAX_RATIO:
+                df[column] = series.astype("category")
+    return df
+
+
+def memory_report(before, after):
+    """
+    列ごとのメモリ使用量を変換前後で比較する
+
+    Args:
+        before (pd.DataFrame): 変換前のデータフレーム
+        after (pd.DataFrame): 変換後のデータフレーム
+
+    Returns:
+        pd.DataFrame: 列ごとの型とバイト数（最終行は合計）
+    """
+    bytes_before = before.memory_usage(index=False, deep=True)
+    bytes_after = after.memory_usage(index=False, deep=True)
+    report = pd.DataFrame({
+        "dtype_before": before.dtypes.astype(str),
+        "bytes_before": bytes_before,
+        "dtype_after": after.dtypes.astype(str),
+        "bytes_after": bytes_after,
+    })
+    report.loc["(total)"] = ["", bytes_before.sum(), "", bytes_after.sum()]
+    report["ratio"] = (report["bytes_after"] / report["bytes_before"]).round(3)
+    return report
+
+
+def print_memory_report(before, after):
+    """列ごとのメモリ使用量を変換前後で比較して表示する"""
+    report = memory_report(before, after)
+    print(report.to_string())
+    total = report.loc["(total)"]
+    print(f"\n{len(before):,}行: {total['bytes_before'] / 1e6:,.1f}MB -> {total['bytes_after'] / 1e6:,.1f}MB")
+
+
+if __name__ == "__main__":
+    import argparse
+    from .price_store import load_prices
+
+    parser = argparse.ArgumentParser(description="株価データのメモリ使用量を型の変換前後で比較する")
+    parser.add_argument("path", help="保存先のパス（例: data/processed/stock_prices_analyzed）")
+    args = parser.parse_args()
+
+    df = load_prices(args.path)
+    print_memory_report(df, compact_frame(df))
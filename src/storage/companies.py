@@ -0,0 +1,159 @@
+"""
+企業情報（銘柄名・業種・市場区分）を株価と分けて管理するモジュール
+
+上場銘柄一覧（/listed/info）は取得日（Date）時点の情報なので、(Code, Date) をキーとして
+内容が変わったときだけ新しい版を追記する。株価・指標のデータは Code だけを持ち、
+銘柄名や業種は表示するときにこのストアから結合する。
+
+    companies = CompanyStore()
+    companies.lookup(["72030"], columns=["CompanyName"])   # 最新の企業情報
+    companies.join(df_prices, ["CompanyName", "Sector17CodeName"])
+"""
+from pathlib import Path
+
+import pandas as pd
+
+from .partitioned import PartitionedDataset, is_partitioned_dataset
+
+
+DEFAULT_COMPANY_STORE = Path(__file__).parent.parent.parent / 'data' / 'raw' / 'companies'
+
+# 企業情報の保存がまだない場合に使う上場銘柄一覧（get_listed_companies の出力）
+LISTED_COMPANIES_FILE = Path(__file__).parent.parent.parent / 'data' / 'raw' / 'listed_companies.csv'
+
+KEY_COLUMNS = ["Code", "Date"]
+
+
+def _normalize(df):
+    df = df.copy()
+    df["Code"] = df["Code"].astype(str)
+    df["Date"] = pd.to_datetime(df["Date"])
+    return df.sort_values(KEY_COLUMNS, kind="stable").reset_index(drop=True)
+
+
+class CompanyStore:
+    """
+    (Code, 有効日) をキーとする企業情報のストア
+
+    Attributes:
+        path: 保存先のパス
+    """
+
+    def __init__(self, path=DEFAULT_COMPANY_STORE):
+        self.path = Path(path)
+        self._versions = None
+        self._current = None
+
+    @property
+    def versions(self):
+        """企業情報のすべての版（Code・Date の順）"""
+        if self._versions is None:
+            if is_partitioned_dataset(self.path):
+                self._versions = _normalize(PartitionedDataset(self.path).load())
+            elif LISTED_COMPANIES_FILE.exists():
+                self._versions = _normalize(pd.read_csv(LISTED_COMPANIES_FILE, dtype={'Code': str}))
+            else:
+                self._versions = pd.DataFrame(columns=[*KEY_COLUMNS, "CompanyName"])
+        return self._versions
+
+    @property
+    def current(self):
+        """銘柄ごとの最新の企業情報（Code をインデックスとする）"""
+        if self._current is None:
+            self._current = self.versions.drop_duplicates("Code", keep="last").set_index("Code")
+        return self._current
+
+    def update(self, df_listed):
+        """
+        上場銘柄一覧を取り込み、内容が変わった銘柄だけ新しい版を追記して保存する
+
+        Args:
+            df_listed (pd.DataFrame): 上場銘柄一覧（Code・Date 列を含む）
+
+        Returns:
+            int: 追記した版の数
+        """
+        new = _normalize(df_listed)
+        attributes = [column for column in new.columns if column not in KEY_COLUMNS]
+        current = self.current.reindex(new["Code"])
+
+        changed = ~new["Code"].isin(self.current.index).to_numpy()
+        for column in attributes:
+            if column not in current.columns:
+                changed |= new[column].notna().to_numpy()
+                continue
+            before = current[column].to_numpy()
+            after = new[column].to_numpy()
+            changed |= ~((before == after) | (pd.isna(before) & pd.isna(after)))
+
+        added = new[changed]
+        if added.empty:
+            return 0
+
+        versions = _normalize(pd.concat([self.versions, added], ignore_index=True))
+        dataset = PartitionedDataset(self.path)
+        if is_partitioned_dataset(self.path):
+            # 保存済みの版はそのままにして、新しい版だけをセグメントとして追記する
+            dataset.append(added)
+            dataset.maybe_compact()
+        else:
+            # 上場銘柄一覧から読み込んだ版も含めて保存する
+            dataset.write(versions)
+        self._versions = versions
+        self._current = None
+        return len(added)
+
+    def lookup(self, codes=None, columns=None, as_of=None):
+        """
+        企業情報を取得する
+
+        Args:
+            codes (iterable): 証券コード（None の場合はすべて。指定した順に返し、企業情報がない銘柄は含めない）
+            columns (list): 取得する列名（None の場合はすべて）
+            as_of (str | datetime): この日時点の情報を返す（None の場合は最新）
+
+        Returns:
+            pd.DataFrame: Code 列と企業情報の列を持つデータフレーム
+        """
+        if as_of is None:
+            companies = self.current
+        else:
+            versions = self.versions[self.versions["Date"] <= pd.Timestamp(as_of)]
+            companies = versions.drop_duplicates("Code", keep="last").set_index("Code")
+
+        if codes is not None:
+            codes = [str(code) for code in codes]
+            companies = companies.loc[[code for code in codes if code in companies.index]]
+        if columns is not None:
+            companies = companies[list(columns)]
+        return companies.rename_axis("Code").reset_index()
+
+    def join(self, df, columns, point_in_time=False):
+        """
+        株価などのデータフレームに企業情報の列を結合する
+
+        Args:
+            df (pd.DataFrame): Code 列を持つデータフレーム
+            columns (list): 結合する企業情報の列名
+            point_in_time (bool): True の場合は各行の Date 時点の情報を結合する
+                （最初の版より前の日付には最初の版を使う）
+
+        Returns:
+            pd.DataFrame: 企業情報の列を追加したデータフレーム
+        """
+        columns = list(columns)
+        codes = df["Code"].astype(str)
+        if not point_in_time:
+            companies = self.current.reindex(codes)[columns]
+            return df.assign(**{column: companies[column].to_numpy() for column in columns})
+
+        versions = self.versions[["Code", "Date", *columns]].sort_values("Date", kind="stable")
+        left = df.assign(Code=codes, _row=range(len(df))).sort_values("Date", kind="stable")
+        joined = pd.merge_asof(left, versions, on="Date", by="Code", direction="backward")
+        first = self.versions.drop_duplicates("Code", keep="first").set_index("Code").reindex(joined["Code"])
+        for column in columns:
+            joined[column] = joined[column].fillna(pd.Series(first[column].to_numpy(), index=joined.index))
+        joined = joined.sort_values("_row").drop(columns="_row")
+        joined.index = df.index
+        joined["Code"] = df["Code"]
+        return joined
@@ -0,0 +1,409 @@
+"""
+株価と指標を [銘柄 × 営業日] の密な配列としてメモリマップで共有するモジュール
+
+項目（Open, Close, SMA25 など）ごとに NumPy の .npy ファイルとして保存し、読み込みは
+メモリマップで行う。ファイルを読み込んでコピーすることはないため起動がほぼ一瞬で、
+Streamlit アプリ・分析処理・バッチジョブなど複数のプロセスが同じページを共有できる。
+
+配列は行が銘柄、列が営業日の C 順で、1銘柄の時系列はメモリ上で連続する。
+データのない (銘柄, 日付) は NaN（真偽値の項目は False）になる。
+ファイルには営業日の列を SPARE_DATES 日分多めに確保しておき、日々の更新（append）では
+新しい営業日の列だけを書き込む（全体を書き直すのは予備の列を使い切ったときだけ）。
+
+    panel = PanelStore(processed_data_dir / 'panel')
+    close = panel.array("Close")                  # (銘柄数, 営業日数) の読み取り専用配列
+    series = panel.series("Close", "72030")       # 1銘柄の時系列
+"""
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .partitioned import replace_directory
+
+
+PANEL_META_FILE = "panel.json"
+CODES_FILE = "codes.npy"
+DATES_FILE = "dates.npy"
+
+# 日々の追記用に多めに確保しておく営業日の列数（約1年分）
+SPARE_DATES = 260
+
+# パネルに保存する株価の項目
+PRICE_FIELDS = ["Open", "High", "Low", "Close", "Volume", "TurnoverValue"]
+
+
+def panel_fields(df):
+    """株価と数値・真偽値の指標の列名（Code・Date 以外）"""
+    return [
+        column for column in df.columns
+        if column not in ("Code", "Date")
+        and (pd.api.types.is_numeric_dtype(df[column]) or pd.api.types.is_bool_dtype(df[column]))
+    ]
+
+
+def _replace_file(path, save):
+    """一時ファイルに書き出してから置き換える"""
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        save(f)
+    os.replace(tmp_path, path)
+
+
+def _write_meta(root, fields, n_codes, n_dates, capacity):
+    _replace_file(root / PANEL_META_FILE, lambda f: f.write(json.dumps({
+        "fields": fields,
+        "shape": [n_codes, n_dates],
+        "capacity": capacity,
+    }, indent=2).encode()))
+
+
+class PanelWriter:
+    """
+    銘柄・営業日を先に決めて、株価データをバッチごとにパネルへ書き込む
+
+    項目ごとの .npy は一時ディレクトリにメモリマップで作成し、バッチの行を該当する
+    (銘柄, 日付) に書き込む。close() で一時ディレクトリから置き換える。
+
+    Attributes:
+        root: パネルを保存するディレクトリ
+        codes: 証券コードの配列（昇順）
+        dates: 営業日の配列（datetime64[D]、昇順）
+    """
+
+    def __init__(self, root, codes, dates, fields=None, capacity=None):
+        self.root = Path(root)
+        self.codes = np.asarray(codes, dtype=str)
+        self.dates = np.asarray(dates, dtype="datetime64[D]")
+        self.fields = fields
+        self.capacity = len(self.dates) + SPARE_DATES if capacity is None else capacity
+        self.tmp_root = self.root.with_name(self.root.name + ".tmp")
+        self._arrays = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self._arrays = {}
+            shutil.rmtree(self.tmp_root, ignore_errors=True)
+
+    def open(self, dtypes):
+        """
+        項目ごとの配列を作成する
+
+        write() は最初のバッチから項目と型を決めて呼び出すため、バッチを書き込むだけなら
+        呼ぶ必要はない。既存のパネルの配列をそのまま書き写す場合に使う。
+
+        Args:
+            dtypes (dict): 項目名をキー、型（bool または float64）を値とする辞書
+        """
+        shutil.rmtree(self.tmp_root, ignore_errors=True)
+        self.tmp_root.mkdir(parents=True)
+        np.save(self.tmp_root / CODES_FILE, self.codes)
+        np.save(self.tmp_root / DATES_FILE, self.dates)
+        self.fields = list(dtypes)
+        shape = (len(self.codes), self.capacity)
+        for field, dtype in dtypes.items():
+            is_bool = np.dtype(dtype) == bool
+            array = np.lib.format.open_memmap(
+                self.tmp_root / f"{field}.npy", mode="w+", dtype=bool if is_bool else np.float64, shape=shape)
+            array[:] = False if is_bool else np.nan
+            self._arrays[field] = array
+
+    def _open(self, df):
+        """最初のバッチから項目を決めて配列を作成する"""
+        fields = panel_fields(df) if self.fields is None else self.fields
+        self.open({field: bool if pd.api.types.is_bool_dtype(df[field]) else np.float64 for field in fields})
+
+    def write_array(self, field, values):
+        """
+        項目の配列を先頭の営業日の列から書き込む
+
+        Args:
+            field (str): 項目名
+            values (np.ndarray): (銘柄数, 営業日数) の配列
+        """
+        self._arrays[field][:, :values.shape[1]] = values
+
+    def write(self, df):
+        """
+        株価データを書き込む
+
+        Args:
+            df (pd.DataFrame): Code・Date 列を含む株価データ（銘柄・日付は codes・dates に含まれるもの）
+        """
+        if not self._arrays:
+            self._open(df)
+        code_index = np.searchsorted(self.codes, np.asarray(df["Code"].astype(str), dtype=str))
+        date_index = np.searchsorted(self.dates, pd.to_datetime(df["Date"]).to_numpy().astype("datetime64[D]"))
+        for field, array in self._arrays.items():
+            if array.dtype == bool:
+                values = df[field].to_numpy(dtype=bool)
+            else:
+                values = pd.to_numeric(df[field], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+            array[code_index, date_index] = values
+
+    def close(self):
+        """書き込んだパネルで既存のパネルを置き換える"""
+        if not self._arrays:
+            self._open(pd.DataFrame(columns=["Code", "Date"]))
+        for array in self._arrays.values():
+            array.flush()
+        fields = {field: str(array.dtype) for field, array in self._arrays.items()}
+        self._arrays = {}
+        _write_meta(self.tmp_root, fields, len(self.codes), len(self.dates), self.capacity)
+        replace_directory(self.tmp_root, self.root)
+
+
+class PanelStore:
+    """
+    メモリマップで読み込む [銘柄 × 営業日] のパネル
+
+    Attributes:
+        root: パネルを保存するディレクトリ
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self._meta = None
+        self._codes = None
+        self._dates = None
+        self._code_positions = None
+        self._arrays = {}
+
+    def exists(self):
+        """パネルが保存されていれば True を返す"""
+        return (self.root / PANEL_META_FILE).exists()
+
+    def write(self, df, fields=None):
+        """
+        縦持ちの株価データからパネルを作成して保存する
+
+        一時ディレクトリにすべて書き出してから置き換えるため、読み込み中の
+        プロセスは古いファイルのマップを使い続けられる。
+
+        Args:
+            df (pd.DataFrame): Code・Date 列を含む株価データ
+            fields (list): 保存する列名（None の場合は株価と数値・真偽値の指標の列すべて）
+        """
+        codes = np.unique(np.asarray(df["Code"].astype(str), dtype=str))
+        dates = np.unique(pd.to_datetime(df["Date"]).to_numpy().astype("datetime64[D]"))
+        with self.writer(codes, dates, fields or panel_fields(df)) as writer:
+            writer.write(df)
+        self._reset()
+
+    def writer(self, codes, dates, fields=None, capacity=None):
+        """
+        銘柄・営業日を指定して、バッチごとに書き込む PanelWriter を返す
+
+        Args:
+            codes (iterable): 証券コード（昇順）
+            dates (iterable): 営業日（昇順）
+            fields (list): 保存する列名（None の場合は最初のバッチの株価と数値・真偽値の列すべて）
+            capacity (int): 確保する営業日の列数（None の場合は営業日数 + SPARE_DATES）
+
+        Returns:
+            PanelWriter: 書き込み用のオブジェクト（close() または with を抜けると保存する）
+        """
+        return PanelWriter(self.root, codes, dates, fields, capacity)
+
+    def append(self, df):
+        """
+        新しい営業日の行をパネルに書き込む
+
+        保存済みの最新日以降の行だけを、確保してある予備の列に書き込む（最新日の列は上書き）。
+        予備の列が足りない場合は列を増やしたパネルに書き直す。新しい銘柄や保存済みの
+        期間の途中の日付を含む場合は追記できないため False を返す（呼び出し側で作り直す）。
+
+        Args:
+            df (pd.DataFrame): Code・Date 列を含む株価データ
+
+        Returns:
+            bool: 追記できた場合は True
+        """
+        if not self.exists():
+            return False
+        if df.empty:
+            return True
+
+        codes = np.asarray(df["Code"].astype(str), dtype=str)
+        row_dates = pd.to_datetime(df["Date"]).to_numpy().astype("datetime64[D]")
+        dates = self.dates
+        new_dates = np.unique(row_dates[row_dates > dates[-1]])
+        stored_dates = np.unique(row_dates[row_dates <= dates[-1]])
+        if not np.isin(codes, self.codes).all() or not np.isin(stored_dates, dates).all():
+            return False
+
+        n_dates = len(dates) + len(new_dates)
+        capacity = self.meta.get("capacity", self.meta["shape"][1])
+        if n_dates > capacity:
+            self._grow(n_dates + SPARE_DATES)
+        all_dates = np.concatenate([dates, new_dates])
+
+        code_index = np.searchsorted(self.codes, codes)
+        date_index = np.searchsorted(all_dates, row_dates)
+        for field in self.fields:
+            if field not in df.columns:
+                continue
+            array = np.load(self.root / f"{field}.npy", mmap_mode="r+")
+            if array.dtype == bool:
+                array[code_index, date_index] = df[field].to_numpy(dtype=bool)
+            else:
+                array[code_index, date_index] = pd.to_numeric(df[field], errors="coerce").to_numpy(
+                    dtype=np.float64, na_value=np.nan)
+            array.flush()
+            del array
+
+        # 営業日の一覧とメタデータを置き換えた時点で、読み込む側に新しい列が見える
+        _replace_file(self.root / DATES_FILE, lambda f: np.save(f, all_dates))
+        _write_meta(self.root, self.meta["fields"], len(self.codes), n_dates, self.meta.get("capacity", capacity))
+        self._reset()
+        return True
+
+    def _grow(self, capacity):
+        """予備の列を増やしたパネルに書き直す"""
+        with self.writer(self.codes, self.dates, self.fields, capacity=capacity) as writer:
+            writer.open(self.meta["fields"])
+            for field in self.fields:
+                writer.write_array(field, self.array(field))
+        self._reset()
+
+    def _reset(self):
+        self._meta = None
+        self._codes = None
+        self._dates = None
+        self._code_positions = None
+        self._arrays = {}
+
+    @property
+    def meta(self):
+        if self._meta is None:
+            self._meta = json.loads((self.root / PANEL_META_FILE).read_text())
+        return self._meta
+
+    @property
+    def fields(self):
+        """保存されている項目名のリスト"""
+        return list(self.meta["fields"])
+
+    @property
+    def codes(self):
+        """行に対応する証券コードの配列"""
+        if self._codes is None:
+            self._codes = np.load(self.root / CODES_FILE)
+        return self._codes
+
+    @property
+    def dates(self):
+        """列に対応する営業日の配列（datetime64[D]）"""
+        if self._dates is None:
+            self._dates = np.load(self.root / DATES_FILE)
+        return self._dates
+
+    def code_index(self, code):
+        """
+        証券コードの行番号を返す
+
+        Args:
+            code (str): 証券コード
+
+        Returns:
+            int: 行番号（見つからない場合は KeyError）
+        """
+        if self._code_positions is None:
+            self._code_positions = {code: i for i, code in enumerate(self.codes.tolist())}
+        return self._code_positions[str(code)]
+
+    def date_slice(self, start=None, end=None):
+        """
+        期間に対応する列の範囲を返す
+
+        Args:
+            start (str | datetime): 開始日（None の場合は最初から）
+            end (str | datetime): 終了日（None の場合は最後まで）
+
+        Returns:
+            slice: 列の範囲
+        """
+        dates = self.dates
+        left = 0 if start is None else np.searchsorted(dates, np.datetime64(pd.Timestamp(start), "D"), side="left")
+        right = len(dates) if end is None else np.searchsorted(dates, np.datetime64(pd.Timestamp(end), "D"), side="right")
+        return slice(int(left), int(right))
+
+    def array(self, field):
+        """
+        項目の配列をメモリマップで開く
+
+        Args:
+            field (str): 項目名
+
+        Returns:
+            np.memmap: (銘柄数, 営業日数) の読み取り専用配列
+        """
+        if field not in self._arrays:
+            if field not in self.meta["fields"]:
+                raise KeyError(f"パネルに項目がありません: {field}")
+            # 予備の列は含めない
+            array = np.load(self.root / f"{field}.npy", mmap_mode="r")
+            self._arrays[field] = array[:, :self.meta["shape"][1]]
+        return self._arrays[field]
+
+    def series(self, field, code, start=None, end=None):
+        """
+        1銘柄の時系列を返す
+
+        Args:
+            field (str): 項目名
+            code (str): 証券コード
+            start (str | datetime): 開始日（None の場合は最初から）
+            end (str | datetime): 終了日（None の場合は最後まで）
+
+        Returns:
+            pd.Series: 日付をインデックスとする時系列
+        """
+        columns = self.date_slice(start, end)
+        values = self.array(field)[self.code_index(code), columns]
+        return pd.Series(np.asarray(values), index=pd.DatetimeIndex(self.dates[columns]), name=field)
+
+    def to_frame(self, fields=None, codes=None, start=None, end=None):
+        """
+        パネルを縦持ちの株価データに戻す
+
+        データのない (銘柄, 日付) は含めない。
+
+        Args:
+            fields (list): 項目名（None の場合はすべて）
+            codes (iterable): 証券コード（None の場合はすべて）
+            start (str | datetime): 開始日（None の場合は最初から）
+            end (str | datetime): 終了日（None の場合は最後まで）
+
+        Returns:
+            pd.DataFrame: Code・Date と各項目の列を持つ株価データ
+        """
+        fields = fields or self.fields
+        rows = np.arange(len(self.codes)) if codes is None else np.array([self.code_index(code) for code in codes])
+        columns = self.date_slice(start, end)
+        dates = self.dates[columns]
+
+        data = {
+            "Code": np.repeat(self.codes[rows], len(dates)),
+            "Date": np.tile(dates.astype("datetime64[ns]"), len(rows)),
+        }
+        for field in fields:
+            data[field] = np.asarray(self.array(field)[rows, columns]).ravel()
+        df = pd.DataFrame(data)
+
+        # 株価のある行だけを残す
+        present = [field for field in PRICE_FIELDS if field in self.meta["fields"]]
+        if present:
+            mask = np.zeros(len(df), dtype=bool)
+            for field in present:
+                mask |= ~np.isnan(np.asarray(self.array(field)[rows, columns]).ravel())
+            df = df[mask].reset_index(drop=True)
+        return df
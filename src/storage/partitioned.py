@@ -0,0 +1,387 @@
+"""
+年ごとに分割した Parquet で株価データを保存し、銘柄・期間で絞り込んで読み込むモジュール
+
+データセットはディレクトリで、年ごとのパーティション（year=YYYY/part-0.parquet）に分けて保存する。
+各パーティションは (Code, Date) 順に並べ、一定行数ごとの行グループに分けて書き出すため、
+行グループの統計情報（Code・Date の最小値と最大値）から該当しない行グループを読み飛ばせる。
+期間の指定はパーティション単位、銘柄の指定は行グループ単位で絞り込まれるので、
+1銘柄だけを読み込む場合は保存している年数・銘柄数にほとんど依存しない。
+
+日々の追加分は変更しない小さなファイル（セグメント: _segments/*.parquet）として追記し、
+読み込み時にパーティションと合わせて (Code, Date) の重複を除く（後から追記した行を優先）。
+セグメントは compact() で該当する年のパーティションにまとめる。どのファイルも一時ファイルに
+書き出してから置き換えるため、読み込み側が書きかけのファイルを見ることはない。
+
+    python -m src.storage.partitioned data/raw/stock_prices data/processed/stock_prices_analyzed
+"""
+import shutil
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+PARTITION_PREFIX = "year="
+PART_FILE_NAME = "part-0.parquet"
+
+# 1つの行グループの行数。小さいほど銘柄での絞り込みが効くが、ファイルのメタデータが増える
+ROW_GROUP_SIZE = 32_768
+
+PARQUET_COMPRESSION = "zstd"
+
+SEGMENTS_DIR_NAME = "_segments"
+
+# セグメントがこの数以上たまったら maybe_compact() でまとめる
+COMPACT_MIN_SEGMENTS = 20
+
+KEY_COLUMNS = ["Code", "Date"]
+
+# 読み込み中にまとめ処理でセグメントが消えた場合に読み直す回数
+LOAD_RETRIES = 3
+
+
+def replace_directory(tmp_root, root):
+    """
+    書き出し済みの一時ディレクトリで既存のディレクトリを置き換える
+
+    Args:
+        tmp_root (Path): 書き出し済みの一時ディレクトリ
+        root (Path): 置き換えるディレクトリ
+    """
+    old_root = root.with_name(root.name + ".old")
+    shutil.rmtree(old_root, ignore_errors=True)
+    if root.exists():
+        root.rename(old_root)
+    tmp_root.rename(root)
+    shutil.rmtree(old_root, ignore_errors=True)
+
+
+def is_partitioned_dataset(path):
+    """パスが分割保存したデータセットのディレクトリなら True を返す"""
+    path = Path(path)
+    return path.is_dir() and (
+        any(path.glob(f"{PARTITION_PREFIX}*/{PART_FILE_NAME}")) or any((path / SEGMENTS_DIR_NAME).glob("*.parquet"))
+    )
+
+
+class DatasetWriter:
+    """
+    データセットを銘柄順のバッチごとに書き出す
+
+    バッチは銘柄の昇順で、銘柄が重ならないように渡す（各バッチは Code・Date の順に並べ直す）。
+    年ごとのパーティションのファイルを開いたまま行グループを追記していくため、全体を
+    メモリに載せずに write() と同じ形式（年ごとに1ファイル、(Code, Date) 順）のデータセットになる。
+    close() で一時ディレクトリから置き換え、途中で失敗した場合は abort() で一時ディレクトリを捨てる。
+
+    Attributes:
+        root: データセットのディレクトリ
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.tmp_root = self.root.with_name(self.root.name + ".tmp")
+        shutil.rmtree(self.tmp_root, ignore_errors=True)
+        self._writers = {}
+        self._last_code = None
+        self.rows = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def write(self, df):
+        """
+        1つのバッチを書き出す
+
+        Args:
+            df (pd.DataFrame): Code・Date 列を含む株価データ（前のバッチより後の銘柄だけ）
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if df.empty:
+            return
+        df = df.sort_values(KEY_COLUMNS, kind="stable")
+        codes = df["Code"].astype(str)
+        if self._last_code is not None and codes.iloc[0] <= self._last_code:
+            raise ValueError("バッチは銘柄の昇順で、銘柄が重ならないように渡してください。")
+        self._last_code = codes.iloc[-1]
+
+        for year, df_year in df.groupby(df["Date"].dt.year, sort=True):
+            table = pa.Table.from_pandas(df_year, preserve_index=False)
+            writer = self._writers.get(year)
+            if writer is None:
+                part_file = self.tmp_root / f"{PARTITION_PREFIX}{year}" / PART_FILE_NAME
+                part_file.parent.mkdir(parents=True, exist_ok=True)
+                writer = pq.ParquetWriter(part_file, table.schema, compression=PARQUET_COMPRESSION)
+                self._writers[year] = writer
+            elif not table.schema.equals(writer.schema):
+                # バッチによって型が変わる列（欠損だけの列・整数にできる出来高など）は最初のバッチにそろえる
+                table = table.select(writer.schema.names).cast(writer.schema)
+            writer.write_table(table, row_group_size=ROW_GROUP_SIZE)
+        self.rows += len(df)
+
+    def _close_writers(self):
+        for writer in self._writers.values():
+            writer.close()
+        self._writers = {}
+
+    def close(self):
+        """書き出したデータセットで既存のデータセットを置き換える"""
+        self._close_writers()
+        self.tmp_root.mkdir(parents=True, exist_ok=True)
+        replace_directory(self.tmp_root, self.root)
+
+    def abort(self):
+        """書き出しを中止し、既存のデータセットはそのまま残す"""
+        self._close_writers()
+        shutil.rmtree(self.tmp_root, ignore_errors=True)
+
+
+class PartitionedDataset:
+    """
+    年ごとに分割して保存した株価データセット
+
+    Attributes:
+        root: データセットのディレクトリ
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def partitions(self):
+        """
+        保存済みのパーティションを返す
+
+        Returns:
+            list: (年, ファイルパス) のリスト（年の昇順）
+        """
+        partitions = []
+        for part_file in self.root.glob(f"{PARTITION_PREFIX}*/{PART_FILE_NAME}"):
+            year = int(part_file.parent.name[len(PARTITION_PREFIX):])
+            partitions.append((year, part_file))
+        return sorted(partitions)
+
+    @property
+    def segments_dir(self):
+        return self.root / SEGMENTS_DIR_NAME
+
+    def segments(self):
+        """
+        まだパーティションにまとめていないセグメントを返す
+
+        Returns:
+            list: セグメントのファイルパスのリスト（追記した順）
+        """
+        return sorted(self.segments_dir.glob("*.parquet"))
+
+    def write(self, df):
+        """
+        データセット全体を書き出す
+
+        一時ディレクトリにすべて書き出してから置き換えるため、途中で失敗しても
+        既存のデータセットは壊れない。行がない場合は何もしない（既存のデータセットを残す）。
+
+        Args:
+            df (pd.DataFrame): Code・Date 列を含む株価データ
+        """
+        if df.empty:
+            return
+
+        tmp_root = self.root.with_name(self.root.name + ".tmp")
+        shutil.rmtree(tmp_root, ignore_errors=True)
+
+        df = df.sort_values(["Code", "Date"], kind="stable")
+        for year, df_year in df.groupby(df["Date"].dt.year, sort=True):
+            self.write_partition(df_year, tmp_root / f"{PARTITION_PREFIX}{year}" / PART_FILE_NAME)
+
+        replace_directory(tmp_root, self.root)
+
+    def append(self, df):
+        """
+        行をセグメントとして追記する
+
+        書き込むのは追加分だけで、既存のパーティションには触れない。
+
+        Args:
+            df (pd.DataFrame): Code・Date 列を含む株価データ
+
+        Returns:
+            Path: 作成したセグメントのパス（追加する行がない場合は None）
+        """
+        if df.empty:
+            return None
+        self.segments_dir.mkdir(parents=True, exist_ok=True)
+        # ファイル名の順が追記した順になるようにする
+        segment = self.segments_dir / f"{time.time_ns():020d}-{uuid.uuid4().hex[:8]}.parquet"
+        tmp_path = segment.with_name(segment.name + ".tmp")
+        self.write_partition(df.sort_values(KEY_COLUMNS, kind="stable"), tmp_path)
+        tmp_path.replace(segment)
+        return segment
+
+    def compact(self):
+        """
+        セグメントを該当する年のパーティションにまとめ、(Code, Date) の重複を除く
+
+        書き直すのはセグメントに含まれる年のパーティションだけ。パーティションを置き換えてから
+        セグメントを削除するので、途中で中断しても読み込み結果は変わらない。
+
+        Returns:
+            int: まとめたセグメントの数
+        """
+        segments = self.segments()
+        if not segments:
+            return 0
+
+        df_new = pd.concat([pd.read_parquet(segment) for segment in segments], ignore_index=True)
+        for year, df_year in df_new.groupby(df_new["Date"].dt.year, sort=True):
+            part_file = self.root / f"{PARTITION_PREFIX}{year}" / PART_FILE_NAME
+            if part_file.exists():
+                df_year = pd.concat([pd.read_parquet(part_file), df_year], ignore_index=True)
+            df_year = df_year.drop_duplicates(KEY_COLUMNS, keep="last").sort_values(KEY_COLUMNS, kind="stable")
+
+            tmp_path = part_file.with_name(part_file.name + ".tmp")
+            self.write_partition(df_year, tmp_path)
+            tmp_path.replace(part_file)
+
+        for segment in segments:
+            segment.unlink()
+        return len(segments)
+
+    def writer(self):
+        """銘柄順のバッチごとに書き出す DatasetWriter を返す"""
+        return DatasetWriter(self.root)
+
+    def scan_keys(self):
+        """
+        全体を読み込まずに銘柄ごとの行数と日付の一覧を求める（ファイルごとに Code・Date 列だけを読む）
+
+        Returns:
+            tuple: (証券コードをインデックスとする行数の Series（昇順）, 日付の配列（datetime64[D]、昇順）)
+                セグメントの行はパーティションと重なっていても数える
+        """
+        counts = pd.Series(dtype="int64")
+        dates = set()
+        for path in [part_file for _, part_file in self.partitions()] + self.segments():
+            df = pd.read_parquet(path, columns=KEY_COLUMNS)
+            counts = counts.add(df["Code"].astype(str).value_counts(), fill_value=0)
+            dates.update(df["Date"].to_numpy().astype("datetime64[D]").tolist())
+        return counts.astype("int64").sort_index(), np.array(sorted(dates), dtype="datetime64[D]")
+
+    def maybe_compact(self, min_segments=COMPACT_MIN_SEGMENTS):
+        """セグメントが min_segments 以上たまっていればまとめる"""
+        if len(self.segments()) >= min_segments:
+            return self.compact()
+        return 0
+
+    @staticmethod
+    def write_partition(df, part_file):
+        """
+        1つのパーティションを書き出す
+
+        Args:
+            df (pd.DataFrame): (Code, Date) 順に並べた株価データ
+            part_file (Path): 出力先のファイル
+        """
+        part_file.parent.mkdir(parents=True, exist_ok=True)
+        df.to_parquet(
+            part_file,
+            index=False,
+            compression=PARQUET_COMPRESSION,
+            row_group_size=ROW_GROUP_SIZE,
+        )
+
+    def load(self, codes=None, start=None, end=None, columns=None):
+        """
+        銘柄・期間・列を指定して読み込む
+
+        期間に含まれないパーティションは開かず、パーティション内では行グループの統計情報を
+        使って該当する行グループだけを読み込む。セグメントがある場合は合わせて読み込み、
+        (Code, Date) が重複する行は後から追記したものを使う。
+
+        Args:
+            codes (iterable): 証券コード（None の場合はすべて）
+            start (str | datetime): 開始日（None の場合は最初から）
+            end (str | datetime): 終了日（None の場合は最後まで）
+            columns (list): 読み込む列名（None の場合はすべて）
+
+        Returns:
+            pd.DataFrame: 株価データ（銘柄ごとに日付順）
+        """
+        start = pd.Timestamp(start) if start is not None else None
+        end = pd.Timestamp(end) if end is not None else None
+
+        filters = []
+        if codes is not None:
+            filters.append(("Code", "in", [str(code) for code in codes]))
+        if start is not None:
+            filters.append(("Date", ">=", start))
+        if end is not None:
+            filters.append(("Date", "<=", end))
+
+        for attempt in range(LOAD_RETRIES):
+            try:
+                return self._load(start, end, columns, filters or None)
+            except FileNotFoundError:
+                # 読み込み中にまとめ処理が終わった場合は、まとめた後の状態を読み直す
+                if attempt == LOAD_RETRIES - 1:
+                    raise
+
+    def _load(self, start, end, columns, filters):
+        segments = self.segments()
+        read_columns = columns
+        if segments and columns is not None:
+            read_columns = list(columns) + [key for key in KEY_COLUMNS if key not in columns]
+
+        frames = []
+        for year, part_file in self.partitions():
+            if (start is not None and year < start.year) or (end is not None and year > end.year):
+                continue
+            frames.append(pd.read_parquet(part_file, columns=read_columns, filters=filters))
+        for segment in segments:
+            frames.append(pd.read_parquet(segment, columns=read_columns, filters=filters))
+
+        if not frames:
+            return pd.DataFrame(columns=columns)
+        df = pd.concat(frames, ignore_index=True)
+
+        if segments:
+            df = df.drop_duplicates(KEY_COLUMNS, keep="last")
+            if columns is not None:
+                df = df[list(columns)]
+
+        # パーティションをまたぐ場合も銘柄ごとに日付順になるように並べ直す
+        if len(frames) > 1 and set(KEY_COLUMNS) <= set(df.columns):
+            df = df.sort_values(KEY_COLUMNS, kind="stable", ignore_index=True)
+        return df.reset_index(drop=True)
+
+    def latest_date(self):
+        """
+        保存されている最新の日付を返す
+
+        Returns:
+            pd.Timestamp: 最新の日付（データがない場合は None）
+        """
+        files = [part_file for _, part_file in self.partitions()[-1:]] + self.segments()
+        if not files:
+            return None
+        return max(pd.read_parquet(path, columns=["Date"])["Date"].max() for path in files)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="データセットのセグメントをパーティションにまとめる")
+    parser.add_argument("paths", nargs="+", help="データセットのディレクトリ（例: data/raw/stock_prices）")
+    args = parser.parse_args()
+
+    for path in args.paths:
+        n_segments = PartitionedDataset(path).compact()
+        print(f"{path}: {n_segments}個のセグメントをまとめました。")
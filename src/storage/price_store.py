@@ -0,0 +1,295 @@
+"""
+株価データを型付きの列指向形式（Parquet）で保存・読み込みするモジュール
+
+CSV は読み込みのたびに文字列の解析が必要でファイルも大きくなるため、株価データは
+圧縮した Parquet で保存する。Code は文字列、Date は日付型、価格は浮動小数点、
+出来高は整数として保存し、読み込み時は必要な列だけを取り出せる。
+
+保存先は拡張子なしのパス（例: data/raw/stock_prices）で指定する。Parquet は年ごとに
+分割したデータセット（ディレクトリ）として保存し、銘柄・期間で絞り込んで読み込める。
+データセットがない場合は同名の CSV（以前の形式）を読み込む。
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .partitioned import PartitionedDataset, is_partitioned_dataset
+
+try:
+    import pyarrow  # noqa: F401
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+
+FORMAT_PARQUET = "parquet"
+FORMAT_CSV = "csv"
+SUFFIXES = {FORMAT_PARQUET: ".parquet", FORMAT_CSV: ".csv"}
+
+# 整数として保存する列（欠損がある場合も nullable 整数にする）
+INTEGER_COLUMNS = ["Volume"]
+
+
+def resolve_path(path):
+    """
+    保存先のパスから実際に読み込むファイルを決める
+
+    拡張子付きで指定された場合はそのまま使う。拡張子なしの場合は分割保存したデータセット・
+    Parquet・CSV のうち存在するもの（複数ある場合は最も新しいもの）を使う。
+
+    Args:
+        path (str | Path): 保存先のパス
+
+    Returns:
+        Path: 読み込むファイルのパス
+    """
+    path = Path(path)
+    if path.suffix in SUFFIXES.values():
+        return path
+
+    candidates = [path.with_name(path.name + suffix) for suffix in SUFFIXES.values()]
+    existing = [candidate for candidate in candidates if candidate.exists()]
+    if is_partitioned_dataset(path):
+        existing.append(path)
+    if not existing:
+        raise FileNotFoundError(f"株価データが見つかりません: {path}（{'/'.join(SUFFIXES.values())}）")
+    return max(existing, key=lambda candidate: candidate.stat().st_mtime)
+
+
+def prices_exist(path):
+    """保存先に株価データがあれば True を返す"""
+    try:
+        return resolve_path(path).exists()
+    except FileNotFoundError:
+        return False
+
+
+def normalize_dtypes(df):
+    """
+    株価データの列を保存用の型にそろえる
+
+    Args:
+        df (pd.DataFrame): 株価データ
+
+    Returns:
+        pd.DataFrame: 型をそろえた株価データ
+    """
+    df = df.copy(deep=False)
+    if "Code" in df.columns:
+        df["Code"] = df["Code"].astype(str)
+    if "Date" in df.columns:
+        df["Date"] = pd.to_datetime(df["Date"])
+    for column in INTEGER_COLUMNS:
+        if column in df.columns and pd.api.types.is_float_dtype(df[column]):
+            values = df[column].dropna()
+            # 端数がある場合（調整後の出来高など）は浮動小数点のまま保存する
+            if (values == values.round()).all():
+                df[column] = df[column].astype("Int64")
+    return df
+
+
+def save_prices(df, path, format=None):
+    """
+    株価データを保存する
+
+    一時ファイルに書き出してから置き換えるため、途中で失敗しても既存のファイルは壊れない。
+
+    Args:
+        df (pd.DataFrame): 株価データ
+        path (str | Path): 保存先のパス。拡張子なしで Parquet の場合は年ごとに分割したデータセット
+            として保存し、CSV の場合は .csv を付ける
+        format (str): 保存形式（"parquet" / "csv"）。None の場合は Parquet（pyarrow がなければ CSV）
+
+    Returns:
+        Path: 保存したファイル（またはデータセットのディレクトリ）のパス
+    """
+    path = Path(path)
+    if format is None:
+        if path.suffix in SUFFIXES.values():
+            format = FORMAT_CSV if path.suffix == SUFFIXES[FORMAT_CSV] else FORMAT_PARQUET
+        elif PARQUET_AVAILABLE:
+            format = FORMAT_PARQUET
+        else:
+            print("pyarrow がインストールされていないため CSV で保存します。", file=sys.stderr)
+            format = FORMAT_CSV
+
+    df = normalize_dtypes(df)
+    if path.suffix not in SUFFIXES.values():
+        if format == FORMAT_PARQUET:
+            PartitionedDataset(path).write(df)
+            return path
+        path = path.with_name(path.name + SUFFIXES[format])
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    if format == FORMAT_PARQUET:
+        PartitionedDataset.write_partition(df, tmp_path)
+    else:
+        df.to_csv(tmp_path, index=False)
+    tmp_path.replace(path)
+    return path
+
+
+def _changed_rows(df, stored, since):
+    """
+    since 以降の行のうち、保存済みの行と値が異なるものを True とするマスクを返す
+
+    Args:
+        df (pd.DataFrame): 保存する株価データ
+        stored (pd.DataFrame): 保存済みの since 以降の株価データ
+        since (pd.Timestamp): 比較する期間の開始日
+
+    Returns:
+        np.ndarray: df の行ごとの真偽値
+    """
+    mask = np.zeros(len(df), dtype=bool)
+    recent = (df["Date"] >= since).to_numpy()
+    if not recent.any():
+        return mask
+
+    columns = [column for column in df.columns if column in stored.columns and column not in ("Code", "Date")]
+    merged = df.loc[recent, ["Code", "Date", *columns]].merge(
+        stored[["Code", "Date", *columns]], on=["Code", "Date"], how="left", suffixes=("", "_stored"))
+    changed = np.zeros(len(merged), dtype=bool)
+    for column in columns:
+        new, old = merged[column], merged[f"{column}_stored"]
+        # 両方とも欠損の場合は同じ値とみなす
+        changed |= ~((new == old).fillna(False) | (new.isna() & old.isna())).to_numpy(dtype=bool)
+    # 列が増えた・減った場合は値が変わったものとして扱う
+    if set(stored.columns) != set(df.columns):
+        changed[:] = True
+    mask[recent] = changed
+    return mask
+
+
+def update_prices(df, path, full=False):
+    """
+    株価データを保存済みのデータセットに反映する
+
+    保存済みのデータセットがあり、df の銘柄がすべて含まれている場合は、保存済みにない
+    (Code, Date) の行と、最新日の行のうち保存済みと値が異なるものだけをセグメントとして追記する
+    （最新日は取り直した値で上書きされる。途中の欠けた日付を後から取得した場合も追記される）。
+    新しい行も値が変わった行もない場合は何も書き込まずに 0 を返す。
+    それ以外の場合や full=True の場合は全体を書き直す。期間の開始側の切り詰めは行わない。
+
+    Args:
+        df (pd.DataFrame): 保存する期間全体の株価データ
+        path (str | Path): 保存先のパス（拡張子なし）
+        full (bool): True の場合は常に全体を書き直す
+
+    Returns:
+        int: 書き込んだ行数
+    """
+    path = Path(path)
+    if full or not is_partitioned_dataset(path):
+        save_prices(df, path)
+        return len(df)
+
+    dataset = PartitionedDataset(path)
+    df = normalize_dtypes(df)
+    stored_keys = dataset.load(columns=["Code", "Date"])
+    if stored_keys.empty or not set(df["Code"]) <= set(stored_keys["Code"]):
+        save_prices(df, path)
+        return len(df)
+
+    # 保存済みにない (Code, Date) の行（途中の欠けた日付を含む）と、最新日の行のうち値が変わったものを追記する
+    latest_date = stored_keys["Date"].max()
+    stored = pd.MultiIndex.from_frame(stored_keys)
+    is_missing = ~pd.MultiIndex.from_frame(df[["Code", "Date"]]).isin(stored)
+    is_changed = _changed_rows(df, dataset.load(start=latest_date), latest_date) & ~is_missing
+    df_new = df[is_missing | is_changed]
+    dataset.append(df_new)
+    return len(df_new)
+
+
+def load_prices(path, columns=None, codes=None, start=None, end=None):
+    """
+    株価データを読み込む
+
+    分割保存したデータセットの場合は、指定した銘柄・期間を含む部分だけを読み込む。
+
+    Args:
+        path (str | Path): 保存先のパス
+        columns (list): 読み込む列名（None の場合はすべて）
+        codes (iterable): 証券コード（None の場合はすべて）
+        start (str | datetime): 開始日（None の場合は最初から）
+        end (str | datetime): 終了日（None の場合は最後まで）
+
+    Returns:
+        pd.DataFrame: 株価データ
+    """
+    path = resolve_path(path)
+    if path.is_dir():
+        return PartitionedDataset(path).load(codes=codes, start=start, end=end, columns=columns)
+
+    if path.suffix == SUFFIXES[FORMAT_PARQUET]:
+        df = pd.read_parquet(path, columns=columns)
+    else:
+        header = pd.read_csv(path, nrows=0).columns
+        df = pd.read_csv(
+            path,
+            usecols=columns,
+            dtype={'Code': str},
+            parse_dates=['Date'] if 'Date' in (columns or header) else False,
+        )
+
+    # 単一ファイルの場合は読み込んでから絞り込む
+    if codes is not None:
+        df = df[df["Code"].isin([str(code) for code in codes])]
+    if start is not None:
+        df = df[df["Date"] >= pd.Timestamp(start)]
+    if end is not None:
+        df = df[df["Date"] <= pd.Timestamp(end)]
+    return df.reset_index(drop=True)
+
+
+def latest_price_date(path):
+    """
+    保存されている最新の日付を返す
+
+    Args:
+        path (str | Path): 保存先のパス
+
+    Returns:
+        pd.Timestamp: 最新の日付（データがない場合は None）
+    """
+    path = resolve_path(path)
+    if path.is_dir():
+        return PartitionedDataset(path).latest_date()
+    dates = load_prices(path, columns=["Date"])["Date"]
+    return dates.max() if len(dates) else None
+
+
+def export_csv(path, output_file=None, columns=None):
+    """
+    株価データを CSV に書き出す（アドホックな確認用）
+
+    Args:
+        path (str | Path): 保存先のパス
+        output_file (str | Path): 出力先の CSV（省略時は同名の .csv）
+        columns (list): 書き出す列名（None の場合はすべて）
+
+    Returns:
+        Path: 出力した CSV のパス
+    """
+    source = resolve_path(path)
+    if output_file is None:
+        output_file = source.with_name(source.stem + SUFFIXES[FORMAT_CSV])
+    if Path(output_file) == source:
+        return source
+    return save_prices(load_prices(source, columns=columns), output_file, format=FORMAT_CSV)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="保存した株価データを CSV に書き出す")
+    parser.add_argument("path", help="保存先のパス（例: data/raw/stock_prices）")
+    parser.add_argument("-o", "--output", default=None, help="出力先の CSV")
+    parser.add_argument("--columns", default=None, help="書き出す列名（カンマ区切り）")
+    args = parser.parse_args()
+
+    output_file = export_csv(args.path, args.output, args.columns.split(",") if args.columns else None)
+    print(f"CSV を出力しました: {output_file}")
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# src パッケージを読み込めるようにプロジェクトのルートをパスに追加
+sys.path.insert(0, str(Path(__file__).parent.parent))
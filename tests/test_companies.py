@@ -0,0 +1,35 @@
+import pandas as pd
+
+from src.storage import companies
+from src.storage.companies import CompanyStore
+
+
+def make_listed(date, names):
+    return pd.DataFrame([
+        {"Date": date, "Code": code, "CompanyName": name, "Sector17CodeName": "食品"}
+        for code, name in names.items()
+    ])
+
+
+def test_update_appends_only_changed_versions(tmp_path, monkeypatch):
+    # 手元の上場銘柄一覧は読み込まない
+    monkeypatch.setattr(companies, "LISTED_COMPANIES_FILE", tmp_path / "listed_companies.csv")
+    store = CompanyStore(tmp_path / "companies")
+    assert store.update(make_listed("2025-01-06", {"13010": "極洋", "13020": "日本水産"})) == 2
+    assert store.update(make_listed("2025-04-01", {"13010": "極洋", "13020": "ニッスイ"})) == 1
+
+    reopened = CompanyStore(tmp_path / "companies")
+    assert len(reopened.versions) == 3
+    assert reopened.lookup(["13020"], columns=["CompanyName"])["CompanyName"].tolist() == ["ニッスイ"]
+    assert reopened.lookup(["13020"], columns=["CompanyName"], as_of="2025-03-31")["CompanyName"].tolist() == ["日本水産"]
+
+
+def test_lookup_drops_unknown_codes(tmp_path, monkeypatch):
+    monkeypatch.setattr(companies, "LISTED_COMPANIES_FILE", tmp_path / "listed_companies.csv")
+    store = CompanyStore(tmp_path / "companies")
+    store.update(make_listed("2025-01-06", {"13010": "極洋", "13020": "日本水産"}))
+
+    df = store.lookup(["13020", "99990", "13010"], columns=["CompanyName"])
+
+    assert df["Code"].tolist() == ["13020", "13010"]
+    assert df["CompanyName"].notna().all()
@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+
+from src.analysis.indicator_state import IndicatorState
+from src.bench.indicator_benchmark import check_streaming_parity, make_parity_prices
+
+
+def test_streaming_update_matches_full_computation():
+    df = make_parity_prices(n_codes=12, days=260, seed=5)
+    state = check_streaming_parity(df, n_days=10)
+    # 更新した日付まで状態に反映されている
+    assert state.latest_date == df["Date"].max()
+
+
+def test_saved_state_resumes_streaming_update(tmp_path):
+    df = make_parity_prices(n_codes=8, days=260, seed=7)
+    dates = np.sort(df["Date"].unique())
+    history, day1, day2 = df[df["Date"] < dates[-2]], df[df["Date"] == dates[-2]], df[df["Date"] == dates[-1]]
+
+    state = IndicatorState.from_history(history)
+    state.update(day1)
+    expected = state.update(day2)
+
+    # 1日分を反映した状態を保存・読み込みしても、次の日の結果は変わらない
+    state = IndicatorState.from_history(history)
+    state.update(day1)
+    state.save(tmp_path / "indicator_state.npz")
+    actual = IndicatorState.load(tmp_path / "indicator_state.npz").update(day2)
+
+    pd.testing.assert_frame_equal(actual, expected)
+    assert IndicatorState.load(tmp_path / "indicator_state.npz").latest_date == pd.Timestamp(dates[-2])
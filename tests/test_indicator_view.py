@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+
+from src.analysis.indicator_view import IndicatorView
+
+
+def make_prices(n_days=60, close_offset=0.0):
+    dates = pd.bdate_range("2025-01-06", periods=n_days)
+    close = 100.0 + np.arange(n_days) + close_offset
+    return pd.DataFrame({"Date": dates, "Code": "13010", "Close": close, "High": close + 1.0, "Low": close - 1.0})
+
+
+def test_cache_is_invalidated_when_prices_are_revised(tmp_path):
+    prices = {"df": make_prices()}
+
+    def loader(codes):
+        return prices["df"]
+
+    first = IndicatorView(loader, cache_dir=tmp_path).frame(["13010"], ["Date", "SMA25"])
+
+    # 日付は同じで値だけ修正された場合は、保存した指標を使わずに計算し直す
+    prices["df"] = make_prices(close_offset=10.0)
+    revised = IndicatorView(loader, cache_dir=tmp_path).frame(["13010"], ["Date", "SMA25"])
+    np.testing.assert_allclose(revised["SMA25"].dropna(), first["SMA25"].dropna() + 10.0)
+
+    # 値が変わっていなければ保存した指標を読み込む
+    view = IndicatorView(loader, cache_dir=tmp_path)
+    entry = view._entry("13010")
+    assert "SMA25" in entry.columns
@@ -0,0 +1,27 @@
+import numpy as np
+import pandas as pd
+
+from src.storage.panel import PanelStore
+
+
+def make_frame(dates, codes=("13010", "13020")):
+    return pd.DataFrame([
+        {"Code": code, "Date": date, "Close": 100.0 + i, "UpperBandWalk": i % 2 == 0}
+        for i, date in enumerate(dates)
+        for code in codes
+    ])
+
+
+def test_append_grows_panel_when_spare_columns_run_out(tmp_path):
+    dates = pd.bdate_range("2025-01-06", periods=5)
+    df = make_frame(dates)
+    panel = PanelStore(tmp_path / "panel")
+    with panel.writer(np.array(["13010", "13020"]), dates[:3].to_numpy(), capacity=3) as writer:
+        writer.write(df[df["Date"] < dates[3]])
+
+    assert panel.append(df[df["Date"] >= dates[3]])
+
+    assert panel.meta["capacity"] > 5
+    assert panel.array("Close").shape == (2, 5)
+    pd.testing.assert_frame_equal(panel.to_frame(), df.sort_values(["Code", "Date"], ignore_index=True),
+                                  check_dtype=False)
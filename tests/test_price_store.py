@@ -0,0 +1,60 @@
+import pandas as pd
+
+from src.storage.price_store import load_prices, save_prices, update_prices
+
+
+def make_prices(dates, codes=("13010", "13020")):
+    return pd.DataFrame([
+        {"Date": pd.Timestamp(date), "Code": code, "Close": 100.0 + i, "Volume": 1000}
+        for i, date in enumerate(dates)
+        for code in codes
+    ])
+
+
+def test_update_prices_appends_backfilled_dates(tmp_path):
+    dates = pd.bdate_range("2025-01-06", periods=5)
+    path = tmp_path / "stock_prices"
+    df_full = make_prices(dates)
+    save_prices(df_full[df_full["Date"] != dates[2]], path)
+
+    n_rows = update_prices(df_full, path)
+
+    df = load_prices(path)
+    assert len(df) == 10
+    assert set(df["Date"]) == set(dates)
+    # 欠けていた日付の2行だけを追記する
+    assert n_rows == 2
+
+
+def test_update_prices_overwrites_latest_date(tmp_path):
+    dates = pd.bdate_range("2025-01-06", periods=3)
+    path = tmp_path / "stock_prices"
+    save_prices(make_prices(dates), path)
+
+    df_update = make_prices(dates)
+    df_update.loc[(df_update["Date"] == dates[-1]) & (df_update["Code"] == "13010"), "Close"] = 999.0
+    # 値が変わった1行だけを追記する
+    assert update_prices(df_update, path) == 1
+
+    df = load_prices(path)
+    assert len(df) == 6
+    assert df.loc[df["Date"] == dates[-1], "Close"].tolist() == [999.0, 102.0]
+
+
+def test_update_prices_skips_unchanged_rerun(tmp_path):
+    dates = pd.bdate_range("2025-01-06", periods=3)
+    path = tmp_path / "stock_prices"
+    save_prices(make_prices(dates), path)
+
+    assert update_prices(make_prices(dates), path) == 0
+    assert not (path / "_segments").exists() or not list((path / "_segments").glob("*.parquet"))
+    assert len(load_prices(path)) == 6
+
+
+def test_save_empty_frame_keeps_existing_dataset(tmp_path):
+    path = tmp_path / "stock_prices"
+    save_prices(make_prices(pd.bdate_range("2025-01-06", periods=2)), path)
+
+    save_prices(make_prices([]).reindex(columns=["Date", "Code", "Close", "Volume"]), path)
+
+    assert len(load_prices(path)) == 4
@@ -0,0 +1,17 @@
+import pandas as pd
+
+from src.analysis.processer import process_stock_data
+from src.bench.indicator_benchmark import make_parity_prices, process_stock_data_by_code
+
+
+def test_process_stock_data_matches_per_code_reference():
+    df = make_parity_prices(n_codes=12, days=260, seed=3)
+    # SMA200 の窓より短い銘柄も含める（make_parity_prices の最初の銘柄は約2週間分）
+    codes = sorted(df["Code"].unique())
+    latest = df["Date"].max()
+    df = df[~((df["Code"] == codes[1]) & (df["Date"] < latest - pd.Timedelta(days=150)))]
+    counts = df.groupby("Code").size()
+    assert counts.min() < 25 and (counts < 200).sum() >= 2
+
+    expected = process_stock_data_by_code(df)
+    pd.testing.assert_frame_equal(process_stock_data(df), expected, check_exact=True)
@@ -0,0 +1,69 @@
+import pandas as pd
+
+from src.api.fetch_planner import subtract_coverage
+from src.api.fetch_runs import FetchRun
+from src.api.quote_store import QuoteStore
+
+
+def make_quotes(dates, codes=("13010", "13020")):
+    return pd.DataFrame([
+        {"Date": date, "Code": code, "Close": 100.0, "Volume": 1000.0}
+        for date in dates
+        for code in codes
+    ])
+
+
+def test_subtract_coverage_returns_gaps_between_intervals():
+    covered = [("2025-01-06", "2025-01-10"), ("2025-01-20", "2025-01-24")]
+    missing = subtract_coverage("2025-01-01", "2025-01-31", covered)
+    assert missing == [
+        ("2025-01-01", "2025-01-05"),
+        ("2025-01-11", "2025-01-19"),
+        ("2025-01-25", "2025-01-31"),
+    ]
+
+
+def test_quote_store_appends_and_reads_parquet(tmp_path):
+    store = QuoteStore(tmp_path / "daily_quotes")
+    store.append([make_quotes(["2025-01-06", "2025-01-07"])])
+    store.append([make_quotes(["2025-01-07"]).assign(Close=200.0), make_quotes(["2025-01-08"])])
+    store.extend_coverage("13010", "2025-01-06", "2025-01-07")
+    store.extend_coverage("13010", "2025-01-13", "2025-01-14")
+    store.save_coverage()
+
+    df = store.read(["13010"], "2025-01-07", "2025-01-08")
+    assert df["Date"].dt.strftime("%Y-%m-%d").tolist() == ["2025-01-07", "2025-01-08"]
+    assert df["Close"].tolist() == [200.0, 100.0]
+
+    reopened = QuoteStore(tmp_path / "daily_quotes")
+    assert reopened.coverage["13010"] == [("2025-01-06", "2025-01-07"), ("2025-01-13", "2025-01-14")]
+
+
+def test_quote_store_migrates_csv(tmp_path):
+    make_quotes(["2025-01-06", "2025-01-07"]).to_csv(tmp_path / "daily_quotes.csv", index=False)
+    store = QuoteStore(tmp_path / "daily_quotes")
+
+    assert not (tmp_path / "daily_quotes.csv").exists()
+    assert len(store.read(["13010", "13020"], "2025-01-01", "2025-01-31")) == 4
+    assert store.coverage["13010"] == [("2025-01-06", "2025-01-07")]
+
+
+def test_merge_into_covers_only_through_last_fetched_date(tmp_path):
+    units = {
+        "date_2025-01-06": {"kind": "date", "date": "2025-01-06", "codes": ["13010", "13020"], "status": "pending"},
+        "date_2025-01-07": {"kind": "date", "date": "2025-01-07", "codes": ["13010", "13020"], "status": "done",
+                            "rows": 0, "last_date": None},
+        "code_13030_2025-01-06_2025-01-07": {"kind": "code", "code": "13030", "from": "2025-01-06",
+                                             "to": "2025-01-07", "status": "done", "rows": 0, "last_date": None},
+    }
+    missing = {code: [["2025-01-06", "2025-01-07"]] for code in ("13010", "13020", "13030")}
+    run = FetchRun(tmp_path / "run", {"run_id": "test", "missing": missing, "units": units, "status": "pending"})
+    run.shard_dir.mkdir(parents=True)
+    # 実行記録の保存前に中断した単位（シャードだけがある）
+    make_quotes(["2025-01-06"]).to_csv(run.shard_dir / "date_2025-01-06.csv", index=False)
+
+    store = QuoteStore(tmp_path / "daily_quotes")
+    assert run.merge_into(store) == 2
+    assert store.coverage["13010"] == [("2025-01-06", "2025-01-06")]
+    assert store.coverage["13020"] == [("2025-01-06", "2025-01-06")]
+    assert "13030" not in store.coverage
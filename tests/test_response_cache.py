@@ -0,0 +1,49 @@
+import os
+
+from src.api import response_cache
+from src.api.response_cache import ResponseCache, get_cache_policy
+
+
+def test_entry_expires_after_ttl(tmp_path, monkeypatch):
+    cache = ResponseCache(tmp_path)
+    now = 1_000_000.0
+    monkeypatch.setattr(response_cache.time, "time", lambda: now)
+    cache.set("/listed/info", {"code": "13010"}, {"info": []}, ttl=60)
+    cache.set("/prices/daily_quotes", {"date": "2025-01-06"}, {"daily_quotes": []})
+
+    now += 59
+    assert cache.get("/listed/info", {"code": "13010"}) == {"info": []}
+
+    now += 2
+    assert cache.get("/listed/info", {"code": "13010"}) is None
+    # 期限切れのエントリは削除し、無期限のエントリは残す
+    assert len(list(tmp_path.glob("*/*.json"))) == 1
+    assert cache.get("/prices/daily_quotes", {"date": "2025-01-06"}) == {"daily_quotes": []}
+
+
+def test_evicts_least_recently_used_entries(tmp_path):
+    cache = ResponseCache(tmp_path)
+    data = {"daily_quotes": ["x" * 1000]}
+    for i, code in enumerate(["a", "b", "c"]):
+        cache.set("/prices/daily_quotes", {"code": code}, data)
+        entry_path = cache._entry_path(response_cache.make_cache_key("/prices/daily_quotes", {"code": code}))
+        os.utime(entry_path, (1000 + i, 1000 + i))
+    entry_size = entry_path.stat().st_size
+
+    # 参照した a は最近使ったものになり、最も古い b から削除される
+    assert cache.get("/prices/daily_quotes", {"code": "a"}) == data
+    cache.max_bytes = int(entry_size * 3.5)
+    cache.set("/prices/daily_quotes", {"code": "d"}, data)
+
+    assert cache.get("/prices/daily_quotes", {"code": "b"}) is None
+    for code in ["a", "c", "d"]:
+        assert cache.get("/prices/daily_quotes", {"code": code}) == data
+
+
+def test_cache_policy_keeps_settled_quotes_forever(monkeypatch):
+    monkeypatch.setattr(response_cache, "today_jst", lambda: "2025-01-07")
+    assert get_cache_policy("/prices/daily_quotes", {"date": "2025-01-06"}) == (True, None)
+    assert get_cache_policy("/prices/daily_quotes", {"code": "13010", "to": "2025-01-07"}) == (
+        True, response_cache.RECENT_QUOTES_TTL)
+    assert get_cache_policy("/listed/info", {}) == (True, response_cache.LISTED_INFO_TTL)
+    assert get_cache_policy("/token/auth_refresh", {}) == (False, None)
@@ -0,0 +1,57 @@
+import pandas as pd
+import pytest
+
+from src.analysis.screening import Signal, SignalIndex
+
+
+def make_signals():
+    # 4営業日 × 3銘柄。A は1日目と4日目、B は3日目と4日目に出る
+    dates = pd.bdate_range("2025-01-06", periods=4)
+    hits = {
+        "A": {("13010", 0), ("13020", 3)},
+        "B": {("13010", 2), ("13020", 3), ("13030", 3)},
+    }
+    return pd.DataFrame([
+        {"Code": code, "Date": date, **{name: (code, i) in rows for name, rows in hits.items()}}
+        for i, date in enumerate(dates)
+        for code in ("13010", "13020", "13030")
+    ])
+
+
+def make_index():
+    return SignalIndex.from_frame(make_signals(), signals=["A", "B"], days=4)
+
+
+def test_and_or_not_on_latest_date():
+    index = make_index()
+    assert index.codes_matching(Signal("A")) == ["13020"]
+    assert index.codes_matching(Signal("A") & Signal("B")) == ["13020"]
+    assert index.codes_matching(Signal("A") | Signal("B")) == ["13020", "13030"]
+    assert index.codes_matching(~Signal("A")) == ["13010", "13030"]
+    assert index.codes_matching(~(Signal("A") | Signal("B"))) == ["13010"]
+
+
+def test_within_combines_recent_dates():
+    index = make_index()
+    assert index.codes_matching(Signal("B").within(1)) == ["13020", "13030"]
+    assert index.codes_matching(Signal("B").within(2)) == ["13010", "13020", "13030"]
+    # 同じ日に両方成立した銘柄と、別々の日でもよい場合
+    assert index.codes_matching((Signal("A") & Signal("B")).within(4)) == ["13020"]
+    assert index.codes_matching(Signal("A").within(4) & Signal("B").within(4)) == ["13010", "13020"]
+
+
+def test_within_longer_than_index_raises():
+    index = make_index()
+    with pytest.raises(ValueError):
+        index.codes_matching(Signal("A").within(5))
+    with pytest.raises(ValueError):
+        Signal("A").within(0)
+
+
+def test_save_and_load_round_trip(tmp_path):
+    index = make_index()
+    index.save(tmp_path / "signal_index.npz")
+    loaded = SignalIndex.load(tmp_path / "signal_index.npz")
+
+    assert loaded.latest_date == pd.Timestamp("2025-01-09")
+    assert loaded.codes_matching(Signal("A").within(4)) == ["13010", "13020"]
@@ -0,0 +1,77 @@
+import json
+import time
+
+from src.api import http_client, token_manager
+from src.api.http_client import JQuantsClient
+from src.api.token_manager import ID_TOKEN_LIFETIME, REFRESH_TOKEN_LIFETIME, TokenManager
+from src.bench.jquants_stub_server import ID_TOKEN, REFRESH_TOKEN, StubConfig, StubServer
+
+
+def start_stub(monkeypatch):
+    """スタブサーバーを起動して共有クライアントを向ける（.env は書き換えない）"""
+    server = StubServer(StubConfig(n_codes=3, start_date="2025-01-06", end_date="2025-01-10")).start()
+    monkeypatch.setattr(http_client, "_client", JQuantsClient(base_url=server.base_url))
+    monkeypatch.setattr(token_manager, "update_env_file", lambda key, value: None)
+    monkeypatch.setenv("JQUANTS_ID_TOKEN", "")
+    monkeypatch.setenv("JQUANTS_REFRESH_TOKEN", "")
+    return server
+
+
+def write_state(path, **state):
+    path.write_text(json.dumps({
+        "refresh_token": REFRESH_TOKEN, "refresh_issued_at": time.time(),
+        "id_token": None, "id_issued_at": None, **state,
+    }))
+
+
+def test_reuses_valid_id_token_and_refreshes_expired_one(tmp_path, monkeypatch):
+    server = start_stub(monkeypatch)
+    try:
+        state_path = tmp_path / ".jquants_tokens.json"
+        write_state(state_path, id_token="cached-token", id_issued_at=time.time())
+        assert TokenManager(state_path).get_id_token() == "cached-token"
+        assert server.state.request_count == 0
+
+        write_state(state_path, id_token="cached-token", id_issued_at=time.time() - ID_TOKEN_LIFETIME)
+        manager = TokenManager(state_path)
+        assert manager.get_id_token() == ID_TOKEN
+        assert json.loads(state_path.read_text())["id_token"] == ID_TOKEN
+        # 古いIDトークンで送ろうとしたリクエストは最新のものに差し替える
+        assert manager.current_token_for("cached-token") == ID_TOKEN
+    finally:
+        server.stop()
+
+
+def test_logs_in_again_when_refresh_token_expired(tmp_path, monkeypatch):
+    server = start_stub(monkeypatch)
+    try:
+        state_path = tmp_path / ".jquants_tokens.json"
+        write_state(state_path, refresh_token="expired-refresh-token",
+                    refresh_issued_at=time.time() - REFRESH_TOKEN_LIFETIME)
+        manager = TokenManager(state_path)
+
+        assert manager.get_id_token() == ID_TOKEN
+        assert json.loads(state_path.read_text())["refresh_token"] == REFRESH_TOKEN
+    finally:
+        server.stop()
+
+
+def test_unauthorized_request_is_retried_with_new_token(tmp_path, monkeypatch):
+    server = start_stub(monkeypatch)
+    try:
+        state_path = tmp_path / ".jquants_tokens.json"
+        write_state(state_path, id_token="revoked-token", id_issued_at=time.time())
+        manager = TokenManager(state_path)
+        client = http_client.get_client()
+        client.token_manager = manager
+
+        data = client.get_json("/listed/info", headers={"Authorization": "Bearer revoked-token"})
+
+        assert len(data["info"]) == 3
+        assert manager.get_id_token() == ID_TOKEN
+        # 他のスレッドが再発行済みなら、同じ古いトークンの 401 では再発行しない
+        count = server.state.request_count
+        assert manager.handle_unauthorized("revoked-token") == ID_TOKEN
+        assert server.state.request_count == count
+    finally:
+        server.stop()
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from src.api.fetch_planner import clip_to_trading_days
+from src.api.trading_calendar import TradingCalendar, build_holidays
+
+
+def make_calendar():
+    # 2025-04-29（火）と 2025-05-05・06（月・火）を休業日とする
+    return TradingCalendar("2025-04-01", "2025-05-31", holidays=["2025-04-29", "2025-05-05", "2025-05-06"])
+
+
+def test_is_session_and_sessions_between():
+    calendar = make_calendar()
+    assert calendar.is_session("2025-04-28")
+    assert not calendar.is_session("2025-04-29")
+    assert not calendar.is_session("2025-05-03")
+    assert calendar.is_session(["2025-05-02", "2025-05-05", "2025-05-07"]).tolist() == [True, False, True]
+
+    sessions = calendar.sessions_between("2025-04-28", "2025-05-07")
+    assert np.datetime_as_string(sessions).tolist() == ["2025-04-28", "2025-04-30", "2025-05-01", "2025-05-02", "2025-05-07"]
+    assert np.datetime_as_string(calendar.holidays_between("2025-05-01", "2025-05-31")).tolist() == ["2025-05-05", "2025-05-06"]
+
+
+def test_session_index_and_sessions_back():
+    calendar = make_calendar()
+    # 休業日は直前の営業日の番号になり、番号の差が営業日数になる
+    assert calendar.session_index("2025-05-06") == calendar.session_index("2025-05-02")
+    assert calendar.session_index("2025-05-07") - calendar.session_index("2025-04-28") == 4
+    assert calendar.session_index("2025-03-31") == -1
+
+    assert calendar.sessions_back("2025-05-07", 0) == np.datetime64("2025-05-07")
+    assert calendar.sessions_back("2025-05-07", 3) == np.datetime64("2025-04-30")
+    assert calendar.sessions_back("2025-05-06", 1) == np.datetime64("2025-05-01")
+    with pytest.raises(ValueError):
+        calendar.sessions_back("2025-04-02", 5)
+
+
+def test_build_holidays_includes_year_end_weekdays():
+    holidays = np.datetime_as_string(build_holidays("2024-12-01", "2025-01-31")).tolist()
+    # 年末年始の平日は休業日、土日は含めない
+    assert {"2024-12-31", "2025-01-01", "2025-01-02", "2025-01-03"} <= set(holidays)
+    assert "2024-12-30" not in holidays
+
+
+def test_clip_to_trading_days():
+    assert clip_to_trading_days("2024-12-28", "2025-01-05") == ("2024-12-30", "2024-12-30")
+    assert clip_to_trading_days("2024-12-31", "2025-01-07") == ("2025-01-06", "2025-01-07")
+    assert clip_to_trading_days("2025-01-04", "2025-01-05") is None